@@ -0,0 +1,303 @@
+"""Bedrock（bedrock-runtime）のクライアントをプロセス内で共有するためのファクトリ
+
+呼び出し箇所ごとにクライアントを作ると、リトライの方式や接続プールの大きさがばらばらになり
+（boto3 の既定は legacy モードで最大5回・接続プール10本）、負荷が高いときの ThrottlingException で
+処理が止まったり失敗したりする。get_bedrock_client() は次の設定をしたクライアントを1つだけ作る。
+ - リトライは adaptive モード（スロットリングを検知すると、送信の速さをクライアント側で落とす）。
+   再送の回数は BEDROCK_MAX_ATTEMPTS（既定は 8）。adaptive は負荷と関係なく起きるスロットリングでも
+   送信の速さを大きく落とすため、BEDROCK_RETRY_MODE=standard で指数バックオフだけにもできる
+ - 接続プールの大きさは BEDROCK_MAX_POOL_CONNECTIONS（既定は 50）、
+   読み込みのタイムアウトは BEDROCK_READ_TIMEOUT 秒（既定は 300）
+ - BEDROCK_MAX_CONCURRENCY を指定すると、同時に送るリクエストの数を制限する（既定は無制限）
+ - BEDROCK_HEDGE=1 の場合、converse の応答が最近の待ち時間の p95 を過ぎても返らなければ
+   同じリクエストをもう1つ送り、先に返った方を使う（遅い方の応答は捨てる）。
+   追加で送るのはリクエスト全体の BEDROCK_HEDGE_MAX_RATIO（既定は 0.1）まで
+converse_stream は途中までのストリームを捨てられないため、同時実行数の制限だけをかける
+（制限の枠は、イベントのストリームを最後まで読むか閉じるまで使い続ける）。
+
+main.py は get_bedrock_client() をそのまま使い、LangGraph のエージェントは
+init_chat_model(..., client=get_bedrock_client()) で ChatBedrockConverse に渡す。
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from tracing import percentile
+
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+DEFAULT_READ_TIMEOUT = 300
+DEFAULT_HEDGE_QUANTILE = 95
+DEFAULT_HEDGE_MAX_RATIO = 0.1
+# 待ち時間の記録がこの件数に満たないうちは、追加のリクエストを送らない
+HEDGE_MIN_SAMPLES = 20
+
+
+def client_config(**overrides):
+    """adaptive リトライ・接続プール・タイムアウトを設定した botocore の Config"""
+    from botocore.config import Config
+
+    settings = {
+        "retries": {
+            "mode": os.getenv("BEDROCK_RETRY_MODE", "adaptive"),
+            "max_attempts": int(os.getenv("BEDROCK_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)),
+        },
+        "max_pool_connections": int(
+            os.getenv("BEDROCK_MAX_POOL_CONNECTIONS", DEFAULT_MAX_POOL_CONNECTIONS)
+        ),
+        "read_timeout": float(os.getenv("BEDROCK_READ_TIMEOUT", DEFAULT_READ_TIMEOUT)),
+    }
+    settings.update(overrides)
+    return Config(**settings)
+
+
+class ConcurrencyLimiter:
+    """同時に実行する呼び出しの数を制限する（limit <= 0 の場合は制限しない / スレッドセーフ）"""
+
+    def __init__(self, limit: int = 0):
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit) if limit > 0 else None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.waited = 0  # 空きを待った呼び出しの数
+
+    def acquire(self):
+        if self._semaphore is not None and not self._semaphore.acquire(blocking=False):
+            with self._lock:
+                self.waited += 1
+            self._semaphore.acquire()
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class LimitedEventStream:
+    """converse_stream の EventStream を包み、最後まで読むか close() されるまで limiter の枠を持ち続ける
+
+    converse_stream の呼び出しはレスポンスのヘッダーが届いた時点で返り、本文（イベント）は
+    そのあとで読むため、呼び出しの間だけ枠を取ると同時に読んでいるストリームの数を制限できない。
+    """
+
+    def __init__(self, stream, limiter: ConcurrencyLimiter):
+        self._stream = stream
+        self._limiter = limiter
+        self._lock = threading.Lock()
+        self._released = False
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        finally:
+            self.close()
+
+    def close(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._limiter.release()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    def __del__(self):
+        # 読まれないまま捨てられた場合も枠を返す
+        if "_released" in self.__dict__:
+            self.close()
+
+
+class LatencyWindow:
+    """直近の呼び出しの待ち時間（秒）から、追加のリクエストを送るまでの時間を決める"""
+
+    def __init__(self, size: int = 200, quantile: float = DEFAULT_HEDGE_QUANTILE):
+        self.quantile = quantile
+        self._values: deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._values.append(seconds)
+
+    def delay(self) -> float | None:
+        with self._lock:
+            if len(self._values) < HEDGE_MIN_SAMPLES:
+                return None
+            return percentile(sorted(self._values), self.quantile)
+
+
+class BedrockClient:
+    """bedrock-runtime のクライアントを包み、converse / converse_stream に同時実行数の制限と
+    hedged request をかける（それ以外の属性は元のクライアントのものを返す）"""
+
+    def __init__(
+        self,
+        client,
+        max_concurrency: int = 0,
+        hedge: bool = False,
+        hedge_quantile: float = DEFAULT_HEDGE_QUANTILE,
+        hedge_max_ratio: float = DEFAULT_HEDGE_MAX_RATIO,
+    ):
+        self.client = client
+        self.limiter = ConcurrencyLimiter(max_concurrency)
+        self.hedge = hedge
+        self.hedge_max_ratio = hedge_max_ratio
+        self.latencies = LatencyWindow(quantile=hedge_quantile)
+        # 呼び出し元のスレッドの数だけ同時に送れるよう、接続プールと同じ数のスレッドを用意する
+        self._executor = (
+            ThreadPoolExecutor(
+                max_workers=client.meta.config.max_pool_connections,
+                thread_name_prefix="bedrock-hedge",
+            )
+            if hedge
+            else None
+        )
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "hedged": 0, "hedge_wins": 0, "errors": 0}
+        # adaptive リトライで再送する前に呼ばれるイベントで、スロットリングの回数を数える
+        client.meta.events.register("needs-retry.bedrock-runtime", self._count_throttle)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _count_throttle(self, response=None, **kwargs):
+        if response is not None:
+            code = (response[1] or {}).get("Error", {}).get("Code", "")
+            if code in ("ThrottlingException", "TooManyRequestsException"):
+                self._count("throttled")
+
+    def _call(self, method: str, kwargs: dict):
+        with self.limiter:
+            started = time.perf_counter()
+            result = getattr(self.client, method)(**kwargs)
+        self.latencies.add(time.perf_counter() - started)
+        return result
+
+    def converse(self, **kwargs):
+        self._count("requests")
+        try:
+            if self._executor is None:
+                return self._call("converse", kwargs)
+            return self._hedged_converse(kwargs)
+        except Exception:
+            self._count("errors")
+            raise
+
+    def converse_stream(self, **kwargs):
+        self._count("requests")
+        self.limiter.acquire()
+        try:
+            response = self.client.converse_stream(**kwargs)
+        except Exception:
+            self.limiter.release()
+            self._count("errors")
+            raise
+        # ストリームを読み終わる（または閉じる）まで枠を返さない
+        response["stream"] = LimitedEventStream(response["stream"], self.limiter)
+        return response
+
+    def _may_hedge(self) -> bool:
+        with self._lock:
+            return self.stats["hedged"] < self.stats["requests"] * self.hedge_max_ratio
+
+    def _hedged_converse(self, kwargs: dict):
+        first = self._executor.submit(self._call, "converse", kwargs)
+        delay = self.latencies.delay()
+        if delay is None or not wait([first], timeout=delay).not_done or not self._may_hedge():
+            return first.result()
+
+        self._count("hedged")
+        second = self._executor.submit(self._call, "converse", kwargs)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def summary(self) -> str:
+        with self._lock:
+            stats = dict(self.stats)
+        return (
+            f"bedrock client: requests={stats['requests']} errors={stats['errors']} "
+            f"throttled={stats['throttled']} hedged={stats['hedged']} "
+            f"hedge_wins={stats['hedge_wins']} max_in_flight={self.limiter.max_in_flight} "
+            f"waited={self.limiter.waited}"
+        )
+
+
+def create_bedrock_client(
+    region: str | None = None,
+    profile: str | None = None,
+    endpoint_url: str | None = None,
+    config=None,
+    max_concurrency: int | None = None,
+    hedge: bool | None = None,
+) -> BedrockClient:
+    """設定を指定して BedrockClient を作る（省略した値は環境変数・既定値を使う）"""
+    import boto3
+
+    region = region or os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION") or "us-east-1"
+    profile = profile or os.getenv("AWS_PROFILE")
+    session = (
+        boto3.Session(region_name=region, profile_name=profile)
+        if profile
+        else boto3.Session(region_name=region)
+    )
+    client = session.client(
+        "bedrock-runtime", endpoint_url=endpoint_url, config=config or client_config()
+    )
+    return BedrockClient(
+        client,
+        max_concurrency=(
+            int(os.getenv("BEDROCK_MAX_CONCURRENCY", 0))
+            if max_concurrency is None
+            else max_concurrency
+        ),
+        hedge=os.getenv("BEDROCK_HEDGE") == "1" if hedge is None else hedge,
+        hedge_max_ratio=float(os.getenv("BEDROCK_HEDGE_MAX_RATIO", DEFAULT_HEDGE_MAX_RATIO)),
+    )
+
+
+# boto3 の読み込みとクライアントの作成には時間がかかるため、最初に使うときに作る
+_shared: BedrockClient | None = None
+_shared_lock = threading.Lock()
+
+
+def get_bedrock_client() -> BedrockClient:
+    """プロセス内で共有する bedrock-runtime クライアント（最初の呼び出し時に作る）"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = create_bedrock_client()
+        return _shared
@@ -0,0 +1,168 @@
+import json
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from prompt_cache import cache_usage
+
+
+@dataclass
+class TurnMetrics:
+    """1回の推論（ターン）のレイテンシ計測結果"""
+
+    mode: str
+    total_latency: float  # 秒
+    time_to_first_token: float | None  # 秒（テキストが返らなかった場合は None）
+    output_tokens: int
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+
+    @property
+    def tokens_per_sec(self) -> float:
+        if self.total_latency <= 0:
+            return 0.0
+        return self.output_tokens / self.total_latency
+
+    def summary(self) -> str:
+        ttft = (
+            f"{self.time_to_first_token * 1000:.0f}ms"
+            if self.time_to_first_token is not None
+            else "N/A"
+        )
+        return (
+            f"[{self.mode}] TTFT={ttft} "
+            f"total={self.total_latency * 1000:.0f}ms "
+            f"output_tokens={self.output_tokens} "
+            f"({self.tokens_per_sec:.1f} tokens/sec) "
+            f"cache_read={self.cache_read_tokens} "
+            f"cache_write={self.cache_write_tokens}"
+        )
+
+
+def converse_blocking(client, **kwargs) -> tuple[dict, TurnMetrics]:
+    """client.converse を呼び出し、レスポンスと計測結果を返す
+
+    ブロッキング呼び出しでは全文が返るまで何も表示できないため、
+    TTFT は全体のレイテンシと同じになる。
+    """
+    start = time.perf_counter()
+    response = client.converse(**kwargs)
+    elapsed = time.perf_counter() - start
+
+    content = response["output"]["message"].get("content", [])
+    has_text = any("text" in c for c in content)
+    usage = response.get("usage", {})
+    cache_read, cache_write = cache_usage(usage)
+    metrics = TurnMetrics(
+        mode="blocking",
+        total_latency=elapsed,
+        time_to_first_token=elapsed if has_text else None,
+        output_tokens=usage.get("outputTokens", 0),
+        cache_read_tokens=cache_read,
+        cache_write_tokens=cache_write,
+    )
+    return response, metrics
+
+
+def converse_streaming(
+    client,
+    on_text: Callable[[str], None] | None = None,
+    **kwargs,
+) -> tuple[dict, TurnMetrics]:
+    """client.converse_stream を呼び出し、テキストの差分を届いた順に on_text へ渡す
+
+    戻り値のレスポンスは client.converse と同じ形
+    （output.message / stopReason / usage）に組み立て直す。
+    toolUse の input はJSON文字列の断片として届くため、ブロック終了時に連結してパースする。
+    """
+    start = time.perf_counter()
+    first_token_at: float | None = None
+
+    response = client.converse_stream(**kwargs)
+
+    role = "assistant"
+    blocks: dict[int, dict] = {}  # contentBlockIndex -> 組み立て中のブロック
+    stop_reason = None
+    usage: dict = {}
+    metrics: dict = {}
+    delta_count = 0
+
+    for event in response["stream"]:
+        if "messageStart" in event:
+            role = event["messageStart"].get("role", role)
+
+        elif "contentBlockStart" in event:
+            index = event["contentBlockStart"]["contentBlockIndex"]
+            started = event["contentBlockStart"].get("start", {})
+            if "toolUse" in started:
+                blocks[index] = {
+                    "toolUse": {
+                        "toolUseId": started["toolUse"]["toolUseId"],
+                        "name": started["toolUse"]["name"],
+                    },
+                    "_input_chunks": [],
+                }
+
+        elif "contentBlockDelta" in event:
+            index = event["contentBlockDelta"]["contentBlockIndex"]
+            delta = event["contentBlockDelta"]["delta"]
+            delta_count += 1
+
+            if "text" in delta:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                block = blocks.setdefault(index, {"text": ""})
+                block["text"] += delta["text"]
+                if on_text:
+                    on_text(delta["text"])
+
+            elif "toolUse" in delta:
+                block = blocks.setdefault(
+                    index, {"toolUse": {}, "_input_chunks": []}
+                )
+                block["_input_chunks"].append(delta["toolUse"].get("input", ""))
+
+        elif "contentBlockStop" in event:
+            index = event["contentBlockStop"]["contentBlockIndex"]
+            block = blocks.get(index)
+            if block and "_input_chunks" in block:
+                raw = "".join(block.pop("_input_chunks"))
+                block["toolUse"]["input"] = json.loads(raw) if raw else {}
+
+        elif "messageStop" in event:
+            stop_reason = event["messageStop"].get("stopReason")
+
+        elif "metadata" in event:
+            usage = event["metadata"].get("usage", {})
+            metrics = event["metadata"].get("metrics", {})
+
+    elapsed = time.perf_counter() - start
+
+    content = []
+    for index in sorted(blocks):
+        block = blocks[index]
+        # contentBlockStop が届かなかった場合に備えて、残っている断片も処理する
+        if "_input_chunks" in block:
+            raw = "".join(block.pop("_input_chunks"))
+            block["toolUse"]["input"] = json.loads(raw) if raw else {}
+        content.append(block)
+
+    assembled = {
+        "output": {"message": {"role": role, "content": content}},
+        "stopReason": stop_reason,
+        "usage": usage,
+        "metrics": metrics,
+    }
+    cache_read, cache_write = cache_usage(usage)
+    turn_metrics = TurnMetrics(
+        mode="streaming",
+        total_latency=elapsed,
+        time_to_first_token=(
+            first_token_at - start if first_token_at is not None else None
+        ),
+        # usage が返らないスタブ等では差分イベント数で近似する
+        output_tokens=usage.get("outputTokens", delta_count),
+        cache_read_tokens=cache_read,
+        cache_write_tokens=cache_write,
+    )
+    return assembled, turn_metrics
@@ -0,0 +1,190 @@
+"""answer_cache.py の CachedGraph で、繰り返される質問にかかる時間がどれだけ減るかを測るベンチマーク
+
+create_agent.py のグラフ（agent / ToolNode）を、スクリプトされた LLM（--llm-latency 秒）と
+スタブのツール（--tool-latency 秒）で実行する。質問は少数の調査依頼とその言い換え
+（表記ゆれ・語尾の違い）を --questions 件になるまで繰り返す。
+ - no cache:  毎回グラフを実行する
+ - exact:     正規化した質問の一致だけを使う（threshold=1.0）
+ - near:      MinHash による、ほぼ同じ質問の検索も使う（--threshold）
+あわせて、Functional API の async_agent（承認の interrupt あり）でも、再開して終わった回答が
+保存され、同じ依頼では interrupt なしで回答が返ることを確かめる。
+
+実行例:
+  python benchmarks/bench_answer_cache.py
+  python benchmarks/bench_answer_cache.py --questions 40 --threshold 0.6
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(REPO_ROOT, "lang-graph", "functional_api_agent"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "lang-graph"))
+sys.path.insert(0, REPO_ROOT)
+# 各エージェントの読み込み時に作るクライアント用（実際には呼び出さない）
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from langgraph.types import Command  # noqa: E402
+
+import agent_core  # noqa: E402
+import create_agent  # noqa: E402
+from answer_cache import (  # noqa: E402
+    AnswerCache,
+    CachedGraph,
+    jaccard,
+    normalize_question,
+    shingles,
+)
+from fake_models import Script, ScriptedChatModel, langchain_stub_tool  # noqa: E402
+
+# (元の質問, 言い換え) の組
+QUESTIONS = [
+    ("LangGraphの基本を優しく解説して", "LangGraph の基本を優しく解説してください"),
+    (
+        "Amazon Bedrockで利用可能なモデルプロバイダーを教えてください。",
+        "Amazon Bedrock で利用可能なモデルプロバイダーを教えて",
+    ),
+    ("ＡＷＳ Lambda の料金体系を調べて", "AWS Lambdaの料金体系を調べて！"),
+    ("Strands Agents と LangGraph の違いは？", "StrandsAgentsとLangGraphの違いは"),
+]
+
+
+def workload(count: int) -> list[str]:
+    """元の質問 → 言い換え → 元の質問 ... の順に count 件"""
+    questions = []
+    for i in range(count):
+        original, paraphrase = QUESTIONS[i % len(QUESTIONS)]
+        questions.append(paraphrase if (i // len(QUESTIONS)) % 2 else original)
+    return questions
+
+
+def research_graph(args, script: Script):
+    params = {create_agent.web_search_tool_name: ["query"], "send_aws_sns": ["text"]}
+    create_agent.tools = [
+        langchain_stub_tool(name, p, args.tool_latency) for name, p in params.items()
+    ]
+    create_agent.llm_with_tools = ScriptedChatModel(script=script).bind_tools([])
+    create_agent.tool_cache.clear()
+    return create_agent.build_graph()
+
+
+async def run(args, threshold: float | None) -> tuple[float, Script, AnswerCache | None]:
+    script = Script(
+        [create_agent.web_search_tool_name],
+        tool_rounds=args.rounds,
+        latency=args.llm_latency,
+    )
+    graph = research_graph(args, script)
+    cache = None
+    if threshold is not None:
+        cache = AnswerCache(threshold=threshold, allow_side_effects=True)
+        graph = CachedGraph(graph, cache, side_effects=True)
+
+    started = time.perf_counter()
+    for question in workload(args.questions):
+        await graph.ainvoke({"messages": [HumanMessage(content=question)]})
+    return (time.perf_counter() - started) * 1000, script, cache
+
+
+def check_different_questions(threshold: float):
+    """数字やサービス名だけが違う質問と、別のエージェントの回答は返さない"""
+    cache = AnswerCache(threshold=threshold)
+    pairs = [
+        (
+            "2024年の AWS re:Invent で発表された Amazon Bedrock の新機能と料金の変更点をまとめて",
+            "2025年の AWS re:Invent で発表された Amazon Bedrock の新機能と料金の変更点をまとめて",
+        ),
+        (
+            "Amazon ECS でコンテナを動かす場合のタスクの料金体系とスケーリングの設定方法を調べて",
+            "Amazon EKS でコンテナを動かす場合のタスクの料金体系とスケーリングの設定方法を調べて",
+        ),
+    ]
+    for cached, asked in pairs:
+        cache.put(cached, {"answer": cached}, namespace="create_agent")
+        # 文字 n-gram だけなら、ほぼ同じ質問とみなされる組
+        similarity = jaccard(shingles(normalize_question(cached)), shingles(normalize_question(asked)))
+        assert similarity >= min(threshold, 0.85), similarity
+        assert cache.get(asked, namespace="create_agent") is None, asked
+        assert cache.get(cached, namespace="mcp_agent") is None, cached
+        assert cache.get(cached, namespace="create_agent")[0] == "exact"
+    # 表記ゆれだけの言い換えは、引き続きほぼ同じ質問として返す
+    original, paraphrase = QUESTIONS[3]
+    cache.put(original, {"answer": original}, namespace="create_agent")
+    assert cache.get(paraphrase, namespace="create_agent")[0] == "near"
+    print("数字・サービス名だけが違う質問 / 別の namespace: キャッシュを使わない（OK）")
+
+
+def check_functional(threshold: float):
+    """承認の interrupt を挟む async_agent でも、再開後の回答が保存されて使われるか"""
+    script = Script([agent_core.web_search_name], tool_rounds=1)
+    agent_core.llm_with_tools = ScriptedChatModel(script=script).bind_tools([])
+    agent_core.tools = [langchain_stub_tool(agent_core.web_search_name, ["query"], 0.0)]
+    agent_core.tools_by_name = {tool.name: tool for tool in agent_core.tools}
+    agent_core.tool_cache.clear()
+    cache = AnswerCache(threshold=threshold, allow_side_effects=True)
+    agent = agent_core.SyncAgent(
+        CachedGraph(
+            agent_core.async_agent,
+            cache,
+            side_effects=True,
+            resume_cacheable=agent_core.all_approved,
+        )
+    )
+
+    def ask(question: str, resume: str) -> tuple[int, str]:
+        config = {"configurable": {"thread_id": uuid.uuid4().hex}}
+        interrupts, answer = 0, None
+        agent_input = [HumanMessage(content=question)]
+        while True:
+            waiting = False
+            for chunk in agent.stream(agent_input, config=config, stream_mode="updates"):
+                if "__interrupt__" in chunk:
+                    interrupts += 1
+                    waiting = True
+                elif "async_agent" in chunk:
+                    answer = chunk["async_agent"].content
+            if not waiting:
+                return interrupts, answer
+            agent_input = Command(resume=resume)
+
+    denied = ask("LangGraphの基本を解説して", "DENY")
+    after_deny = ask("LangGraphの基本を解説して", "APPROVE")
+    cached = ask("LangGraph の基本を解説してください", "APPROVE")
+    print("\nFunctional API（承認あり）")
+    print(f"  拒否して回答           interrupt {denied[0]} 回（保存しない）")
+    print(f"  承認して回答           interrupt {after_deny[0]} 回（保存する）")
+    print(f"  言い換えた同じ依頼     interrupt {cached[0]} 回  同じ回答: {cached[1] == after_deny[1]}")
+    print(f"  {cache.summary()}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=24)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--tool-latency", type=float, default=0.05)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    args = parser.parse_args()
+
+    print(
+        f"質問 {args.questions} 件（異なる依頼 {len(QUESTIONS)} 件 × 言い換え）/ ツール {args.rounds} ラウンド"
+        f" / LLM {args.llm_latency * 1000:.0f}ms / ツール {args.tool_latency * 1000:.0f}ms"
+    )
+    for label, threshold in [("no cache", None), ("exact", 1.0), ("near", args.threshold)]:
+        elapsed_ms, script, cache = asyncio.run(run(args, threshold))
+        print(f"  {label:<9} {elapsed_ms:>8.1f}ms  LLM {script.calls:>3} 回")
+        if cache is not None:
+            print(f"            {cache.summary()}")
+
+    check_different_questions(args.threshold)
+    check_functional(args.threshold)
+
+
+if __name__ == "__main__":
+    main()
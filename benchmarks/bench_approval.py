@@ -0,0 +1,110 @@
+"""ツール呼び出しの承認を1件ずつ行う場合と、まとめて行う場合を比較するベンチマーク
+
+functional_api_agent/agent_core.py の agent を、決まった応答を返す LLM と待ち時間だけの
+ツールに差し替えて実行する。LLM は1ターン目に --tools 個のツールを同時に呼び出し、
+2ターン目で最終回答を返す。
+ - per_call: ツール呼び出しごとに interrupt（従来）
+ - batch:    1回の interrupt ですべてのツール呼び出しを承認
+
+それぞれ interrupt からの再開回数と、開始から最終回答までの時間を計測する。
+--human-delay で、画面で承認ボタンを押すまでの時間（1回のやり取りごと）も加算できる。
+
+実行例: python benchmarks/bench_approval.py --tools 3 --human-delay 2.0
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "lang-graph", "functional_api_agent")
+)
+# agent_core の読み込み時に作るクライアント用（実際には呼び出さない）
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langchain_core.tools import tool  # noqa: E402
+from langgraph.types import Command  # noqa: E402
+
+import agent_core  # noqa: E402
+
+LLM_LATENCY = 0.3
+TOOL_LATENCY = 0.2
+
+
+class ScriptedLLM:
+    """1回目は n 個のツール呼び出し、2回目は最終回答を返す LLM"""
+
+    def __init__(self, n_tools: int):
+        self.n_tools = n_tools
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(LLM_LATENCY)
+        if not any(isinstance(m, AIMessage) for m in messages):
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {"name": "web_search", "args": {"query": f"検索 {i}"}, "id": f"call_{i}"}
+                    for i in range(self.n_tools)
+                ],
+            )
+        return AIMessage(content="調査結果のまとめです。")
+
+
+@tool
+async def fake_web_search(query: str) -> str:
+    """Web検索の代わりに待つだけのツール"""
+    await asyncio.sleep(TOOL_LATENCY)
+    return f"{query} の検索結果"
+
+
+def run(mode: str, n_tools: int, human_delay: float) -> tuple[int, float]:
+    agent_core.batch_approval = mode == "batch"
+    agent_core.llm_with_tools = ScriptedLLM(n_tools)
+    agent_core.tools_by_name = {"web_search": fake_web_search}
+    agent_core.tool_cache.clear()
+
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    agent_input = [HumanMessage(content="LangGraph について調べて")]
+    resumes = 0
+    start = time.perf_counter()
+    while True:
+        interrupt_value = None
+        for chunk in agent_core.agent.stream(agent_input, config=config, stream_mode="updates"):
+            if "__interrupt__" in chunk:
+                interrupt_value = chunk["__interrupt__"][0].value
+        if interrupt_value is None:
+            break
+        # 承認画面でユーザーがボタンを押すまでの時間
+        time.sleep(human_delay)
+        if "tool_calls" in interrupt_value:
+            agent_input = Command(
+                resume={call["id"]: "APPROVE" for call in interrupt_value["tool_calls"]}
+            )
+        else:
+            agent_input = Command(resume="APPROVE")
+        resumes += 1
+    return resumes, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tools", type=int, default=3)
+    parser.add_argument("--human-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    print(
+        f"ツール呼び出し {args.tools} 件 / LLM {LLM_LATENCY * 1000:.0f}ms / "
+        f"ツール {TOOL_LATENCY * 1000:.0f}ms / 承認操作 {args.human_delay * 1000:.0f}ms"
+    )
+    for mode in ("per_call", "batch"):
+        resumes, elapsed = run(mode, args.tools, args.human_delay)
+        print(f"  {mode:<9} 再開 {resumes} 回  {elapsed * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
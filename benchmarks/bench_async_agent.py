@@ -0,0 +1,130 @@
+"""承認されたツール呼び出しを1件ずつ実行する場合と、同時に実行する場合を比較するベンチマーク
+
+functional_api_agent/agent_core.py の async_agent を、決まった応答を返す LLM と待ち時間だけの
+ツールに差し替えて astream で実行する。LLM は1ターン目に --tools 個のツールを同時に呼び出し、
+2ターン目で最終回答を返す。ツール呼び出しは1回の interrupt でまとめて承認する。
+ - sequential: ツールが共有のロックを取ってから待つ（1件ずつ実行した場合と同じ）
+ - concurrent: asyncio.gather でそのまま同時に実行する（async_agent の動作）
+
+あわせて、1件だけ応答が返らないツールがあっても tool_timeouts の秒数で打ち切られ、
+エラーの ToolMessage を返して最終回答まで進むことを確認する。
+
+実行例: python benchmarks/bench_async_agent.py --tools 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "lang-graph", "functional_api_agent")
+)
+# agent_core の読み込み時に作るクライアント用（実際には呼び出さない）
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage  # noqa: E402
+from langchain_core.tools import tool  # noqa: E402
+from langgraph.types import Command  # noqa: E402
+
+import agent_core  # noqa: E402
+
+LLM_LATENCY = 0.3
+TOOL_LATENCY = 0.5
+HUNG_TOOL_LATENCY = 60
+TIMEOUT = 1.0
+
+
+class ScriptedLLM:
+    """1回目は n 個のツール呼び出し、2回目は最終回答を返す LLM"""
+
+    def __init__(self, n_tools: int):
+        self.n_tools = n_tools
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(LLM_LATENCY)
+        if not any(isinstance(m, AIMessage) for m in messages):
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {"name": "web_search", "args": {"query": f"検索 {i}"}, "id": f"call_{i}"}
+                    for i in range(self.n_tools)
+                ],
+            )
+        return AIMessage(content="調査結果のまとめです。")
+
+
+def fake_web_search(serialize: bool = False, hung_query: str | None = None):
+    lock = asyncio.Lock() if serialize else None
+
+    @tool
+    async def web_search(query: str) -> str:
+        """Web検索の代わりに待つだけのツール"""
+        latency = HUNG_TOOL_LATENCY if query == hung_query else TOOL_LATENCY
+        if lock is None:
+            await asyncio.sleep(latency)
+        else:
+            async with lock:
+                await asyncio.sleep(latency)
+        return f"{query} の検索結果"
+
+    return web_search
+
+
+async def run(n_tools: int, web_search) -> tuple[float, list[ToolMessage]]:
+    agent_core.batch_approval = True
+    agent_core.llm_with_tools = ScriptedLLM(n_tools)
+    agent_core.tools_by_name = {"web_search": web_search}
+    agent_core.tool_cache.clear()
+
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    agent_input = [HumanMessage(content="LangGraph について調べて")]
+    tool_messages: list[ToolMessage] = []
+    start = time.perf_counter()
+    while True:
+        interrupt_value = None
+        async for chunk in agent_core.async_agent.astream(
+            agent_input, config=config, stream_mode="updates"
+        ):
+            if "__interrupt__" in chunk:
+                interrupt_value = chunk["__interrupt__"][0].value
+            elif "use_tool" in chunk:
+                tool_messages.append(chunk["use_tool"])
+        if interrupt_value is None:
+            break
+        agent_input = Command(
+            resume={call["id"]: "APPROVE" for call in interrupt_value["tool_calls"]}
+        )
+    return time.perf_counter() - start, tool_messages
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tools", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"ツール呼び出し {args.tools} 件 / LLM {LLM_LATENCY * 1000:.0f}ms / "
+        f"ツール {TOOL_LATENCY * 1000:.0f}ms"
+    )
+    sequential, _ = await run(args.tools, fake_web_search(serialize=True))
+    concurrent, _ = await run(args.tools, fake_web_search())
+    print(f"  sequential  {sequential * 1000:>8.1f}ms")
+    print(f"  concurrent  {concurrent * 1000:>8.1f}ms  ({sequential / concurrent:.1f}x)")
+
+    # 1件だけ応答が返らないツールがあっても、タイムアウトで打ち切って最終回答まで進む
+    agent_core.tool_timeouts["web_search"] = TIMEOUT
+    elapsed, tool_messages = await run(args.tools, fake_web_search(hung_query="検索 0"))
+    errors = [m for m in tool_messages if m.status == "error"]
+    assert len(tool_messages) == args.tools and len(errors) == 1, tool_messages
+    print(
+        f"タイムアウト: OK（{HUNG_TOOL_LATENCY}秒かかるツール1件を {TIMEOUT * 1000:.0f}ms で打ち切り、"
+        f"全体 {elapsed * 1000:.1f}ms）"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
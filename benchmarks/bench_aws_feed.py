@@ -0,0 +1,191 @@
+"""get_aws_updates の従来実装と AwsFeedStore のレイテンシを比較するベンチマーク
+
+ローカルに What's New フィードの代わりとなる HTTP サーバーを立て、--entries 件のエントリを
+持つ RSS（本物より大きいフィクスチャ）を返す。以下を計測する。
+ - uncached:   従来実装（毎回 feedparser.parse(url) でダウンロード・パースし、タイトルを先頭から調べる）
+ - cold:       空の AwsFeedStore からの初回検索（ダウンロード・パース・索引の作成を含む）
+ - warm:       索引からの検索
+ - warm-since: since で日付を絞り込んだ検索
+ - disk:       プロセス再起動を想定し、ディスクキャッシュから読み込んだ初回の検索
+ - revalidate: 条件付きGET（304）での再取得
+ - merge:      新しいエントリが追加されたフィードを再取得し、差分だけを索引に追加する
+
+実行例: python benchmarks/bench_aws_feed.py --entries 5000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "strands"))
+
+import feedparser  # noqa: E402
+
+from aws_feed import AwsFeedStore  # noqa: E402
+
+SERVICES = [
+    "Amazon ECS",
+    "Amazon EC2",
+    "AWS Lambda",
+    "Amazon S3",
+    "Amazon Bedrock",
+    "Amazon RDS",
+    "AWS Fargate",
+    "Amazon CloudWatch",
+    "Amazon EKS",
+    "AWS Step Functions",
+]
+FEATURES = ["now supports", "adds", "announces", "is now available in", "expands"]
+START = time.time()
+# 追加のエントリ（merge）も含めて一番新しいエントリの id（main で設定する）
+LATEST_ID = 0
+
+
+def make_feed(n: int, first_id: int = 0) -> bytes:
+    """新しい順に n 件のエントリを持つ RSS（id が LATEST_ID のエントリを最新として、1時間ごとに公開された想定）"""
+    items = []
+    for i in range(first_id + n - 1, first_id - 1, -1):
+        service = SERVICES[i % len(SERVICES)]
+        feature = FEATURES[i % len(FEATURES)]
+        title = f"{service} {feature} feature {i}"
+        items.append(
+            "<item>"
+            f"<guid>whats-new-{i}</guid>"
+            f"<title>{escape(title)}</title>"
+            f"<link>https://aws.amazon.com/about-aws/whats-new/{i}/</link>"
+            f"<pubDate>{formatdate(START - (LATEST_ID - i) * 3600, usegmt=True)}</pubDate>"
+            f"<description>{escape(title)} の詳細です。</description>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        "<title>Recent Announcements</title>" + "".join(items) + "</channel></rss>"
+    ).encode("utf-8")
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    body = b""
+    etag = '"v1"'
+    requests_served = 0
+
+    def do_GET(self):
+        FeedHandler.requests_served += 1
+        # 実ネットワークの往復を模した遅延
+        time.sleep(0.02)
+        if self.headers.get("If-None-Match") == FeedHandler.etag:
+            self.send_response(304)
+            self.send_header("ETag", FeedHandler.etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("Content-Length", str(len(FeedHandler.body)))
+        self.send_header("ETag", FeedHandler.etag)
+        self.end_headers()
+        self.wfile.write(FeedHandler.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def uncached_lookup(url: str, service_name: str) -> list[dict]:
+    """従来の get_aws_updates と同じ処理"""
+    feed = feedparser.parse(url)
+    result = []
+    for entry in feed.entries:
+        if service_name.lower() in entry.title.lower():
+            result.append(
+                {"published": entry.get("published", "N/A"), "summary": entry.get("summary", "")}
+            )
+            if len(result) >= 3:
+                break
+    return result
+
+
+def measure(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name: str, samples: list[float]):
+    print(
+        f"{name:<12} n={len(samples):<5} "
+        f"median={statistics.median(samples):9.3f}ms "
+        f"max={max(samples):9.3f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=5000)
+    args = parser.parse_args()
+
+    global LATEST_ID
+    LATEST_ID = args.entries + 49
+    FeedHandler.body = make_feed(args.entries)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/feed/"
+    print(f"フィード: {args.entries} 件 / {len(FeedHandler.body) / 1024:.0f}KB")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "feed.json")
+
+        report("uncached", measure(lambda: uncached_lookup(url, "ECS"), 5))
+
+        cold = []
+        for i in range(5):
+            store = AwsFeedStore(url=url, cache_path=os.path.join(tmp, f"cold-{i}.json"))
+            cold.extend(measure(lambda: store.search("ECS"), 1))
+        report("cold", cold)
+
+        store = AwsFeedStore(url=url, cache_path=cache_path)
+        # 結果は従来実装と同じ（新しい順に3件）
+        expected = [r["summary"] for r in uncached_lookup(url, "ECS")]
+        assert [r["summary"] for r in store.search("ECS")] == expected
+        report("warm", measure(lambda: store.search("ECS"), 10000))
+        report("warm-multi", measure(lambda: store.search("Step Functions"), 10000))
+        # 最初のフィードの最新のエントリは LATEST_ID - 50（50時間前）
+        since = time.strftime("%Y-%m-%d", time.gmtime(START - 5 * 24 * 3600))
+        recent = store.search("Lambda", since=since, limit=100)
+        report("warm-since", measure(lambda: store.search("Lambda", since=since), 10000))
+        print(f"  (since={since}: Lambda {len(recent)} 件)")
+
+        disk = []
+        for _ in range(5):
+            reloaded = AwsFeedStore(url=url, cache_path=cache_path)
+            disk.extend(measure(lambda: reloaded.search("ECS"), 1))
+        report("disk", disk)
+
+        before = FeedHandler.requests_served
+        report("revalidate", measure(store.refresh, 5))
+        print(f"  (304: {store.stats['not_modified']} / リクエスト {FeedHandler.requests_served - before})")
+
+        # 50件の新しいエントリが追加されたフィード（古い方は押し出される）
+        FeedHandler.body = make_feed(args.entries, first_id=50)
+        FeedHandler.etag = '"v2"'
+        added = []
+        report("merge", measure(lambda: added.append(store.refresh()), 1))
+        assert added == [50] and len(store) == args.entries + 50
+        # 追加されたエントリも索引から引ける（ECS は id が10の倍数のエントリ）
+        newest = (args.entries + 49) // 10 * 10
+        assert store.search("ECS")[0]["title"].endswith(f"feature {newest}")
+        print(f"  (追加 {added[0]} 件 / 合計 {len(store)} 件)")
+
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""バッチ実行のスループットが並列数とレート制限でどう変わるかを測るベンチマーク
+
+グラフの代わりに、Bedrock のリミッターを通って一定時間待つだけのスタブを使う。
+並列数を上げるとスループットが伸び、レート制限に達したところで頭打ちになる。
+
+実行例: python benchmarks/bench_batch_runner.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lang-graph"))
+
+from batch_runner import run_batch  # noqa: E402
+from rate_limit import configure_limiter, limiter  # noqa: E402
+
+QUESTIONS = 40
+MODEL_LATENCY = 0.2  # 1回の推論の所要時間（秒）
+STEPS = 2  # 1件あたりの推論回数（ツール呼び出し→最終回答）
+
+
+class Message:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class StubGraph:
+    async def ainvoke(self, state: dict, config=None, **kwargs) -> dict:
+        for _ in range(STEPS):
+            await limiter("bedrock").acquire()
+            await asyncio.sleep(MODEL_LATENCY)
+        return {"messages": state["messages"] + [Message("回答")]}
+
+
+async def measure(concurrency: int, bedrock_rps: float) -> dict:
+    configure_limiter("bedrock", bedrock_rps)
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "questions.jsonl")
+        output_path = os.path.join(tmp, "results.jsonl")
+        with open(input_path, "w", encoding="utf-8") as f:
+            for i in range(QUESTIONS):
+                f.write(json.dumps({"id": i, "question": f"質問{i}"}) + "\n")
+        summary = await run_batch(StubGraph(), input_path, output_path, concurrency)
+        # 失敗した件数をスループットとして数えないよう、すべて成功したことを確かめる
+        with open(output_path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        failed = [r for r in records if r["status"] != "ok"]
+        assert len(records) == QUESTIONS and not failed, f"失敗した質問があります: {failed[:3]}"
+        return summary
+
+
+def main():
+    results = []
+    for bedrock_rps in (0, 20):
+        for concurrency in (1, 2, 4, 8, 16):
+            summary = asyncio.run(measure(concurrency, bedrock_rps))
+            results.append((bedrock_rps, concurrency, summary["throughput_per_min"]))
+
+    print()
+    for bedrock_rps, concurrency, throughput in results:
+        limit = f"{bedrock_rps}rps" if bedrock_rps else "無制限"
+        print(f"bedrock={limit:<6} concurrency={concurrency:<3} {throughput:8.1f} 件/分")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""bedrock_client.py のクライアントの設定ごとに、スロットリングと遅い応答への強さを比べるベンチマーク
+
+stub_bedrock_server.py の HTTP サーバー（同時処理数 --capacity を超えると 429 ThrottlingException、
+--tail-rate の割合で --tail-latency 秒かかる / --throttle-rate の割合でランダムに 429）に、--threads 本のスレッドから合計 --requests 件の
+converse を送る。boto3 のクライアントは endpoint_url でこのサーバーに向けるので、リトライや
+接続プールも実際の呼び出しと同じように動く。
+ - default:  boto3 の既定の設定（legacy リトライ最大5回・接続プール10本 / 変更前の main.py と同じ）
+ - adaptive: client_config()（adaptive リトライ・接続プール50本）
+ - limited:  adaptive に加えて、同時実行数を --capacity に制限する
+ - hedged:   limited に加えて、p95 を過ぎても返らないリクエストをもう1つ送る
+あわせて、LangChain の ChatBedrockConverse に共有のクライアントを渡して呼べることと、
+converse_stream のストリームを読んでいる間も同時実行数の制限が効くことを確かめる。
+
+実行例:
+  python benchmarks/bench_bedrock_client.py
+  python benchmarks/bench_bedrock_client.py --requests 400 --threads 64 --capacity 16
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# スタブのサーバーに送るだけなので、認証情報はダミーでよい
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "dummy")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "dummy")
+
+import boto3  # noqa: E402
+
+from bedrock_client import BedrockClient, create_bedrock_client  # noqa: E402
+from stub_bedrock_server import FaultyBedrockServer  # noqa: E402
+from tracing import percentile  # noqa: E402
+
+MODEL_ID = "global.anthropic.claude-opus-4-5-20251101-v1:0"
+REGION = "us-east-1"
+
+
+def converse_once(client) -> tuple[bool, float]:
+    started = time.perf_counter()
+    try:
+        client.converse(
+            modelId=MODEL_ID, messages=[{"role": "user", "content": [{"text": "hello"}]}]
+        )
+        ok = True
+    except Exception:
+        ok = False
+    return ok, (time.perf_counter() - started) * 1000
+
+
+def run(client, args) -> dict:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(lambda _: converse_once(client), range(args.requests)))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(ms for ok, ms in results if ok)
+    return {
+        "ok": len(latencies),
+        "failed": len(results) - len(latencies),
+        "elapsed_s": elapsed,
+        "p50": percentile(latencies, 50) if latencies else None,
+        "p95": percentile(latencies, 95) if latencies else None,
+        "p99": percentile(latencies, 99) if latencies else None,
+    }
+
+
+def fmt(value: float | None) -> str:
+    return "-" if value is None else f"{value:.0f}"
+
+
+def check_langchain(server: FaultyBedrockServer):
+    """ChatBedrockConverse に共有のクライアント（BedrockClient）を渡して呼べるか"""
+    from langchain.chat_models import init_chat_model
+
+    client = create_bedrock_client(region=REGION, endpoint_url=server.url)
+    llm = init_chat_model(model=MODEL_ID, model_provider="bedrock_converse", client=client)
+    response = llm.invoke("hello")
+    print(f"\nChatBedrockConverse: {response.content!r}  {client.summary()}")
+
+
+def check_stream_limit(limit: int = 2, streams: int = 6, duration: float = 0.2):
+    """converse_stream のストリームを読んでいる間も、同時実行数の制限が効いているか"""
+    reading = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def events():
+        with lock:
+            reading["now"] += 1
+            reading["max"] = max(reading["max"], reading["now"])
+        try:
+            for _ in range(4):
+                time.sleep(duration / 4)
+                yield {"contentBlockDelta": {"contentBlockIndex": 0, "delta": {"text": "a "}}}
+        finally:
+            with lock:
+                reading["now"] -= 1
+
+    raw = boto3.client("bedrock-runtime", region_name=REGION, endpoint_url="http://127.0.0.1:9")
+    # ヘッダーが届いた時点で返る converse_stream の代わり（本文はあとから読む）
+    raw.converse_stream = lambda **kwargs: {"stream": events()}
+    client = BedrockClient(raw, max_concurrency=limit)
+
+    def read_stream(_):
+        response = client.converse_stream(modelId=MODEL_ID, messages=[])
+        return sum(1 for _ in response["stream"])
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=streams) as pool:
+        list(pool.map(read_stream, range(streams)))
+    elapsed = time.perf_counter() - started
+
+    # 途中で閉じたストリームの枠も返ること
+    response = client.converse_stream(modelId=MODEL_ID, messages=[])
+    next(iter(response["stream"]))
+    response["stream"].close()
+    assert client.limiter.in_flight == 0, client.limiter.in_flight
+    assert reading["max"] <= limit, f"{reading['max']} 本のストリームを同時に読んだ"
+    assert client.limiter.waited >= streams - limit, client.limiter.waited
+    print(
+        f"\nconverse_stream: {streams} 本 / 制限 {limit} -> 同時に読んだ最大 {reading['max']} 本、"
+        f"待った {client.limiter.waited} 本、{elapsed:.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--capacity", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--tail-rate", type=float, default=0.05)
+    parser.add_argument("--tail-latency", type=float, default=1.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FaultyBedrockServer(
+        latency=args.latency,
+        tail_rate=args.tail_rate,
+        tail_latency=args.tail_latency,
+        throttle_rate=args.throttle_rate,
+        capacity=args.capacity,
+    ).start()
+    print(
+        f"{args.requests} 件 / {args.threads} スレッド / サーバーの同時処理数 {args.capacity} / "
+        f"応答 {args.latency * 1000:.0f}ms（{args.tail_rate:.0%} は {args.tail_latency * 1000:.0f}ms）/ "
+        f"ランダムな 429 {args.throttle_rate:.0%}"
+    )
+    print(
+        f"  {'client':<9} {'ok':>5} {'failed':>6} {'time(s)':>8} {'p50(ms)':>8} {'p95(ms)':>8} "
+        f"{'p99(ms)':>8} {'429s':>6} {'slow':>5}"
+    )
+
+    scenarios = {
+        "default": lambda: boto3.client("bedrock-runtime", region_name=REGION, endpoint_url=server.url),
+        "adaptive": lambda: create_bedrock_client(
+            region=REGION, endpoint_url=server.url, max_concurrency=0, hedge=False
+        ),
+        "limited": lambda: create_bedrock_client(
+            region=REGION, endpoint_url=server.url, max_concurrency=args.capacity, hedge=False
+        ),
+        "hedged": lambda: create_bedrock_client(
+            region=REGION, endpoint_url=server.url, max_concurrency=args.capacity, hedge=True
+        ),
+    }
+    clients = {}
+    try:
+        for label, make_client in scenarios.items():
+            client = clients[label] = make_client()
+            server.reset()
+            result = run(client, args)
+            print(
+                f"  {label:<9} {result['ok']:>5} {result['failed']:>6} {result['elapsed_s']:>8.2f} "
+                f"{fmt(result['p50']):>8} {fmt(result['p95']):>8} {fmt(result['p99']):>8} "
+                f"{server.stats['throttled']:>6} {server.stats['slow']:>5}"
+            )
+        for label, client in clients.items():
+            if isinstance(client, BedrockClient):
+                print(f"  {label:<9} {client.summary()}")
+        check_langchain(server)
+        check_stream_limit()
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""チェックポインターの書き込み・再開のコストと保存サイズを比較するベンチマーク
+
+add_messages の StateGraph で 1ターン = HumanMessage + AIMessage（約1KB）の会話を
+TURNS ターン続け、次の値を比較する（LLMは呼ばず、ノードは固定の応答を返す）。
+ - put:      チェックポイント1回の書き込み時間（平均 / 最後の10ターンの平均）
+ - resume:   最新のチェックポイントの読み込み時間（SQLite は開き直してから読む）
+ - bytes/cp: チェックポイント1件あたりの保存サイズ
+
+ - MemorySaver:                 LangGraph 標準（メモリ上、ステップごとに履歴全体を保存）
+ - SqliteDeltaSaver(snapshot=1): 毎回ハッシュのリスト全体を保存
+ - SqliteDeltaSaver(snapshot=20): 差分を保存し、20回ごとに全体を保存
+
+実行例: python benchmarks/bench_checkpointer.py --turns 200
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Annotated, TypedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lang-graph"))
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langgraph.checkpoint.memory import MemorySaver  # noqa: E402
+from langgraph.graph import END, START, StateGraph, add_messages  # noqa: E402
+
+from sqlite_checkpointer import SqliteDeltaSaver  # noqa: E402
+
+ANSWER = "調査結果の要約です。" * 100
+
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+
+
+def agent(state: State):
+    return {"messages": [AIMessage(content=f"{len(state['messages'])}: {ANSWER}")]}
+
+
+def build_graph(checkpointer):
+    builder = StateGraph(State)
+    builder.add_node("agent", agent)
+    builder.add_edge(START, "agent")
+    builder.add_edge("agent", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+class TimedSaver:
+    """put の所要時間を記録するためのラッパー"""
+
+    def __init__(self, saver):
+        self.saver = saver
+        self.put_times: list[float] = []
+        original_put = saver.put
+
+        def put(*args, **kwargs):
+            start = time.perf_counter()
+            result = original_put(*args, **kwargs)
+            self.put_times.append(time.perf_counter() - start)
+            return result
+
+        saver.put = put
+
+
+def run_conversation(saver, turns: int) -> TimedSaver:
+    timed = TimedSaver(saver)
+    graph = build_graph(saver)
+    config = {"configurable": {"thread_id": "bench"}}
+    for i in range(turns):
+        graph.invoke({"messages": [HumanMessage(content=f"質問 {i}")]}, config)
+    return timed
+
+
+def memory_saver_bytes(saver: MemorySaver) -> int:
+    total = 0
+    for namespaces in saver.storage.values():
+        for checkpoints in namespaces.values():
+            for checkpoint, metadata, _ in checkpoints.values():
+                total += len(checkpoint[1]) + len(metadata[1])
+    total += sum(len(blob) for _, blob in saver.blobs.values())
+    for writes in saver.writes.values():
+        total += sum(len(value[1]) for _, _, value, _ in writes.values())
+    return total
+
+
+def bench_memory(turns: int) -> dict:
+    saver = MemorySaver()
+    timed = run_conversation(saver, turns)
+    config = {"configurable": {"thread_id": "bench"}}
+    start = time.perf_counter()
+    saver.get_tuple(config)
+    resume = time.perf_counter() - start
+    return {
+        "put_times": timed.put_times,
+        "resume": resume,
+        "bytes": memory_saver_bytes(saver),
+    }
+
+
+def bench_sqlite(turns: int, snapshot_every: int, directory: str) -> dict:
+    path = os.path.join(directory, f"checkpoints_{snapshot_every}.db")
+    saver = SqliteDeltaSaver(path, snapshot_every=snapshot_every)
+    timed = run_conversation(saver, turns)
+    saver.close()
+
+    # プロセスの再起動を想定し、開き直してから最新のチェックポイントを読む
+    config = {"configurable": {"thread_id": "bench"}}
+    with SqliteDeltaSaver(path) as reopened:
+        start = time.perf_counter()
+        checkpoint = reopened.get_tuple(config)
+        resume = time.perf_counter() - start
+        assert len(checkpoint.checkpoint["channel_values"]["messages"]) == turns * 2
+        size = reopened._database_size()
+    return {"put_times": timed.put_times, "resume": resume, "bytes": size}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = {
+            "MemorySaver": bench_memory(args.turns),
+            "SqliteDeltaSaver(snapshot=1)": bench_sqlite(args.turns, 1, directory),
+            "SqliteDeltaSaver(snapshot=20)": bench_sqlite(args.turns, 20, directory),
+        }
+
+    print(f"{args.turns}ターン（メッセージ {args.turns * 2} 件）")
+    print(
+        f"{'':<30} {'put avg':>10} {'put last10':>11} {'resume':>10} {'bytes/cp':>10} {'total':>12}"
+    )
+    for name, result in results.items():
+        put_times = result["put_times"]
+        count = len(put_times)
+        print(
+            f"{name:<30} "
+            f"{sum(put_times) / count * 1000:>8.2f}ms "
+            f"{sum(put_times[-10:]) / 10 * 1000:>9.2f}ms "
+            f"{result['resume'] * 1000:>8.2f}ms "
+            f"{result['bytes'] / count:>10,.0f} "
+            f"{result['bytes']:>12,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
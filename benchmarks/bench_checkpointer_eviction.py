@@ -0,0 +1,140 @@
+"""会話（スレッド）が増え続けたときのチェックポインターのメモリ使用量を比較するベンチマーク
+
+Streamlit の画面と同じく、会話ごとに新しい uuid4 のスレッドIDで functional_api_agent の
+async_agent を実行する（LLM は決まった応答を返すだけで、ツールは呼び出さない）。
+ - MemorySaver:        すべての会話のチェックポイントが残り続ける
+ - BoundedMemorySaver: 合計サイズが --max-kb を超えたら古い会話から削除し、
+                       --max-idle 秒（時計は進めて模擬する）使われていない会話も削除する
+
+それぞれ残っている会話の数・チェックポイントのサイズ・Python のメモリ確保量（tracemalloc）を表示する。
+あわせて、承認待ち（interrupt）の会話が、合計サイズの上限では削除されずに再開できることを確かめる。
+
+実行例: python benchmarks/bench_checkpointer_eviction.py --sessions 1000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "lang-graph", "functional_api_agent")
+)
+# agent_core の読み込み時に作るクライアント用（実際には呼び出さない）
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langgraph.checkpoint.memory import MemorySaver  # noqa: E402
+from langgraph.func import entrypoint  # noqa: E402
+from langgraph.types import Command, interrupt  # noqa: E402
+
+import agent_core  # noqa: E402
+from bounded_checkpointer import BoundedMemorySaver  # noqa: E402
+
+
+class EchoLLM:
+    """ツールを呼ばずに、長めの最終回答を返す LLM"""
+
+    async def ainvoke(self, messages):
+        return AIMessage(content="調査結果のまとめです。" * 200)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def run(saver, sessions: int, clock: FakeClock | None = None) -> tuple[float, int]:
+    app = agent_core.async_agent.copy(update={"checkpointer": saver})
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(sessions):
+        if clock is not None:
+            # 1秒に1つずつ新しい会話が始まる
+            clock.now += 1
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+        await app.ainvoke([HumanMessage(content=f"質問 {i}")], config=config)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, current
+
+
+def memory_saver_size(saver: MemorySaver) -> tuple[int, int]:
+    size = sum(len(t) + len(b) for t, b in saver.blobs.values())
+    for namespaces in saver.storage.values():
+        for checkpoints in namespaces.values():
+            for checkpoint, metadata, _ in checkpoints.values():
+                size += sum(map(len, checkpoint)) + sum(map(len, metadata))
+    for writes in saver.writes.values():
+        size += sum(len(value[0]) + len(value[1]) for _, _, value, _ in writes.values())
+    return len(saver.storage), size
+
+
+def check_waiting_thread_kept(sessions: int = 50):
+    """承認待ちの会話は、後から始まった会話で合計サイズが上限を超えても削除しない"""
+    clock = FakeClock()
+    saver = BoundedMemorySaver(max_idle=300, max_bytes=16 * 1024, clock=clock)
+
+    @entrypoint(checkpointer=saver)
+    def approval(text: str) -> str:
+        return f"{text}: {interrupt('承認しますか？')}"
+
+    @entrypoint(checkpointer=saver)
+    def answer(text: str) -> str:
+        return text * 20
+
+    waiting = {"configurable": {"thread_id": "waiting"}}
+    approval.invoke("SNS に送信", waiting)
+    for i in range(sessions):
+        clock.now += 1
+        answer.invoke(f"質問 {i}", {"configurable": {"thread_id": f"t{i}"}})
+    assert saver.stats["evicted_bytes"] > 0, saver.stats
+    result = approval.invoke(Command(resume="APPROVE"), waiting)
+    assert result == "SNS に送信: APPROVE", result
+    print(f"  承認待ちの会話: 削除されずに再開できた（{saver.summary()}）")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--max-kb", type=int, default=16384)
+    parser.add_argument("--max-idle", type=float, default=300)
+    args = parser.parse_args()
+
+    agent_core.llm_with_tools = EchoLLM()
+    print(f"{args.sessions} 会話 / 上限 {args.max_kb}KB / アイドル {args.max_idle:.0f}秒")
+
+    saver = MemorySaver()
+    elapsed, allocated = await run(saver, args.sessions)
+    threads, size = memory_saver_size(saver)
+    print(
+        f"  MemorySaver        会話 {threads:>5} 件  {size / 1024:>9.1f}KB  "
+        f"確保 {allocated / 1024 / 1024:>6.1f}MB  {elapsed:.2f}s"
+    )
+
+    clock = FakeClock()
+    bounded = BoundedMemorySaver(
+        max_idle=args.max_idle, max_bytes=args.max_kb * 1024, sweep_interval=10, clock=clock
+    )
+    elapsed, allocated = await run(bounded, args.sessions, clock)
+    metrics = bounded.metrics()
+    # 記録しているサイズが実際の保存内容と一致していること
+    assert memory_saver_size(bounded) == (metrics["live_threads"], metrics["bytes"])
+    print(
+        f"  BoundedMemorySaver 会話 {metrics['live_threads']:>5} 件  "
+        f"{metrics['bytes'] / 1024:>9.1f}KB  確保 {allocated / 1024 / 1024:>6.1f}MB  {elapsed:.2f}s"
+    )
+    print(f"  {bounded.summary()}")
+    check_waiting_thread_kept()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
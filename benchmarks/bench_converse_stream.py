@@ -0,0 +1,61 @@
+"""converse（ブロッキング）と converse_stream（ストリーミング）の比較ベンチマーク
+
+スタブの bedrock-runtime クライアントを使い、同じ応答に対する
+TTFT・総レイテンシ・tokens/sec を並べて表示する。
+
+実行例: python benchmarks/bench_converse_stream.py
+"""
+
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bedrock_stream import converse_blocking, converse_streaming  # noqa: E402
+from stub_bedrock import StubBedrockClient, text_turn, tool_turn  # noqa: E402
+
+ANSWER = " ".join(["2025年7月21日は海の日です。"] * 60)
+SCRIPT = [
+    tool_turn(("tool-1", "get_jp_holiday", {"year": 2025, "month": 7})),
+    text_turn(ANSWER),
+]
+REPEAT = 5
+
+
+def run(mode: str) -> list:
+    client = StubBedrockClient(SCRIPT, first_token_latency=0.3, per_token_latency=0.005)
+    results = []
+    for _ in range(REPEAT * len(SCRIPT)):
+        kwargs = {"modelId": "stub", "messages": []}
+        if mode == "streaming":
+            response, metrics = converse_streaming(client, on_text=None, **kwargs)
+        else:
+            response, metrics = converse_blocking(client, **kwargs)
+        results.append((response, metrics))
+    return results
+
+
+def main():
+    for mode in ("blocking", "streaming"):
+        results = run(mode)
+        text_turns = [m for _, m in results if m.time_to_first_token is not None]
+        tool_inputs = [
+            c["toolUse"]["input"]
+            for r, _ in results
+            for c in r["output"]["message"]["content"]
+            if "toolUse" in c
+        ]
+        assert all(i == {"year": 2025, "month": 7} for i in tool_inputs)
+
+        ttft = statistics.median(m.time_to_first_token for m in text_turns)
+        total = statistics.median(m.total_latency for m in text_turns)
+        tps = statistics.median(m.tokens_per_sec for m in text_turns)
+        print(
+            f"{mode:<10} TTFT={ttft * 1000:7.1f}ms "
+            f"total={total * 1000:7.1f}ms tokens/sec={tps:6.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""複数サービスのダイジェストを1件ずつ作る場合と、並行に作る場合を比較するベンチマーク
+
+strands/digest.py の run_digest を、決まった応答を --latency 秒後に返すモデル（Bedrock の代わり）と、
+ローカルのフィクスチャを読み込んだ AwsFeedStore で実行する。
+ - sequential: 要約を1件ずつ実行する（--concurrency 1）
+ - concurrent: 要約を --concurrency 件ずつ並行に実行する
+どちらもアップデートは索引からまとめて検索するので、モデルの呼び出しはサービスごとに1回
+（main.py のエージェントでは、ツール呼び出しの判断と要約で2回）になる。
+
+実行例: python benchmarks/bench_digest.py --services 24 --concurrency 8 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "strands"))
+
+from strands.models.model import Model  # noqa: E402
+
+from aws_feed import AwsFeedStore  # noqa: E402
+from digest import run_digest  # noqa: E402
+
+SERVICE_NAMES = ["ECS", "EC2", "Lambda", "S3", "Bedrock", "RDS", "Fargate", "CloudWatch"]
+
+
+class FakeModel(Model):
+    """latency 秒待ってから、固定の文字列をストリーミングで返すモデル"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def update_config(self, **model_config):
+        pass
+
+    def get_config(self):
+        return {}
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        raise NotImplementedError
+        yield
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        yield {"messageStart": {"role": "assistant"}}
+        yield {"contentBlockDelta": {"delta": {"text": "最新の変更点のまとめです。"}}}
+        yield {"contentBlockStop": {}}
+        yield {"messageStop": {"stopReason": "end_turn"}}
+
+
+def fixture_store(n_services: int) -> AwsFeedStore:
+    store = AwsFeedStore(url="http://127.0.0.1:9/unused", cache_path=None)
+    with store._lock:
+        for i in range(2000):
+            service = f"Amazon {SERVICE_NAMES[i % len(SERVICE_NAMES)]}{i % n_services}"
+            store._add_locked(
+                {
+                    "id": f"whats-new-{i}",
+                    "title": f"{service} now supports feature {i}",
+                    "link": "",
+                    "published": "N/A",
+                    "published_at": float(i),
+                    "summary": f"feature {i}",
+                }
+            )
+    store._loaded.set()
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--services", type=int, default=24)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    store = fixture_store(args.services)
+    services = [
+        f"{SERVICE_NAMES[i % len(SERVICE_NAMES)]}{i}" for i in range(args.services)
+    ]
+    print(
+        f"サービス {args.services} 件 / モデルの応答 {args.latency * 1000:.0f}ms / "
+        f"並列数 {args.concurrency}"
+    )
+
+    def run(concurrency: int) -> tuple[float, list[dict], int]:
+        model = FakeModel(args.latency)
+        # 要約の出力はベンチマークの表示から省く
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            results = asyncio.run(run_digest(services, store, model, concurrency=concurrency))
+        return time.perf_counter() - start, results, model.calls
+
+    sequential, _, sequential_calls = run(1)
+    elapsed, results, calls = run(args.concurrency)
+    assert len(results) == args.services and all(r["status"] == "ok" for r in results)
+    latencies = sorted(r["latency_sec"] for r in results)
+    print(f"  sequential  {sequential:>7.2f}s  モデル呼び出し {sequential_calls} 回")
+    print(f"  concurrent  {elapsed:>7.2f}s  モデル呼び出し {calls} 回  ({sequential / elapsed:.1f}x)")
+    print(
+        f"  サービスごとのレイテンシ: min={latencies[0]:.2f}s "
+        f"median={latencies[len(latencies) // 2]:.2f}s max={latencies[-1]:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
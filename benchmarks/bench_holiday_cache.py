@@ -0,0 +1,131 @@
+"""get_jp_holiday のキャッシュ有無によるレイテンシを比較するベンチマーク
+
+ローカルに祝日APIの代わりとなるHTTPサーバーを立て、以下を計測する。
+ - uncached: 従来実装（毎回ダウンロードして startswith で絞り込み）
+ - cold:     空のキャッシュからの初回ルックアップ
+ - warm:     メモリ上の索引からのルックアップ
+ - disk:     プロセス再起動を想定し、ディスクキャッシュから読み込んだ初回
+ - revalidate: TTL切れで条件付きGET（304）が走るルックアップ
+
+実行例: python benchmarks/bench_holiday_cache.py
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import Request, urlopen
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from holiday_cache import HolidayCache  # noqa: E402
+
+# 1955年〜2030年分程度を模した祝日データ（本物と同程度のサイズ）
+HOLIDAYS = {
+    f"{y:04d}-{m:02d}-{d:02d}": f"祝日{y}{m}{d}"
+    for y in range(1955, 2031)
+    for m in range(1, 13)
+    for d in (1, 15)
+}
+BODY = json.dumps(HOLIDAYS, ensure_ascii=False).encode("utf-8")
+ETAG = '"bench-v1"'
+
+
+class HolidayHandler(BaseHTTPRequestHandler):
+    requests_served = 0
+
+    def do_GET(self):
+        HolidayHandler.requests_served += 1
+        # 実ネットワークの往復を模した遅延
+        time.sleep(0.02)
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.send_header("ETag", ETAG)
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def uncached_lookup(url: str, year: int) -> dict:
+    req = Request(url, headers={"User-Agent": "agent_book/1.0 (urllib)"})
+    with urlopen(req, timeout=10) as response:
+        holidays = json.loads(response.read().decode("utf-8"))
+    return {k: v for k, v in holidays.items() if k.startswith(f"{year}-")}
+
+
+def measure(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name: str, samples: list[float]):
+    print(
+        f"{name:<12} n={len(samples):<5} "
+        f"median={statistics.median(samples):9.3f}ms "
+        f"max={max(samples):9.3f}ms"
+    )
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), HolidayHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/v1/date.json"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "holidays.json")
+
+        report("uncached", measure(lambda: uncached_lookup(url, 2025), 20))
+
+        cold = []
+        for i in range(20):
+            path = os.path.join(tmp, f"cold-{i}.json")
+            cache = HolidayCache(url=url, cache_path=path)
+            cold.extend(measure(lambda: cache.by_year(2025), 1))
+        report("cold", cold)
+
+        cache = HolidayCache(url=url, cache_path=cache_path)
+        cache.by_year(2025)
+        report("warm", measure(lambda: cache.by_year(2025), 10000))
+        report("warm-month", measure(lambda: cache.by_month(2025, 7), 10000))
+        report(
+            "warm-range",
+            measure(lambda: cache.between("2025-07-01", "2025-09-30"), 10000),
+        )
+
+        disk = []
+        for _ in range(20):
+            reloaded = HolidayCache(url=url, cache_path=cache_path)
+            disk.extend(measure(lambda: reloaded.by_year(2025), 1))
+        report("disk", disk)
+
+        stale = HolidayCache(url=url, cache_path=cache_path, ttl=0)
+        before = HolidayHandler.requests_served
+        report("revalidate", measure(lambda: stale.by_year(2025), 20))
+        print(f"  (304 revalidations: {HolidayHandler.requests_served - before})")
+
+        # APIが落ちている場合でも古いデータで応答できること
+        server.shutdown()
+        server.server_close()
+        offline = HolidayCache(url=url, cache_path=cache_path, ttl=0)
+        offline_result = offline.by_year(2025)
+        print(f"serve-stale  holidays(2025)={len(offline_result)} (API停止中)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""MCPSessionPool によるセッション・スキーマの使い回しの効果を測るベンチマーク
+
+起動に時間のかかるスタブのMCPサーバーに対して、1回のグラフ実行を模した
+「ツール一覧の取得 + ツール呼び出し2回」を繰り返し、以下を比較する。
+ - baseline: 実行ごとに MultiServerMCPClient.get_tools()（従来の mcp_agent.py）
+ - pooled:   プロセス内で MCPSessionPool を使い回す
+ - cached:   新しいプロセスを模し、ディスクのスキーマキャッシュから開始する
+あわせて、ツールの呼び出し中にサーバーが落ちた場合に、再起動して再試行すること（同時に実行中の呼び出しが
+あっても再起動は1回だけ）と、テキスト以外のコンテンツが省略されたと分かることを確かめる。
+
+実行例: python benchmarks/bench_mcp_pool.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lang-graph"))
+
+from langchain_mcp_adapters.client import MultiServerMCPClient  # noqa: E402
+from mcp_pool import MCPSessionPool  # noqa: E402
+
+RUNS = 5
+CONNECTIONS = {
+    "stub": {
+        "command": sys.executable,
+        "args": [os.path.join(os.path.dirname(__file__), "stub_mcp_server.py")],
+        "transport": "stdio",
+        "env": {"STUB_MCP_STARTUP_DELAY": "1.0"},
+    }
+}
+
+
+async def one_run(tools: list):
+    by_name = {t.name: t for t in tools}
+    await by_name["search_docs"].ainvoke({"query": "bedrock"})
+    await by_name["search_docs"].ainvoke({"query": "models"})
+
+
+async def baseline() -> list[float]:
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        client = MultiServerMCPClient(CONNECTIONS)
+        await one_run(await client.get_tools())
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def pooled(cache_path: str) -> tuple[list[float], dict]:
+    pool = MCPSessionPool(CONNECTIONS, schema_cache_path=cache_path)
+    samples = []
+    try:
+        for _ in range(RUNS):
+            start = time.perf_counter()
+            await one_run(await pool.get_tools())
+            samples.append(time.perf_counter() - start)
+    finally:
+        await pool.close()
+    return samples, pool.stats
+
+
+async def cached_tool_listing(cache_path: str) -> float:
+    # スキーマがキャッシュ済みなら、ツール一覧の取得ではサーバーを起動しない
+    pool = MCPSessionPool(CONNECTIONS, schema_cache_path=cache_path)
+    start = time.perf_counter()
+    await pool.get_tools()
+    elapsed = time.perf_counter() - start
+    assert pool.stats["server_starts"] == 0
+    await pool.close()
+    return elapsed
+
+
+async def crash_during_call(tmp: str) -> tuple[str, dict]:
+    # crash_once は1回目の呼び出しの途中でサーバーのプロセスを終了する
+    connections = {
+        "stub": {
+            **CONNECTIONS["stub"],
+            "env": {
+                "STUB_MCP_STARTUP_DELAY": "0",
+                "STUB_MCP_CRASH_MARKER": os.path.join(tmp, "crashed"),
+            },
+        }
+    }
+    pool = MCPSessionPool(connections, schema_cache_path=None)
+    try:
+        output = await pool.call_tool("stub", "crash_once", {"query": "bedrock"})
+    finally:
+        await pool.close()
+    assert pool.stats["restarts"] == 1 and pool.stats["server_starts"] == 2, pool.stats
+    return output, pool.stats
+
+
+async def concurrent_crash(tmp: str) -> tuple[list[str], dict]:
+    # 同じセッションで実行中の2つの呼び出しが、サーバーが落ちてどちらも失敗した場合でも、
+    # 後から再起動しようとした側が、先に再起動した側の新しいサーバーを止めない
+    connections = {
+        "stub": {
+            **CONNECTIONS["stub"],
+            "env": {
+                "STUB_MCP_STARTUP_DELAY": "0.3",
+                "STUB_MCP_CRASH_MARKER": os.path.join(tmp, "crashed-concurrent"),
+            },
+        }
+    }
+    pool = MCPSessionPool(connections, schema_cache_path=None)
+    try:
+        await pool.session("stub")
+        outputs = await asyncio.gather(
+            pool.call_tool("stub", "slow_search", {"query": "bedrock"}),
+            pool.call_tool("stub", "crash_once", {"query": "models"}),
+        )
+    finally:
+        await pool.close()
+    assert pool.stats["restarts"] == 1 and pool.stats["server_starts"] == 2, pool.stats
+    return list(outputs), pool.stats
+
+
+async def non_text_content() -> str:
+    pool = MCPSessionPool(
+        {"stub": {**CONNECTIONS["stub"], "env": {"STUB_MCP_STARTUP_DELAY": "0"}}},
+        schema_cache_path=None,
+    )
+    try:
+        output = await pool.call_tool("stub", "render_chart", {"query": "bedrock"})
+    finally:
+        await pool.close()
+    assert "[image omitted]" in output, output
+    return output
+
+
+def report(name: str, samples: list[float]):
+    formatted = " ".join(f"{s * 1000:7.1f}" for s in samples)
+    print(f"{name:<9} total={sum(samples):6.2f}s  runs(ms)=[{formatted}]")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "mcp_tools.json")
+        report("baseline", await baseline())
+        samples, stats = await pooled(cache_path)
+        report("pooled", samples)
+        print(f"          stats={stats}")
+        elapsed = await cached_tool_listing(cache_path)
+        print(f"cached    get_tools={elapsed * 1000:.2f}ms (サーバー未起動)")
+        output, stats = await crash_during_call(tmp)
+        print(f"crash     {output!r} stats={stats} (呼び出し中に落ちたサーバーを再起動して再試行)")
+        outputs, stats = await concurrent_crash(tmp)
+        print(f"crash x2  {outputs!r} stats={stats} (同時に失敗した呼び出しの再起動は1回)")
+        print(f"image     {await non_text_content()!r}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""MemoryPolicy で LLM に渡す履歴のトークン数が上限内に収まることを確かめるベンチマーク
+
+500ターンの会話（3ターンに1回はツール呼び出しを含む）を作り、毎ターン pre_model_hook を呼んで
+ - LLM に渡す入力のトークン数（見積もり）が max_tokens を超えないこと
+ - ツール呼び出しの AIMessage と ToolMessage が切り離されないこと
+ - 各メッセージが要約に渡されるのは1回だけ（要約は差分で更新される）こと
+を確認し、履歴全体を渡す場合とのトークン数を比較する。
+要約は LLM を呼ばず、各メッセージの先頭を連結して切り詰める決定的な関数で代用する。
+
+実行例: python benchmarks/bench_memory_policy.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lang-graph"))
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage  # noqa: E402
+
+from memory_policy import MemoryPolicy, estimate_tokens  # noqa: E402
+from message_text import content_to_text  # noqa: E402
+
+TURNS = 500
+MAX_TOKENS = 3000
+SUMMARY_MAX_TOKENS = 400
+
+
+class FakeSummarizer:
+    """各メッセージの先頭 30 文字を追記し、上限を超えた分は古い方から捨てる"""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.calls = 0
+        self.summarized_messages = 0
+
+    def __call__(self, summary, messages):
+        self.calls += 1
+        self.summarized_messages += len(messages)
+        added = " / ".join(content_to_text(m.content)[:30] for m in messages)
+        return (summary + " / " + added)[-self.max_chars :]
+
+
+def make_turn(i: int) -> list:
+    messages = [HumanMessage(content=f"質問{i}: 東京の今日の天気と気温を調べて、要点をまとめてください。")]
+    if i % 3 == 0:
+        call_id = f"call_{i}"
+        messages.append(
+            AIMessage(
+                content="",
+                tool_calls=[{"name": "web_search", "args": {"query": f"東京 天気 {i}"}, "id": call_id}],
+            )
+        )
+        messages.append(ToolMessage(content="晴れ、最高気温 20度。" * 20, tool_call_id=call_id))
+    messages.append(AIMessage(content=f"回答{i}: 東京は晴れで、最高気温は20度です。" * 3))
+    return messages
+
+
+def check_tool_pairs(llm_input: list):
+    seen_calls = set()
+    for message in llm_input:
+        for call in getattr(message, "tool_calls", None) or []:
+            seen_calls.add(call["id"])
+        if isinstance(message, ToolMessage):
+            assert message.tool_call_id in seen_calls, "ToolMessage が AIMessage と切り離されました"
+
+
+def main():
+    # 要約のメッセージの見積もりが SUMMARY_MAX_TOKENS を超えないよう、文字数で制限する
+    summarizer = FakeSummarizer(max_chars=SUMMARY_MAX_TOKENS - 50)
+    policy = MemoryPolicy(
+        summarizer,
+        max_tokens=MAX_TOKENS,
+        keep_last_turns=6,
+        summary_max_tokens=SUMMARY_MAX_TOKENS,
+    )
+
+    state = {"messages": []}
+    prompt_tokens, full_tokens = [], []
+    full_total = 0
+    hook_time = 0.0
+    for i in range(TURNS):
+        turn = make_turn(i)
+        state["messages"] = state["messages"] + turn
+        full_total += sum(estimate_tokens(m) for m in turn)
+
+        start = time.perf_counter()
+        update = policy.pre_model_hook(state)
+        hook_time += time.perf_counter() - start
+        state["memory_summary"] = update["memory_summary"]
+
+        llm_input = update["llm_input_messages"]
+        tokens = sum(estimate_tokens(m) for m in llm_input)
+        assert tokens <= MAX_TOKENS, f"ターン{i}: {tokens} トークン"
+        check_tool_pairs(llm_input)
+        prompt_tokens.append(tokens)
+        full_tokens.append(full_total)
+
+    folded = state["memory_summary"]["summarized"]
+    assert summarizer.summarized_messages == folded, "同じメッセージが2回以上要約されました"
+
+    print(f"{TURNS}ターン（メッセージ {len(state['messages'])} 件） max_tokens={MAX_TOKENS}")
+    for turn in (10, 50, 100, 250, 500):
+        print(
+            f"  {turn:>4}ターン目: 履歴全体 {full_tokens[turn - 1]:>8,} トークン -> "
+            f"MemoryPolicy {prompt_tokens[turn - 1]:>6,} トークン"
+        )
+    print(f"  最大 {max(prompt_tokens):,} トークン / 累計 {sum(prompt_tokens):,} vs {sum(full_tokens):,}")
+    print(
+        f"  要約の呼び出し {summarizer.calls} 回（要約したメッセージ {folded} 件、重複なし）"
+    )
+    print(f"  pre_model_hook 平均 {hook_time / TURNS * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
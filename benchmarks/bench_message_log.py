@@ -0,0 +1,84 @@
+"""AgentState.messages の更新コストを比較するマイクロベンチマーク
+
+履歴が 10 / 100 / 1000 件から始めて、1回のノード更新（1件追加）と
+LLMへ渡す入力（SystemMessage + 履歴）の作成にかかる時間を比較する。
+どちらも1ステップごとに履歴が1件ずつ伸び（REPEAT 件分）、その平均を表示する。
+ - operator.add: 従来の Annotated[list[AnyMessage], operator.add]
+ - MessageLog:   追記専用ログ（append_messages）とビュー
+
+実行例: python benchmarks/bench_message_log.py
+"""
+
+import operator
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lang-graph"))
+
+from message_log import MessageLog, append_messages  # noqa: E402
+
+SYSTEM = object()
+REPEAT = 2000
+
+
+def bench_list(size: int) -> float:
+    history = [object() for _ in range(size)]
+
+    def step():
+        nonlocal history
+        history = operator.add(history, [object()])
+        model_input = [SYSTEM] + history
+        return model_input
+
+    return timeit.timeit(step, number=REPEAT) / REPEAT
+
+
+def bench_log(size: int) -> float:
+    log = MessageLog(object() for _ in range(size))
+
+    def step():
+        nonlocal log
+        log = append_messages(log, [object()])
+        model_input = log.view(prefix=[SYSTEM])
+        return model_input
+
+    return timeit.timeit(step, number=REPEAT) / REPEAT
+
+
+def main():
+    print(f"{'history':>10} {'operator.add':>14} {'MessageLog':>12} {'speedup':>8}")
+    for size in (10, 100, 1000):
+        list_cost = bench_list(size)
+        log_cost = bench_log(size)
+        history = f"{size}-{size + REPEAT}"
+        print(
+            f"{history:>10} {list_cost * 1e6:>12.2f}us {log_cost * 1e6:>10.2f}us "
+            f"{list_cost / log_cost:>7.1f}x"
+        )
+
+    # 1000ステップの会話全体での累計（operator.add は O(n^2)）
+    steps = 1000
+
+    def run_list():
+        history: list = []
+        for _ in range(steps):
+            history = operator.add(history, [object()])
+            [SYSTEM] + history
+
+    def run_log():
+        log = MessageLog()
+        for _ in range(steps):
+            log = append_messages(log, [object()])
+            log.view(prefix=[SYSTEM])
+
+    total_list = timeit.timeit(run_list, number=1)
+    total_log = timeit.timeit(run_log, number=1)
+    print(
+        f"{steps}ステップ累計: operator.add={total_list * 1000:.2f}ms "
+        f"MessageLog={total_log * 1000:.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
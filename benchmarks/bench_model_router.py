@@ -0,0 +1,121 @@
+"""model_router.py の ModelRouter で fast / strong を使い分けた場合と、すべて strong の場合を比べるベンチマーク
+
+create_agent.py のグラフ（agent / ToolNode）を、スクリプトされた LLM とスタブのツールで実行する。
+ - strong: --strong-latency 秒で応答するモデル
+ - fast:   --fast-latency 秒で応答するモデル。--malformed-every 回に1回、必須の引数がない
+           ツール呼び出しを返す（ModelRouter は strong で呼び直す）
+質問は簡単なもの（Add 2 and 4 など）と調査・解説を求めるものを交互に使い、
+1つの質問ごとに --rounds ラウンドのツール呼び出しのあとで最終回答を返す。
+
+実行例:
+  python benchmarks/bench_model_router.py
+  python benchmarks/bench_model_router.py --questions 20 --fast-latency 0.05 --strong-latency 0.4
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(REPO_ROOT, "lang-graph"))
+sys.path.insert(0, REPO_ROOT)
+# create_agent の読み込み時に作るクライアント用（実際には呼び出さない）
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+
+import create_agent  # noqa: E402
+from fake_models import Script, ScriptedChatModel, langchain_stub_tool  # noqa: E402
+from model_router import ModelRouter, RouterStats  # noqa: E402
+
+QUESTIONS = [
+    "Add 2 and 4",
+    "LangGraphの基本を優しく解説して",
+    "今日の東京の天気は？",
+    "Bedrock と SageMaker の違いを比較して、選び方をまとめて",
+]
+
+PARAMS = {create_agent.web_search_tool_name: ["query"], "send_aws_sns": ["text"]}
+
+
+def tool_args(name: str, call_index: int) -> dict:
+    return {p: f"{name} {call_index}" for p in PARAMS[name]}
+
+
+def malformed_args(every: int):
+    """every 回に1回、必須の引数を落としたツール呼び出しにする"""
+
+    def args(name: str, call_index: int) -> dict:
+        if every and call_index % every == every - 1:
+            return {}
+        return tool_args(name, call_index)
+
+    return args
+
+
+async def run(args, routed: bool) -> tuple[float, RouterStats | None, int, int]:
+    def script(latency: float, make_args) -> Script:
+        return Script(
+            list(PARAMS),
+            tool_calls_per_round=1,
+            tool_rounds=args.rounds,
+            answer_words=args.answer_words,
+            latency=latency,
+            tool_args=make_args,
+        )
+
+    strong_script = script(args.strong_latency, tool_args)
+    fast_script = script(args.fast_latency, malformed_args(args.malformed_every))
+    tools = [langchain_stub_tool(name, params, args.tool_latency) for name, params in PARAMS.items()]
+    strong = ScriptedChatModel(script=strong_script)
+    llm = ModelRouter(ScriptedChatModel(script=fast_script), strong) if routed else strong
+
+    create_agent.tools = tools
+    create_agent.llm_with_tools = llm.bind_tools(tools)
+    create_agent.tool_cache.clear()
+    graph = create_agent.build_graph()
+
+    started = time.perf_counter()
+    for i in range(args.questions):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        await graph.ainvoke(
+            {"messages": [HumanMessage(content=question)]},
+            config={"configurable": {"thread_id": uuid.uuid4().hex}},
+        )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    stats = create_agent.llm_with_tools.stats if routed else None
+    return elapsed_ms, stats, fast_script.calls, strong_script.calls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=12)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--answer-words", type=int, default=50)
+    parser.add_argument("--fast-latency", type=float, default=0.05)
+    parser.add_argument("--strong-latency", type=float, default=0.3)
+    parser.add_argument("--tool-latency", type=float, default=0.0)
+    parser.add_argument("--malformed-every", type=int, default=4)
+    args = parser.parse_args()
+
+    print(
+        f"質問 {args.questions} 件 / ツール {args.rounds} ラウンド / fast {args.fast_latency * 1000:.0f}ms "
+        f"/ strong {args.strong_latency * 1000:.0f}ms / 壊れたツール呼び出し {args.malformed_every} 回に1回"
+    )
+    baseline_ms, _, _, strong_calls = asyncio.run(run(args, routed=False))
+    print(f"  strong only  {baseline_ms:>8.1f}ms  (strong {strong_calls} 回)")
+    routed_ms, stats, fast_calls, strong_calls = asyncio.run(run(args, routed=True))
+    print(
+        f"  routed       {routed_ms:>8.1f}ms  (fast {fast_calls} 回 / strong {strong_calls} 回, "
+        f"{baseline_ms / routed_ms:.1f}x)"
+    )
+    print("\n[model_router]")
+    print(stats.summary())
+
+
+if __name__ == "__main__":
+    main()
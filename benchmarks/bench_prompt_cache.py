@@ -0,0 +1,116 @@
+"""Bedrock プロンプトキャッシュの効果を確認するベンチマーク
+
+スタブの bedrock-runtime クライアントでツールループを回し、
+キャッシュポイントの有無で入力トークン数とレイテンシを比較する。
+あわせて、キャッシュポイントが system / tools / 履歴の末尾に置かれていることを検証する。
+
+実行例: python benchmarks/bench_prompt_cache.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from prompt_cache import CACHE_POINT, add_cache_points, cache_usage  # noqa: E402
+from stub_bedrock import StubBedrockClient, text_turn, tool_turn  # noqa: E402
+from tool_loop import ToolRegistry, run_tool_loop  # noqa: E402
+
+SYSTEM = [{"text": "あなたは調査アシスタントです。" + "ルール。" * 2000}]
+TOOL_SPECS = [
+    {
+        "toolSpec": {
+            "name": f"tool_{i}",
+            "description": "検索ツール " * 100,
+            "inputSchema": {
+                "json": {"type": "object", "properties": {"q": {"type": "string"}}}
+            },
+        }
+    }
+    for i in range(5)
+]
+SCRIPT = [tool_turn((f"t{i}", "tool_0", {"q": f"q{i}"})) for i in range(8)] + [
+    text_turn("完了")
+]
+
+
+def check_placement():
+    messages = [
+        {"role": "user", "content": [{"text": "質問"}]},
+        {"role": "assistant", "content": [{"toolUse": {"toolUseId": "1"}}]},
+        {"role": "user", "content": [{"toolResult": {"toolUseId": "1"}}]},
+    ]
+    request = {
+        "system": SYSTEM,
+        "toolConfig": {"tools": TOOL_SPECS},
+        "messages": messages,
+    }
+    cached = add_cache_points(request)
+
+    assert cached["system"][-1] == CACHE_POINT
+    assert cached["toolConfig"]["tools"][-1] == CACHE_POINT
+    # 最新のメッセージ（今回の toolResult）ではなく、その直前までの末尾に置く
+    assert cached["messages"][1]["content"][-1] == CACHE_POINT
+    assert CACHE_POINT not in cached["messages"][2]["content"]
+    # Bedrock の上限（1リクエストあたり4つ）を超えない
+    blocks = (
+        cached["system"]
+        + cached["toolConfig"]["tools"]
+        + [b for m in cached["messages"] for b in m["content"]]
+    )
+    assert sum(1 for b in blocks if "cachePoint" in b) <= 4
+    # 元のリクエストは変更しない
+    assert CACHE_POINT not in request["system"]
+    assert all(CACHE_POINT not in m["content"] for m in messages)
+    print("cache point placement: OK")
+
+
+def run(prompt_cache: bool):
+    client = StubBedrockClient(
+        SCRIPT,
+        first_token_latency=0.05,
+        per_token_latency=0.0,
+        per_input_token_latency=0.00002,
+    )
+    registry = ToolRegistry(
+        TOOL_SPECS, {f"tool_{i}": (lambda q: {"result": q * 200}) for i in range(5)}
+    )
+
+    totals = {"input": 0, "cache_read": 0, "cache_write": 0}
+
+    def converse(messages):
+        request = {"system": SYSTEM, "toolConfig": registry.tool_config, "messages": messages}
+        if prompt_cache:
+            request = add_cache_points(request)
+        response = client.converse(**request)
+        usage = response["usage"]
+        cache_read, cache_write = cache_usage(usage)
+        totals["input"] += usage["inputTokens"]
+        totals["cache_read"] += cache_read
+        totals["cache_write"] += cache_write
+        return response
+
+    start = time.perf_counter()
+    run_tool_loop(
+        converse,
+        [{"role": "user", "content": [{"text": "調べて"}]}],
+        registry,
+        max_iterations=len(SCRIPT),
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"prompt_cache={str(prompt_cache):<5} total={elapsed * 1000:7.1f}ms "
+        f"uncached_input={totals['input']:6d} cache_read={totals['cache_read']:6d} "
+        f"cache_write={totals['cache_write']:6d}"
+    )
+
+
+def main():
+    check_placement()
+    run(prompt_cache=False)
+    run(prompt_cache=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""SNS への送信のスループット（messages/sec）を比較するベンチマーク
+
+botocore の Stubber で SNS の応答を返し（実際には送信しない）、各 API 呼び出しに
+--latency 秒の待ち時間（ネットワーク往復の代わり）を入れて比較する。
+ - 従来:         メッセージごとに boto3.client("sns") を作り、Publish で1件ずつ送る
+ - SNSPublisher: 1つのクライアントを使い回し、PublishBatch で10件ずつ送る
+
+あわせて次の動作も確認する。
+ - PublishBatch のエントリごとの失敗が、そのメッセージの Future にだけ PublishError で返ること
+ - close()（atexit）で、max_delay を待たずに残りのメッセージが送信されること
+ - 既定（max_delay=0）では、1件だけのメッセージを待たせずに送信すること
+
+実行例: python benchmarks/bench_sns_publisher.py --messages 200 --latency 0.02
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lang-graph"))
+
+import boto3  # noqa: E402
+from botocore.stub import Stubber  # noqa: E402
+
+from sns_publisher import PublishError, SNSPublisher  # noqa: E402
+
+TOPIC_ARN = "arn:aws:sns:us-east-1:123456789012:bench-topic"
+REGION = "us-east-1"
+
+
+def add_latency(client, latency: float):
+    # Stubber（before-call.*.*）より先に呼ばれるよう register_first で登録する
+    client.meta.events.register_first(
+        "before-call.*.*", lambda **kwargs: time.sleep(latency)
+    )
+
+
+def bench_current(messages: list[str], latency: float) -> float:
+    """従来の send_aws_sns と同じく、メッセージごとにクライアントを作って Publish する"""
+    start = time.perf_counter()
+    for i, message in enumerate(messages):
+        sns = boto3.client("sns", region_name=REGION)
+        add_latency(sns, latency)
+        with Stubber(sns) as stubber:
+            stubber.add_response(
+                "publish",
+                {"MessageId": f"id-{i}"},
+                {"TopicArn": TOPIC_ARN, "Message": message},
+            )
+            sns.publish(TopicArn=TOPIC_ARN, Message=message)
+    return time.perf_counter() - start
+
+
+def batch_response(batch: list[str], failed: dict[int, str] | None = None) -> dict:
+    failed = failed or {}
+    return {
+        "Successful": [
+            {"Id": str(i), "MessageId": f"id-{i}"} for i in range(len(batch)) if i not in failed
+        ],
+        "Failed": [
+            {"Id": str(i), "Code": code, "Message": "stubbed failure", "SenderFault": True}
+            for i, code in failed.items()
+        ],
+    }
+
+
+def batch_params(batch: list[str]) -> dict:
+    return {
+        "TopicArn": TOPIC_ARN,
+        "PublishBatchRequestEntries": [
+            {"Id": str(i), "Message": message} for i, message in enumerate(batch)
+        ],
+    }
+
+
+def bench_publisher(messages: list[str], latency: float) -> float:
+    sns = boto3.client("sns", region_name=REGION)
+    add_latency(sns, latency)
+    stubber = Stubber(sns)
+    batches = [messages[i : i + 10] for i in range(0, len(messages), 10)]
+    for batch in batches:
+        stubber.add_response("publish_batch", batch_response(batch), batch_params(batch))
+
+    with stubber:
+        # 件数（10件）で送信させるため、max_delay は長めにする
+        publisher = SNSPublisher(TOPIC_ARN, client=sns, max_delay=60)
+        start = time.perf_counter()
+        futures = [publisher.publish(message) for message in messages]
+        results = [future.result(timeout=30) for future in futures]
+        elapsed = time.perf_counter() - start
+        publisher.close()
+        stubber.assert_no_pending_responses()
+
+    assert len(results) == len(messages)
+    assert publisher.stats["batches"] == len(batches)
+    return elapsed
+
+
+def check_partial_failure():
+    sns = boto3.client("sns", region_name=REGION)
+    batch = [f"message {i}" for i in range(10)]
+    with Stubber(sns) as stubber:
+        stubber.add_response(
+            "publish_batch", batch_response(batch, {3: "InvalidParameter"}), batch_params(batch)
+        )
+        publisher = SNSPublisher(TOPIC_ARN, client=sns, max_delay=60)
+        futures = [publisher.publish(message) for message in batch]
+        for i, future in enumerate(futures):
+            if i == 3:
+                try:
+                    future.result(timeout=5)
+                    raise AssertionError("失敗したエントリが成功になりました")
+                except PublishError as e:
+                    assert e.code == "InvalidParameter" and e.sender_fault
+            else:
+                assert future.result(timeout=5) == f"id-{i}"
+        publisher.close()
+    print("エントリごとの失敗: OK（4件目だけ PublishError、他の9件は MessageId）")
+
+
+def check_flush_on_close():
+    sns = boto3.client("sns", region_name=REGION)
+    batch = ["a", "b", "c"]
+    with Stubber(sns) as stubber:
+        stubber.add_response("publish_batch", batch_response(batch), batch_params(batch))
+        publisher = SNSPublisher(TOPIC_ARN, client=sns, max_delay=60)
+        futures = [publisher.publish(message) for message in batch]
+        start = time.perf_counter()
+        publisher.close()
+        elapsed = time.perf_counter() - start
+        assert all(future.done() and not future.exception() for future in futures)
+        stubber.assert_no_pending_responses()
+    print(f"close() での送信: OK（3件を {elapsed * 1000:.1f}ms で送信）")
+
+
+def check_single_message(latency: float):
+    sns = boto3.client("sns", region_name=REGION)
+    add_latency(sns, latency)
+    batch = ["single"]
+    with Stubber(sns) as stubber:
+        stubber.add_response("publish_batch", batch_response(batch), batch_params(batch))
+        publisher = SNSPublisher(TOPIC_ARN, client=sns)
+        start = time.perf_counter()
+        publisher.publish(batch[0]).result(timeout=5)
+        elapsed = time.perf_counter() - start
+        publisher.close()
+        stubber.assert_no_pending_responses()
+    assert elapsed < latency + 0.1, f"1件の送信に {elapsed * 1000:.1f}ms かかりました"
+    print(f"1件だけの送信: OK（{elapsed * 1000:.1f}ms で送信）")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    check_partial_failure()
+    check_flush_on_close()
+    check_single_message(args.latency)
+
+    messages = [f"調査結果 {i}: LangGraph の基本" for i in range(args.messages)]
+    current = bench_current(messages, args.latency)
+    batched = bench_publisher(messages, args.latency)
+    print(f"{args.messages}件 / API呼び出しごとの待ち時間 {args.latency * 1000:.0f}ms")
+    print(f"  従来（毎回 client 作成 + Publish）: {args.messages / current:>8.1f} msgs/sec")
+    print(f"  SNSPublisher（PublishBatch）     : {args.messages / batched:>8.1f} msgs/sec")
+    print(f"  {current / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
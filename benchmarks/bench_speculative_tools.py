@@ -0,0 +1,164 @@
+"""承認を待つ間に read_only のツールを先に実行する（SPECULATIVE_TOOLS=1）場合と、しない場合を比較するベンチマーク
+
+functional_api_agent/agent_core.py の agent を、決まった応答を返す LLM と待ち時間だけのツールに
+差し替えて実行する。LLM は1ターン目に Web検索を --tools 個、2ターン目に write_file を1つ呼び出し、
+3ターン目で最終回答を返す。承認画面でボタンを押すまでの時間（--human-delay）のあと再開し、
+承認から最終回答までの時間（ユーザーが承認後に待つ時間）を比べる。
+ - off: 承認されてから Web検索を実行する（従来）
+ - on:  ツール呼び出しが提案された時点で Web検索を実行し始める
+あわせて、Web検索を拒否した場合に結果が捨てられること、write_file が承認前に実行されないことも確かめる。
+
+実行例: python benchmarks/bench_speculative_tools.py --tools 2 --human-delay 1.0
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "lang-graph", "functional_api_agent")
+)
+# agent_core の読み込み時に作るクライアント用（実際には呼び出さない）
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage  # noqa: E402
+from langchain_core.tools import tool  # noqa: E402
+from langgraph.types import Command  # noqa: E402
+
+import agent_core  # noqa: E402
+from speculative_tools import SpeculativeExecutor  # noqa: E402
+from tool_cache import read_only  # noqa: E402
+
+LLM_LATENCY = 0.3
+TOOL_LATENCY = 0.8
+
+calls = {"web_search": 0, "write_file": 0}
+calls_lock = threading.Lock()
+
+
+class ScriptedLLM:
+    """Web検索を n 個 → write_file → 最終回答の順に返す LLM"""
+
+    def __init__(self, n_tools: int):
+        self.n_tools = n_tools
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(LLM_LATENCY)
+        turns = sum(isinstance(m, AIMessage) for m in messages)
+        denied = any(
+            isinstance(m, ToolMessage) and "拒否" in str(m.content) for m in messages
+        )
+        if turns == 0:
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {"name": "web_search", "args": {"query": f"検索 {i}"}, "id": f"call_{i}"}
+                    for i in range(self.n_tools)
+                ],
+            )
+        if turns == 1 and not denied:
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "name": "write_file",
+                        "args": {"file_path": "report.html", "text": "<p>結果</p>"},
+                        "id": "call_write",
+                    }
+                ],
+            )
+        return AIMessage(content="調査結果のまとめです。")
+
+
+@tool
+def web_search(query: str) -> str:
+    """Web検索の代わりに待つだけのツール"""
+    with calls_lock:
+        calls["web_search"] += 1
+    time.sleep(TOOL_LATENCY)
+    return f"{query} の検索結果"
+
+
+@tool
+def write_file(file_path: str, text: str) -> str:
+    """ファイルを書き込む代わりに数えるだけのツール"""
+    with calls_lock:
+        calls["write_file"] += 1
+    return f"{file_path} に保存しました"
+
+
+def run(speculative: bool, n_tools: int, human_delay: float, decision: str = "APPROVE"):
+    """(承認後の待ち時間の合計秒数, 承認前に実行された write_file の数, executor)"""
+    executor = SpeculativeExecutor() if speculative else None
+    agent_core.speculation = executor
+    agent_core.batch_approval = True
+    agent_core.llm_with_tools = ScriptedLLM(n_tools)
+    agent_core.tools_by_name = {
+        "web_search": read_only(web_search, ttl=0),
+        "write_file": write_file,
+    }
+    agent_core.tool_cache.clear()
+    calls.update(web_search=0, write_file=0)
+
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    agent_input = [HumanMessage(content="LangGraph について調べて")]
+    waited = 0.0
+    writes_before_approval = 0
+    while True:
+        interrupt_value = None
+        started = time.perf_counter()
+        for chunk in agent_core.agent.stream(agent_input, config=config, stream_mode="updates"):
+            if "__interrupt__" in chunk:
+                interrupt_value = chunk["__interrupt__"][0].value
+        if not isinstance(agent_input, list):
+            waited += time.perf_counter() - started
+        if interrupt_value is None:
+            break
+        # 承認画面でユーザーがボタンを押すまでの時間
+        time.sleep(human_delay)
+        names = {call["name"] for call in interrupt_value["tool_calls"]}
+        if "write_file" in names:
+            writes_before_approval += calls["write_file"]
+        agent_input = Command(
+            resume={
+                call["id"]: decision if call["name"] == "web_search" else "APPROVE"
+                for call in interrupt_value["tool_calls"]
+            }
+        )
+    return waited, writes_before_approval, executor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tools", type=int, default=2)
+    parser.add_argument("--human-delay", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(
+        f"Web検索 {args.tools} 件 / LLM {LLM_LATENCY * 1000:.0f}ms / "
+        f"ツール {TOOL_LATENCY * 1000:.0f}ms / 承認操作 {args.human_delay * 1000:.0f}ms"
+    )
+    for label, speculative in (("off", False), ("on", True)):
+        waited, writes, executor = run(speculative, args.tools, args.human_delay)
+        print(
+            f"  {label:<4} 承認後の待ち時間 {waited * 1000:>7.1f}ms  "
+            f"承認前の write_file {writes} 回"
+        )
+        if executor is not None:
+            print(f"       {executor.summary()}")
+            assert writes == 0, "write_file が承認前に実行された"
+
+    # 拒否した場合は、先に実行していた結果を使わずに捨てる
+    _, _, executor = run(True, args.tools, 0.5, decision="DENY")
+    print(f"  deny {executor.summary()}")
+    assert executor.stats["used"] == 0 and executor.stats["discarded"] == args.tools
+    assert calls["write_file"] == 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""各エージェントのモジュールの起動時間（import と最初の呼び出し）を測るベンチマーク
+
+モジュールごとに新しいプロセスで `python -X importtime` を実行し、次の値を計測する。
+ - import_ms:     import にかかった時間（実測）
+ - importtime_ms: -X importtime で計測した、そのモジュールの import の合計（依存するモジュールを含む）
+ - first_call_ms: 最初の呼び出しでクライアントやグラフを作るのにかかった時間
+                  （遅延読み込みにしたモジュールの import を含む）
+ - slowest:       import で読み込んだモジュールのうち、特に時間のかかったもの
+--rev を指定すると、そのコミットのツリーも同じ方法で計測して並べて表示する（遅延初期化の前後の比較用）。
+以前のツリーでは import 時にエージェントを実行するモジュールがあるため、実際の API を呼ばないよう
+ダミーの認証情報で実行する（その場合は error / timeout として表示する）。
+
+実行例:
+  python benchmarks/bench_startup.py
+  python benchmarks/bench_startup.py --rev HEAD~1 --repeat 5
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import textwrap
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# (表示名, sys.path に加えるディレクトリ, モジュール名, 最初の呼び出し)
+# 最初の呼び出しは、遅延初期化の前のツリー（変数を import 時に作る）でも動くように書く
+TARGETS = [
+    ("main.py", ".", "main", "getattr(m, 'get_client', lambda: m.client)()"),
+    (
+        "create_agent.py",
+        "lang-graph",
+        "create_agent",
+        "getattr(m, 'get_llm_with_tools', lambda: m.llm_with_tools)();"
+        " getattr(m, 'get_graph', lambda: m.graph)()",
+    ),
+    (
+        "agent_core.py",
+        "lang-graph/functional_api_agent",
+        "agent_core",
+        "getattr(m, 'get_llm_with_tools', lambda: m.llm_with_tools)()",
+    ),
+    ("mcp_agent.py", "lang-graph", "mcp_agent", None),
+    (
+        "react_agent.py",
+        "lang-graph",
+        "react_agent",
+        "m.build_agent(m.get_llm()) if hasattr(m, 'build_agent') else m.agent_with_memory",
+    ),
+    (
+        "strands/main.py",
+        "strands",
+        "main",
+        "m.build_agent() if hasattr(m, 'build_agent') else m.agent",
+    ),
+]
+
+# 以前のツリーが import 時に実行するエージェントが、実際の API を呼ばないようにする
+DUMMY_ENV = {
+    "TAVILY_API_KEY": "dummy",
+    "GEMINI_API_KEY": "dummy",
+    "AWS_ACCESS_KEY_ID": "dummy",
+    "AWS_SECRET_ACCESS_KEY": "dummy",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_FEED_CACHE_PATH": os.path.join(tempfile.gettempdir(), "bench_startup_feed.json"),
+}
+
+SCRIPT = textwrap.dedent(
+    """
+    import json, sys, time
+    sys.path.insert(0, {path!r})
+    start = time.perf_counter()
+    import {module} as m
+    imported = time.perf_counter()
+    first_call_ms = None
+    if {first_call!r} is not None:
+        exec({first_call!r})
+        first_call_ms = (time.perf_counter() - imported) * 1000
+    print("RESULT " + json.dumps({{
+        "import_ms": (imported - start) * 1000,
+        "first_call_ms": first_call_ms,
+    }}), flush=True)
+    """
+)
+
+
+def parse_importtime(stderr: str, module: str) -> tuple[float | None, list[tuple[str, float]]]:
+    """モジュールの import の合計（ms）と、その中で時間のかかった直下のモジュールを返す
+
+    -X importtime の各行は「import time: self | cumulative | name」（name は深さごとに2文字下げる）。
+    """
+    total = None
+    children = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        cumulative_ms = int(cumulative_us) / 1000
+        if depth == 0 and name.strip() == module:
+            total = cumulative_ms
+        elif depth == 1:
+            children.append((name.strip(), cumulative_ms))
+    return total, sorted(children, key=lambda c: -c[1])[:3]
+
+
+def run_once(root: str, path: str, module: str, first_call: str | None, timeout: float) -> dict:
+    code = SCRIPT.format(path=os.path.join(root, path), module=module, first_call=first_call)
+    env = {**os.environ, **DUMMY_ENV}
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=root,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return {"status": "timeout"}
+    result_lines = [line for line in proc.stdout.splitlines() if line.startswith("RESULT ")]
+    if proc.returncode != 0 or not result_lines:
+        last_error = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        return {"status": "error", "error": (last_error or ["?"])[-1][:120]}
+    result = json.loads(result_lines[-1][len("RESULT ") :])
+    importtime_ms, slowest = parse_importtime(proc.stderr, module)
+    return {"status": "ok", **result, "importtime_ms": importtime_ms, "slowest": slowest}
+
+
+def measure(root: str, repeat: int, timeout: float) -> dict[str, dict]:
+    results = {}
+    for label, path, module, first_call in TARGETS:
+        if not os.path.exists(os.path.join(root, path, f"{module}.py")):
+            results[label] = {"status": "missing"}
+            continue
+        runs = [run_once(root, path, module, first_call, timeout) for _ in range(repeat)]
+        ok = [r for r in runs if r["status"] == "ok"]
+        if not ok:
+            results[label] = runs[-1]
+            continue
+
+        def median(key):
+            values = [r[key] for r in ok if r[key] is not None]
+            return statistics.median(values) if values else None
+
+        results[label] = {
+            "status": "ok",
+            "import_ms": median("import_ms"),
+            "importtime_ms": median("importtime_ms"),
+            "first_call_ms": median("first_call_ms"),
+            "slowest": ok[-1]["slowest"],
+        }
+    return results
+
+
+def export_tree(rev: str, destination: str):
+    archive = subprocess.run(
+        ["git", "archive", rev], cwd=REPO_ROOT, capture_output=True, check=True
+    ).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(destination)
+
+
+def fmt(value: float | None) -> str:
+    return "-" if value is None else f"{value:.0f}"
+
+
+def report(label: str, result: dict):
+    if result["status"] != "ok":
+        print(f"  {label:<18} {result['status']} {result.get('error', '')}")
+        return
+    slowest = ", ".join(f"{name} {ms:.0f}ms" for name, ms in result["slowest"])
+    print(
+        f"  {label:<18} import={fmt(result['import_ms']):>6}ms "
+        f"(importtime {fmt(result['importtime_ms']):>6}ms)  "
+        f"first_call={fmt(result['first_call_ms']):>6}ms  [{slowest}]"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rev", help="比較するコミット（例: HEAD~1）")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    print(f"作業ツリー（{args.repeat} 回の中央値）")
+    current = measure(REPO_ROOT, args.repeat, args.timeout)
+    for label, result in current.items():
+        report(label, result)
+
+    if not args.rev:
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        export_tree(args.rev, tmp)
+        print(f"\n{args.rev}")
+        previous = measure(tmp, args.repeat, args.timeout)
+    for label, result in previous.items():
+        report(label, result)
+
+    print("\nimport の短縮")
+    for label in current:
+        before, after = previous.get(label, {}), current[label]
+        if before.get("status") == "ok" and after["status"] == "ok":
+            print(
+                f"  {label:<18} {before['import_ms']:>7.0f}ms -> {after['import_ms']:>7.0f}ms "
+                f"({before['import_ms'] / after['import_ms']:.1f}x)"
+            )
+        else:
+            print(f"  {label:<18} {before.get('status', '-')} -> {after['status']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+"""すべてのエージェントの実装を、スクリプトされた LLM とスタブのツールでオフラインに計測するベンチマーク
+
+LLM は fake_models.py の Script に従い、1ターンごとに --rounds ラウンドのツール呼び出し
+（1ラウンドに --tools 個を同時に）を返してから最終回答を返す。LLM の応答は --llm-latency 秒、
+ツールは --tool-latency 秒待つ（どちらも既定は 0 で、待ち時間を除いた処理のオーバーヘッドを測る）。
+
+計測する実装（variant）:
+ - tool_loop:  main.py の run_tool_loop（Bedrock Converse の履歴をそのまま持つ）
+ - functional: functional_api_agent/agent_core.py の async_agent（承認の interrupt はすべて承認で再開）
+ - react:      react_agent.py の build_agent()（MemoryPolicy の要約つき）
+ - research:   create_agent.py の build_graph()（agent / ToolNode + run_tool_call）
+ - mcp:        mcp_agent.py の build_graph()（MCP サーバーは起動せず、ツールをスタブに差し替える）
+ - strands:    Strands の Agent（スレッドごとに Agent を作り、会話履歴を持たせる）
+strands/main.py の Agent はモデルの ID から作られるため、同じ構成をここで組み立てる。
+
+ターン数（--turns）とツール呼び出しの数（--tools）の組み合わせごとに、次の値を記録する。
+ - e2e_ms:               1つの会話（すべてのターン）にかかった時間（--repeat 回の中央値）
+ - overhead_ms:          e2e_ms から LLM とツールの待ち時間（呼び出し回数 × レイテンシ）を引いた時間
+ - overhead_per_step_ms: overhead_ms を LLM の呼び出しとツールのラウンドの合計で割った値
+ - checkpoint_ms:        チェックポインターの読み書きにかかった時間（会話1つあたり）
+ - checkpoint_bytes:     会話1つあたりのチェックポイントのサイズ（シリアライズ後）
+ - memory_kb_per_thread: --threads 個の会話を実行した後に残っているメモリ（tracemalloc、会話1つあたり）
+
+結果は1行1件の JSON として --output に追記する（コミット・日時・設定つき）。
+--baseline に以前の結果を渡すと、同じ条件の結果と比べて --threshold 倍を超えて悪化した値を表示し、
+1件でもあれば終了コード 1 で終わる。
+--trace を付けると tracing.py の span も記録し、最後に span 名ごとの p50 / p95 / p99 を表示する
+（付けない場合の結果と比べれば、トレースのオーバーヘッドがわかる）。
+
+実行例:
+  python benchmarks/bench_suite.py --output bench_results.jsonl
+  python benchmarks/bench_suite.py --variants functional,react --turns 1,16 --llm-latency 0.05
+  python benchmarks/bench_suite.py --baseline bench_results.jsonl --threshold 1.2
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+import warnings
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(REPO_ROOT, "lang-graph", "functional_api_agent"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "lang-graph"))
+sys.path.insert(0, REPO_ROOT)
+# 各エージェントの読み込み時に作るクライアント用（実際には呼び出さない）
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+# react_agent.py の create_react_agent で出る、移行を促す警告は表示しない
+warnings.filterwarnings("ignore", message="create_react_agent has been moved")
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from langgraph.types import Command  # noqa: E402
+from strands import Agent  # noqa: E402
+
+from bounded_checkpointer import BoundedMemorySaver  # noqa: E402
+from fake_models import (  # noqa: E402
+    Script,
+    ScriptedChatModel,
+    ScriptedStrandsModel,
+    langchain_stub_tool,
+    scripted_converse,
+    strands_stub_tool,
+)
+from tool_loop import ToolRegistry, run_tool_loop  # noqa: E402
+from trace_callbacks import traced_config  # noqa: E402
+from tracing import SpanAggregator, tracer  # noqa: E402
+
+# --baseline と比べる値（大きいほど悪い）
+TRACKED_METRICS = ["overhead_ms", "checkpoint_ms", "checkpoint_bytes", "memory_kb_per_thread"]
+# これより差が小さい場合は、倍率が大きくても誤差として扱う
+MIN_DELTA = 1.0
+
+
+@dataclass
+class Case:
+    turns: int
+    tools: int
+    rounds: int
+    llm_latency: float
+    tool_latency: float
+
+
+class TimedSaver(BoundedMemorySaver):
+    """読み書きにかかった時間を記録するチェックポインター（削除はしない）
+
+    MemorySaver の非同期のメソッドは同期のメソッドを呼ぶので、ここで両方を計測できる。
+    """
+
+    def __init__(self):
+        super().__init__(max_idle=None, max_bytes=None)
+        self.seconds = 0.0
+        self.ops = 0
+
+    def _timed(self, method, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.ops += 1
+
+    def get_tuple(self, config):
+        return self._timed(super().get_tuple, config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        return self._timed(super().put, config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        return self._timed(super().put_writes, config, writes, task_id, task_path)
+
+
+@dataclass
+class Runner:
+    """1つの実装を、スレッドIDごとの会話として1ターンずつ実行する"""
+
+    run_turn: Callable[[str, str], Any]
+    scripts: list[Script]
+    saver: TimedSaver | None = None
+    # 会話履歴をグラフの外で持つ実装（tool_loop / strands）の履歴
+    histories: dict = field(default_factory=dict)
+
+
+def script_args(params: dict[str, list[str]]):
+    """ツール名ごとの引数名に、通し番号つきの値を入れる"""
+    return lambda name, n: {p: f"{p}-{n}" for p in params[name]}
+
+
+def new_script(case: Case, params: dict[str, list[str]]) -> Script:
+    return Script(
+        list(params),
+        tool_calls_per_round=case.tools,
+        tool_rounds=case.rounds,
+        latency=case.llm_latency,
+        tool_args=script_args(params),
+    )
+
+
+def stub_tools(case: Case, params: dict[str, list[str]]) -> list:
+    return [langchain_stub_tool(name, p, case.tool_latency) for name, p in params.items()]
+
+
+def graph_runner(graph, scripts: list[Script], saver: TimedSaver) -> Runner:
+    """チェックポインターに履歴を持たせる LangGraph のグラフ"""
+
+    async def run_turn(thread_id: str, text: str):
+        config = traced_config({"configurable": {"thread_id": thread_id}})
+        await graph.ainvoke({"messages": [HumanMessage(content=text)]}, config=config)
+
+    return Runner(run_turn, scripts, saver)
+
+
+# ---
+# 各実装の組み立て
+# ---
+async def setup_tool_loop(case: Case) -> Runner:
+    params = {"get_jp_holiday": ["query"], "search": ["query"]}
+    script = new_script(case, params)
+
+    def make_function(name: str):
+        def run(query: str) -> dict:
+            time.sleep(case.tool_latency)
+            return {"tool": name, "query": query}
+
+        return run
+
+    registry = ToolRegistry(
+        [
+            {
+                "toolSpec": {
+                    "name": name,
+                    "description": name,
+                    "inputSchema": {"json": {"type": "object", "properties": {}}},
+                }
+            }
+            for name in params
+        ],
+        {name: make_function(name) for name in params},
+    )
+    converse = scripted_converse(script)
+    runner = Runner(None, [script])
+
+    def run_turn(thread_id: str, text: str):
+        messages = runner.histories.get(thread_id, [])
+        result = run_tool_loop(
+            converse,
+            messages + [{"role": "user", "content": [{"text": text}]}],
+            registry,
+            max_iterations=case.rounds + 1,
+        )
+        runner.histories[thread_id] = result.messages
+
+    runner.run_turn = run_turn
+    return runner
+
+
+async def setup_functional(case: Case) -> Runner:
+    import agent_core
+
+    params = {
+        agent_core.web_search_name: ["query"],
+        agent_core.write_file_name: ["file_path", "text"],
+    }
+    script = new_script(case, params)
+    agent_core.llm_with_tools = ScriptedChatModel(script=script).bind_tools([])
+    agent_core.tools_by_name = {t.name: t for t in stub_tools(case, params)}
+    agent_core.batch_approval = True
+    agent_core.tool_cache.clear()
+    saver = TimedSaver()
+    graph = agent_core.async_agent.copy(update={"checkpointer": saver})
+
+    async def run_turn(thread_id: str, text: str):
+        # app.py と同じく、1ターンごとに新しい入力だけを渡し、interrupt はすべて承認で再開する
+        config = traced_config({"configurable": {"thread_id": thread_id}})
+        agent_input = [HumanMessage(content=text)]
+        while True:
+            interrupted = False
+            async for chunk in graph.astream(agent_input, config=config, stream_mode="updates"):
+                interrupted = interrupted or "__interrupt__" in chunk
+            if not interrupted:
+                return
+            agent_input = Command(resume="APPROVE")
+
+    return Runner(run_turn, [script], saver)
+
+
+async def setup_react(case: Case) -> Runner:
+    import react_agent
+
+    params = {"add": ["a", "b"], "multiply": ["a", "b"]}
+    # 要約にも同じモデルを使う（bind_tools していないので、ツールは呼ばずにテキストを返す）
+    script = new_script(case, params)
+    saver = TimedSaver()
+    graph = react_agent.build_agent(
+        ScriptedChatModel(script=script), checkpointer=saver, tools=stub_tools(case, params)
+    )
+    return graph_runner(graph, [script], saver)
+
+
+async def setup_research(case: Case) -> Runner:
+    import create_agent
+
+    params = {create_agent.web_search_tool_name: ["query"], "send_aws_sns": ["text"]}
+    script = new_script(case, params)
+    create_agent.llm_with_tools = ScriptedChatModel(script=script).bind_tools([])
+    create_agent.tool_cache.clear()
+
+    create_agent.tools = stub_tools(case, params)
+    saver = TimedSaver()
+    return graph_runner(create_agent.build_graph(checkpointer=saver), [script], saver)
+
+
+async def setup_mcp(case: Case) -> Runner:
+    import mcp_agent
+
+    params = {"search_docs": ["query"], "write_file": ["path", "content"]}
+    script = new_script(case, params)
+    # llm_with_tools を設定しておくと initialize_llm() は MCP サーバーに接続しない
+    mcp_agent.tools = stub_tools(case, params)
+    mcp_agent.llm_with_tools = ScriptedChatModel(script=script).bind_tools(mcp_agent.tools)
+    saver = TimedSaver()
+    graph = (await mcp_agent.build_graph()).copy(update={"checkpointer": saver})
+    return graph_runner(graph, [script], saver)
+
+
+async def setup_strands(case: Case) -> Runner:
+    params = {"get_aws_updates": ["query"], "search_docs": ["query"]}
+    script = new_script(case, params)
+    model = ScriptedStrandsModel(script)
+    tools = [strands_stub_tool(name, case.tool_latency) for name in params]
+    runner = Runner(None, [script])
+
+    async def run_turn(thread_id: str, text: str):
+        if thread_id not in runner.histories:
+            runner.histories[thread_id] = Agent(model=model, tools=tools, callback_handler=None)
+        await runner.histories[thread_id].invoke_async(text)
+
+    runner.run_turn = run_turn
+    return runner
+
+
+VARIANTS = {
+    "tool_loop": setup_tool_loop,
+    "functional": setup_functional,
+    "react": setup_react,
+    "research": setup_research,
+    "mcp": setup_mcp,
+    "strands": setup_strands,
+}
+
+
+# ---
+# 計測
+# ---
+async def run_conversation(runner: Runner, thread_id: str, turns: int):
+    for turn in range(turns):
+        result = runner.run_turn(thread_id, f"質問 {turn + 1}")
+        if inspect.isawaitable(result):
+            await result
+
+
+async def measure(variant: str, case: Case, repeat: int, threads: int) -> dict:
+    setup = VARIANTS[variant]
+    # 初回だけかかる処理（モジュールの読み込みやスキーマの生成など）は計測に含めない
+    await run_conversation(await setup(case), str(uuid.uuid4()), case.turns)
+    e2e, checkpoint = [], []
+    for _ in range(repeat):
+        runner = await setup(case)
+        start = time.perf_counter()
+        await run_conversation(runner, str(uuid.uuid4()), case.turns)
+        e2e.append(time.perf_counter() - start)
+        if runner.saver is not None:
+            checkpoint.append(runner.saver.seconds)
+    llm_calls = sum(s.calls for s in runner.scripts)
+    tool_calls = sum(s.tool_calls for s in runner.scripts)
+    rounds = sum(s.rounds for s in runner.scripts)
+    checkpoint_bytes = runner.saver.metrics()["bytes"] if runner.saver else None
+    checkpoint_ops = runner.saver.ops if runner.saver else None
+
+    # メモリは別に計測する（tracemalloc は実行を遅くするため）
+    runner = await setup(case)
+    await run_conversation(runner, str(uuid.uuid4()), case.turns)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(threads):
+        await run_conversation(runner, str(uuid.uuid4()), case.turns)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    e2e_ms = statistics.median(e2e) * 1000
+    expected_wait_ms = (llm_calls * case.llm_latency + rounds * case.tool_latency) * 1000
+    overhead_ms = max(e2e_ms - expected_wait_ms, 0.0)
+    return {
+        "variant": variant,
+        "turns": case.turns,
+        "tools_per_round": case.tools,
+        "rounds": case.rounds if case.tools else 0,
+        "llm_latency_ms": case.llm_latency * 1000,
+        "tool_latency_ms": case.tool_latency * 1000,
+        "e2e_ms": round(e2e_ms, 3),
+        "e2e_ms_min": round(min(e2e) * 1000, 3),
+        "llm_calls": llm_calls,
+        "tool_calls": tool_calls,
+        "expected_wait_ms": round(expected_wait_ms, 3),
+        "overhead_ms": round(overhead_ms, 3),
+        "overhead_per_step_ms": round(overhead_ms / max(llm_calls + rounds, 1), 4),
+        "checkpoint_ms": round(statistics.median(checkpoint) * 1000, 3) if checkpoint else None,
+        "checkpoint_ops": checkpoint_ops,
+        "checkpoint_bytes": checkpoint_bytes,
+        "memory_kb_per_thread": round(retained / threads / 1024, 2),
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def case_key(record: dict) -> tuple:
+    return (
+        record["variant"],
+        record["turns"],
+        record["tools_per_round"],
+        record["rounds"],
+        record["llm_latency_ms"],
+        record["tool_latency_ms"],
+    )
+
+
+def load_baseline(path: str) -> dict[tuple, dict]:
+    """同じ条件の結果が複数あれば、最後（最新）のものを使う"""
+    baseline = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                baseline[case_key(record)] = record
+    return baseline
+
+
+def compare(records: list[dict], baseline: dict[tuple, dict], threshold: float) -> list[str]:
+    regressions = []
+    for record in records:
+        previous = baseline.get(case_key(record))
+        if previous is None:
+            continue
+        for metric in TRACKED_METRICS:
+            new, old = record.get(metric), previous.get(metric)
+            if new is None or old is None or new - old < MIN_DELTA:
+                continue
+            if new > old * threshold:
+                regressions.append(
+                    f"{record['variant']} turns={record['turns']} tools={record['tools_per_round']}: "
+                    f"{metric} {old} -> {new}（{new / old if old else float('inf'):.2f}x、"
+                    f"{previous.get('git_rev')} -> {record.get('git_rev')}）"
+                )
+    return regressions
+
+
+def report(record: dict):
+    checkpoint_ms = record["checkpoint_ms"]
+    checkpoint_kb = record["checkpoint_bytes"]
+    print(
+        f"{record['variant']:<11} {record['turns']:>5} {record['tools_per_round']:>5} "
+        f"{record['llm_calls']:>5} {record['tool_calls']:>5} "
+        f"{record['e2e_ms']:>10.1f} {record['overhead_ms']:>10.1f} "
+        f"{record['overhead_per_step_ms']:>9.3f} "
+        f"{'-' if checkpoint_ms is None else f'{checkpoint_ms:.1f}':>9} "
+        f"{'-' if checkpoint_kb is None else f'{checkpoint_kb / 1024:.1f}':>9} "
+        f"{record['memory_kb_per_thread']:>9.1f}",
+        flush=True,
+    )
+
+
+def int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",")]
+
+
+async def run_suite(args) -> list[dict]:
+    meta = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_rev": git_revision(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "threads": args.threads,
+    }
+    print(
+        f"{'variant':<11} {'turns':>5} {'tools':>5} {'llm':>5} {'calls':>5} "
+        f"{'e2e(ms)':>10} {'ovh(ms)':>10} {'ovh/step':>9} {'ckpt(ms)':>9} "
+        f"{'ckpt(KB)':>9} {'mem(KB)':>9}"
+    )
+    records = []
+    for variant in args.variants.split(","):
+        for turns in int_list(args.turns):
+            for tools in int_list(args.tools):
+                case = Case(turns, tools, args.rounds, args.llm_latency, args.tool_latency)
+                record = {**meta, **await measure(variant, case, args.repeat, args.threads)}
+                report(record)
+                records.append(record)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--variants", default=",".join(VARIANTS))
+    parser.add_argument("--turns", default="1,4,16", help="会話のターン数（カンマ区切り）")
+    parser.add_argument("--tools", default="0,1,4", help="1ラウンドのツール呼び出しの数（カンマ区切り）")
+    parser.add_argument("--rounds", type=int, default=1, help="1ターンのツール呼び出しのラウンド数")
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--tool-latency", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=10, help="メモリの計測で実行する会話の数")
+    parser.add_argument("--output", help="結果を追記する JSONL ファイル")
+    parser.add_argument("--baseline", help="比較する以前の結果（JSONL）")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    parser.add_argument("--trace", action="store_true", help="span を記録して集計を表示する")
+    args = parser.parse_args()
+
+    unknown = set(args.variants.split(",")) - set(VARIANTS)
+    if unknown:
+        parser.error(f"未知の variant です: {sorted(unknown)}（{', '.join(VARIANTS)}）")
+
+    if args.trace and not any(isinstance(e, SpanAggregator) for e in tracer.exporters):
+        tracer.exporters.append(SpanAggregator())
+    records = asyncio.run(run_suite(args))
+    for exporter in tracer.exporters:
+        if isinstance(exporter, SpanAggregator):
+            print(f"\n[trace]\n{exporter.summary()}")
+
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"\n{len(records)} 件の結果を {args.output} に追記しました")
+
+    if args.baseline:
+        regressions = compare(records, load_baseline(args.baseline), args.threshold)
+        if regressions:
+            print(f"\n{args.threshold}x を超えて悪化した値が {len(regressions)} 件あります:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nベースラインからの悪化はありません（しきい値 {args.threshold}x）")
+
+
+if __name__ == "__main__":
+    main()
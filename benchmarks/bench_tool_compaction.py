@@ -0,0 +1,179 @@
+"""tool_compaction.py でツールの結果を小さくした場合に、履歴に戻るトークン数がどれだけ減るかを比べるベンチマーク
+
+実際の API は呼ばず、次のようなツールの結果を作って ToolOutputCompactor に通す。
+ - tavily_search:  TavilySearch と同じ形の結果（raw_content の HTML・images・utm 付きの重複した URL を含む）
+ - aws_knowledge:  MCP のツールが返すコンテンツブロック（ドキュメントの HTML）
+ - get_jp_holiday: main.py の祝日ツールの JSON
+本文の文（「Subscribe an SQS queue ...」など）が定型文として除かれないことと、
+LangGraph の ToolNode（awrap_tool_call）と ToolRegistry（postprocess）を通した場合も確かめ、
+--turns 回のターンで結果を送り直したときの合計トークン数（見積もり）を表示する。
+
+実行例: python benchmarks/bench_tool_compaction.py --results 5 --turns 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from langchain_core.messages import AIMessage  # noqa: E402
+from langchain_core.tools import tool  # noqa: E402
+from langgraph.graph import END, START, MessagesState, StateGraph  # noqa: E402
+from langgraph.prebuilt import ToolNode  # noqa: E402
+
+from tool_compaction import ToolOutputCompactor, clean_text, estimate_tokens  # noqa: E402
+from tool_loop import ToolRegistry  # noqa: E402
+
+PARAGRAPH = (
+    "Amazon Bedrock は、主要な AI 企業の基盤モデルを単一の API で利用できるフルマネージドサービスです。"
+    "Anthropic, Meta, Mistral AI, Amazon などのモデルを選択でき、用途に合わせてカスタマイズできます。 "
+)
+PAGE = (
+    "<html><head><style>body {{ font-family: sans-serif; }}</style>"
+    "<script>window.dataLayer = [];</script></head><body>"
+    "<nav><a href='/'>Home</a> <a href='/docs'>Docs</a></nav>"
+    "<p>Skip to main content</p><h1>{title}</h1><p>{body}</p>"
+    "<p>Cookie の設定を変更できます。</p>"
+    "<footer>© 2025, Amazon Web Services, Inc. All rights reserved.</footer></body></html>"
+)
+
+
+def tavily_output(n_results: int) -> dict:
+    results = []
+    for i in range(n_results):
+        # 検索結果の半分は、utm のパラメータや末尾の / だけが違う同じページ
+        url = f"https://aws.amazon.com/bedrock/page-{i // 2}"
+        if i % 2:
+            url += "/?utm_source=search&utm_medium=web"
+        title = f"Amazon Bedrock の概要 {i // 2}"
+        results.append(
+            {
+                "url": url,
+                "title": title,
+                "content": PARAGRAPH * 4,
+                "score": round(0.9 - i * 0.05, 2),
+                "raw_content": PAGE.format(title=title, body=PARAGRAPH * 20),
+            }
+        )
+    return {
+        "query": "Amazon Bedrock モデルプロバイダー",
+        "follow_up_questions": None,
+        "answer": None,
+        "images": [f"https://example.com/image-{i}.png" for i in range(n_results)],
+        "results": results,
+        "response_time": 1.23,
+        "request_id": "9f1c2d3e-0000-4000-8000-000000000000",
+    }
+
+
+def mcp_output() -> list[dict]:
+    return [
+        {"type": "text", "text": PAGE.format(title="Supported models", body=PARAGRAPH * 12)},
+        {"type": "text", "text": PAGE.format(title="Model providers", body=PARAGRAPH * 12)},
+    ]
+
+
+def holiday_output() -> dict:
+    return {
+        "year": 2025,
+        "month": 7,
+        "holidays": [{"date": "2025-07-21", "name": "海の日"}],
+        "count": 1,
+    }
+
+
+def check_tool_node(compactor: ToolOutputCompactor, n_results: int) -> tuple[int, int]:
+    """ToolNode(awrap_tool_call=...) を通した ToolMessage の content のトークン数（前, 後）"""
+
+    @tool
+    def tavily_search(query: str) -> dict:
+        """Web検索の代わりに決まった結果を返すツール"""
+        return tavily_output(n_results)
+
+    message = AIMessage(
+        content="",
+        tool_calls=[{"name": "tavily_search", "args": {"query": "bedrock"}, "id": "call_0"}],
+    )
+
+    def run(tool_node: ToolNode) -> str:
+        builder = StateGraph(MessagesState)
+        builder.add_node("tools", tool_node)
+        builder.add_edge(START, "tools")
+        builder.add_edge("tools", END)
+        result = asyncio.run(builder.compile().ainvoke({"messages": [message]}))
+        return result["messages"][-1].content
+
+    before = run(ToolNode([tavily_search]))
+    after = run(ToolNode([tavily_search], awrap_tool_call=compactor.awrap_tool_call))
+    output_id = json.loads(after)["full_output_id"]
+    assert compactor.store.get(output_id) == json.loads(before), "元の結果を取り出せない"
+    return estimate_tokens(before), estimate_tokens(after)
+
+
+def check_plain_text():
+    """HTML ではない文字列と、HTML の本文の文は定型文として除かない"""
+    text = (
+        "Subscribe an SQS queue to the SNS topic to fan out messages.\n"
+        "Sign in to the console and open SNS.\n"
+        "Copyright notice required by the license."
+    )
+    assert clean_text(text) == text, clean_text(text)
+    page = "".join(f"<p>{line}</p>" for line in text.splitlines())
+    page += "<p>Sign in</p><p>Subscribe</p><p>© 2025, Amazon Web Services, Inc. All rights reserved.</p>"
+    assert clean_text(page) == text, clean_text(page)
+
+
+def check_registry(compactor: ToolOutputCompactor) -> dict:
+    """ToolRegistry(postprocess=...) を通した toolResult"""
+    spec = {"toolSpec": {"name": "get_jp_holiday", "inputSchema": {"json": {}}}}
+    registry = ToolRegistry(
+        [spec], {"get_jp_holiday": holiday_output}, postprocess=compactor.compact
+    )
+    return registry.call({"toolUseId": "t0", "name": "get_jp_holiday", "input": {}})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--max-field-tokens", type=int, default=300)
+    args = parser.parse_args()
+
+    check_plain_text()
+    compactor = ToolOutputCompactor(max_field_tokens=args.max_field_tokens, verbose=False)
+    outputs = {
+        "tavily_search": tavily_output(args.results),
+        "aws_knowledge": mcp_output(),
+        "get_jp_holiday": holiday_output(),
+    }
+    print(
+        f"検索結果 {args.results} 件 / 項目ごとの上限 {args.max_field_tokens} トークン / "
+        f"以降 {args.turns} ターン送り直す"
+    )
+    print(
+        f"  {'tool':<15} {'before':>8} {'after':>8} {'reduced':>8} "
+        f"{'resent(before)':>15} {'resent(after)':>14}"
+    )
+    for name, output in outputs.items():
+        compacted = compactor.compact(name, output)
+        before, after = estimate_tokens(output), estimate_tokens(compacted)
+        print(
+            f"  {name:<15} {before:>8} {after:>8} {1 - after / before:>8.0%} "
+            f"{before * args.turns:>15} {after * args.turns:>14}"
+        )
+
+    before, after = check_tool_node(compactor, args.results)
+    print(
+        f"\nToolNode(awrap_tool_call): {before} -> {after} トークン"
+        "（元の結果は full_output_id で取り出せる）"
+    )
+    result = check_registry(compactor)
+    print(f"ToolRegistry(postprocess): {result['toolResult']['content']}")
+    print(compactor.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""ツールループの並行実行ベンチマーク
+
+1ターンで複数の toolUse を返すスタブモデルに対し、
+ツールを逐次実行（max_workers=1）した場合と並行実行した場合の所要時間を比較する。
+
+実行例: python benchmarks/bench_tool_loop.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from stub_bedrock import StubBedrockClient, text_turn, tool_turn  # noqa: E402
+from tool_loop import ToolRegistry, run_tool_loop  # noqa: E402
+
+TOOL_LATENCIES = {"search_a": 0.3, "search_b": 0.2, "search_c": 0.1, "slow": 5.0}
+
+TOOL_SPECS = [
+    {
+        "toolSpec": {
+            "name": name,
+            "description": name,
+            "inputSchema": {"json": {"type": "object", "properties": {}}},
+        }
+    }
+    for name in TOOL_LATENCIES
+]
+
+
+def make_tool(name: str):
+    def run() -> dict:
+        time.sleep(TOOL_LATENCIES[name])
+        return {"tool": name}
+
+    return run
+
+
+def run_once(
+    script: list, max_workers: int | None, timeouts: dict[str, float] | None = None
+) -> tuple[float, list]:
+    client = StubBedrockClient(script, first_token_latency=0.0, per_token_latency=0.0)
+    registry = ToolRegistry(
+        TOOL_SPECS,
+        {name: make_tool(name) for name in TOOL_LATENCIES},
+        timeouts=timeouts or {"slow": 0.5},
+    )
+    start = time.perf_counter()
+    result = run_tool_loop(
+        lambda messages: client.converse(messages=messages),
+        [{"role": "user", "content": [{"text": "調べて"}]}],
+        registry,
+        max_workers=max_workers,
+    )
+    return time.perf_counter() - start, result.messages
+
+
+def main():
+    # 2ターン連続で複数ツールを呼び、最後にテキストで回答する
+    script = [
+        tool_turn(("1", "search_a", {}), ("2", "search_b", {}), ("3", "search_c", {})),
+        tool_turn(("4", "search_a", {}), ("5", "search_b", {})),
+        text_turn("完了"),
+    ]
+    sequential, _ = run_once(script, max_workers=1)
+    parallel, messages = run_once(script, max_workers=None)
+    tool_result_messages = [
+        m for m in messages if any("toolResult" in c for c in m["content"])
+    ]
+    print(f"sequential: {sequential * 1000:7.1f}ms (ツール時間の合計 = 1100ms)")
+    print(f"parallel:   {parallel * 1000:7.1f}ms (各ターンの最大 = 600ms)")
+    print(
+        "toolResult messages:",
+        [len(m["content"]) for m in tool_result_messages],
+    )
+
+    # タイムアウトしたツールは error の toolResult として返る
+    script = [tool_turn(("1", "slow", {}), ("2", "search_c", {})), text_turn("完了")]
+    elapsed, messages = run_once(script, max_workers=None)
+    statuses = [c["toolResult"].get("status", "success") for c in messages[2]["content"]]
+    print(f"timeout:    {elapsed * 1000:7.1f}ms statuses={statuses}")
+    leaked = [t for t in threading.enumerate() if t.name == "tool-slow"]
+    assert leaked and all(t.daemon for t in leaked), leaked
+    print(f"タイムアウトしたツールのスレッド: {len(leaked)} 本（daemon なので終了を妨げない）")
+
+    # タイムアウトは順番待ちの時間を含めず、実行を始めた時刻から数える
+    # （search_a 0.3秒 x 3 を1つずつ実行し、3つ目は開始まで 0.6秒待つ）
+    script = [
+        tool_turn(("1", "search_a", {}), ("2", "search_a", {}), ("3", "search_a", {})),
+        text_turn("完了"),
+    ]
+    elapsed, messages = run_once(script, max_workers=1, timeouts={"search_a": 0.5})
+    statuses = [c["toolResult"].get("status", "success") for c in messages[2]["content"]]
+    assert statuses == ["success"] * 3, statuses
+    print(f"queued:     {elapsed * 1000:7.1f}ms statuses={statuses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""ベンチマーク用のスクリプトされたチャットモデル（LangChain / Strands / Bedrock Converse）
+
+どちらのモデルも、最後のユーザーの入力のあとに何回ツールを呼び出したか（ラウンド数）だけを見て、次の応答を決める。
+ - tool_rounds ラウンドまでは tool_calls_per_round 個のツール呼び出しを同時に返す
+ - それ以降は最終回答（answer_words 語のテキスト）を返す
+ツール名は tool_names を順に使い、引数は tool_args(name, 通し番号) で作る。
+呼び出しIDはモデルの呼び出し回数から作るので、同じ手順で実行すれば毎回同じ応答になる。
+応答を返すまで latency 秒待つ（同期は time.sleep、非同期は asyncio.sleep）。
+
+ツールのスタブ（langchain_stub_tool / strands_stub_tool）は tool_latency 秒待って固定の文字列を返す。
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Callable
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import StructuredTool
+from strands import tool as strands_tool
+from strands.models.model import Model
+
+
+def default_tool_args(name: str, call_index: int) -> dict:
+    return {"query": f"{name} {call_index}"}
+
+
+class Script:
+    """ツール呼び出しの並びと、呼び出し回数の記録"""
+
+    def __init__(
+        self,
+        tool_names: list[str],
+        tool_calls_per_round: int = 1,
+        tool_rounds: int = 1,
+        answer_words: int = 50,
+        latency: float = 0.0,
+        tool_args: Callable[[str, int], dict] = default_tool_args,
+    ):
+        self.tool_names = tool_names
+        self.tool_calls_per_round = tool_calls_per_round
+        self.tool_rounds = tool_rounds if tool_calls_per_round else 0
+        self.answer_words = answer_words
+        self.latency = latency
+        self.tool_args = tool_args
+        self.calls = 0
+        self.tool_calls = 0
+        # ツール呼び出しを返した応答の数（ツールの待ち時間はラウンドごとに1回かかる）
+        self.rounds = 0
+
+    def next_turn(self, rounds_done: int) -> tuple[str, list[dict]]:
+        """(テキスト, [{"id", "name", "args"}]) を返す"""
+        self.calls += 1
+        if rounds_done >= self.tool_rounds:
+            return " ".join(f"word{i}" for i in range(self.answer_words)), []
+        calls = []
+        for i in range(self.tool_calls_per_round):
+            name = self.tool_names[i % len(self.tool_names)]
+            calls.append(
+                {
+                    "id": f"call_{self.calls}_{i}",
+                    "name": name,
+                    "args": self.tool_args(name, self.tool_calls + i),
+                }
+            )
+        self.tool_calls += len(calls)
+        self.rounds += 1
+        return "", calls
+
+
+class ScriptedChatModel(BaseChatModel):
+    """LangChain のチャットモデル（bind_tools() したものだけがツールを呼び出す）
+
+    bind_tools() していないモデル（要約用など）は、常に最終回答のテキストを返す。
+    """
+
+    script: Any
+    tools_bound: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"tools_bound": True})
+
+    def _respond(self, messages) -> AIMessage:
+        human_indexes = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+        after = messages[human_indexes[-1] + 1 :] if human_indexes else messages
+        rounds_done = sum(1 for m in after if isinstance(m, AIMessage) and m.tool_calls)
+        if not self.tools_bound:
+            rounds_done = self.script.tool_rounds
+        text, calls = self.script.next_turn(rounds_done)
+        return AIMessage(
+            content=text,
+            tool_calls=[{**call, "type": "tool_call"} for call in calls],
+            id=f"run_{self.script.calls}",
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.script.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.script.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+
+class ScriptedStrandsModel(Model):
+    """Strands のモデル（toolUse / テキストをストリーミングのイベントで返す）"""
+
+    def __init__(self, script: Script):
+        self.script = script
+
+    def update_config(self, **model_config):
+        pass
+
+    def get_config(self):
+        return {}
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        raise NotImplementedError
+        yield
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        content = converse_content(self.script, messages)
+        await asyncio.sleep(self.script.latency)
+
+        yield {"messageStart": {"role": "assistant"}}
+        for block in content:
+            if "text" in block:
+                yield {"contentBlockDelta": {"delta": {"text": block["text"]}}}
+            else:
+                tool_use = block["toolUse"]
+                yield {
+                    "contentBlockStart": {
+                        "start": {
+                            "toolUse": {"toolUseId": tool_use["toolUseId"], "name": tool_use["name"]}
+                        }
+                    }
+                }
+                yield {
+                    "contentBlockDelta": {
+                        "delta": {"toolUse": {"input": json.dumps(tool_use["input"])}}
+                    }
+                }
+            yield {"contentBlockStop": {}}
+        stop_reason = "tool_use" if any("toolUse" in b for b in content) else "end_turn"
+        yield {"messageStop": {"stopReason": stop_reason}}
+
+
+def converse_content(script: Script, messages: list[dict]) -> list[dict]:
+    """Bedrock Converse 形式の履歴（Strands も同じ形式）に対する応答の content"""
+    user_indexes = [
+        i
+        for i, m in enumerate(messages)
+        if m["role"] == "user" and not any("toolResult" in c for c in m["content"])
+    ]
+    after = messages[user_indexes[-1] + 1 :] if user_indexes else messages
+    rounds_done = sum(
+        1 for m in after if m["role"] == "assistant" and any("toolUse" in c for c in m["content"])
+    )
+    text, calls = script.next_turn(rounds_done)
+    if not calls:
+        return [{"text": text}]
+    return [
+        {"toolUse": {"toolUseId": call["id"], "name": call["name"], "input": call["args"]}}
+        for call in calls
+    ]
+
+
+def scripted_converse(script: Script):
+    """bedrock-runtime の converse の代わりになる関数（tool_loop.run_tool_loop 用）"""
+
+    def converse(messages: list[dict]) -> dict:
+        content = converse_content(script, messages)
+        time.sleep(script.latency)
+        return {"output": {"message": {"role": "assistant", "content": content}}}
+
+    return converse
+
+
+def langchain_stub_tool(name: str, params: list[str], latency: float) -> StructuredTool:
+    """params を引数に取り、latency 秒待って結果を返す LangChain のツール"""
+
+    def run(**kwargs) -> str:
+        time.sleep(latency)
+        return f"{name} の結果: {kwargs}"
+
+    async def arun(**kwargs) -> str:
+        await asyncio.sleep(latency)
+        return f"{name} の結果: {kwargs}"
+
+    return StructuredTool.from_function(
+        func=run,
+        coroutine=arun,
+        name=name,
+        description=f"{name}（ベンチマーク用のスタブ）",
+        args_schema={
+            "type": "object",
+            "properties": {p: {"type": "string"} for p in params},
+            "required": params,
+        },
+    )
+
+
+def strands_stub_tool(name: str, latency: float):
+    """query を引数に取り、latency 秒待って結果を返す Strands のツール"""
+
+    @strands_tool(name=name, description=f"{name}（ベンチマーク用のスタブ）")
+    async def run(query: str) -> str:
+        await asyncio.sleep(latency)
+        return f"{name} の結果: {query}"
+
+    return run
@@ -0,0 +1,174 @@
+"""ベンチマーク用の bedrock-runtime クライアントのスタブ
+
+converse / converse_stream を実装し、あらかじめ用意した応答（スクリプト）を
+指定したレイテンシで順に返す。実際の Bedrock には一切接続しない。
+"""
+
+import json
+import time
+
+
+def text_turn(text: str) -> list[dict]:
+    """テキストのみを返すターン"""
+    return [{"text": text}]
+
+
+def tool_turn(*calls: tuple[str, str, dict], text: str | None = None) -> list[dict]:
+    """toolUse を返すターン（calls は (toolUseId, name, input) の並び）"""
+    content = [{"text": text}] if text else []
+    for tool_use_id, name, tool_input in calls:
+        content.append(
+            {"toolUse": {"toolUseId": tool_use_id, "name": name, "input": tool_input}}
+        )
+    return content
+
+
+class StubBedrockClient:
+    """スクリプトされた応答を返す bedrock-runtime クライアント
+
+    - first_token_latency: 最初のトークンが返るまでの待ち時間（秒）
+    - per_token_latency: 以降のトークン1つあたりの生成時間（秒）
+    - per_input_token_latency: キャッシュされていない入力トークン1つあたりの処理時間（秒）
+    応答のトークンは空白区切りの単語を1トークンとして扱う。
+    入力トークンはリクエストのJSONの4文字を1トークンとして概算し、
+    cachePoint より前の部分が以前のリクエストと一致すればキャッシュ読み込みとして数える。
+    """
+
+    def __init__(
+        self,
+        script: list[list[dict]],
+        first_token_latency: float = 0.2,
+        per_token_latency: float = 0.01,
+        per_input_token_latency: float = 0.0,
+    ):
+        self.script = script
+        self.first_token_latency = first_token_latency
+        self.per_token_latency = per_token_latency
+        self.per_input_token_latency = per_input_token_latency
+        self.calls: list[dict] = []
+        self._turn = 0
+        self._cached_prefixes: set[str] = set()
+        self._last_input_usage: dict = {}
+
+    def _next_turn(self, kwargs: dict) -> list[dict]:
+        self.calls.append(kwargs)
+        self._last_input_usage = self._input_usage(kwargs)
+        content = self.script[self._turn % len(self.script)]
+        self._turn += 1
+        return content
+
+    def _input_usage(self, kwargs: dict) -> dict:
+        # Bedrock と同じく tools -> system -> messages の順に並べる
+        items = list((kwargs.get("toolConfig") or {}).get("tools", []))
+        items += list(kwargs.get("system") or [])
+        for message in kwargs.get("messages") or []:
+            items += [{"role": message["role"], **b} for b in message["content"]]
+
+        serialized = [json.dumps(item, ensure_ascii=False) for item in items]
+        total = sum(len(s) for s in serialized) // 4
+        cache_points = [i for i, item in enumerate(items) if "cachePoint" in item]
+        if not cache_points:
+            return {"inputTokens": total}
+
+        # 最後のキャッシュポイントより前だけを比較する（前方一致）
+        prefixes = ["".join(serialized[:i]) for i in cache_points]
+        read_prefix = max(
+            (p for p in prefixes if p in self._cached_prefixes), key=len, default=""
+        )
+        self._cached_prefixes.update(prefixes)
+        longest = prefixes[-1]
+        cache_read = len(read_prefix) // 4
+        cache_write = (len(longest) - len(read_prefix)) // 4
+        return {
+            "inputTokens": total - cache_read - cache_write,
+            "cacheReadInputTokens": cache_read,
+            "cacheWriteInputTokens": cache_write,
+        }
+
+    def _input_latency(self) -> float:
+        uncached = self._last_input_usage.get("inputTokens", 0) + (
+            self._last_input_usage.get("cacheWriteInputTokens", 0)
+        )
+        return self.per_input_token_latency * uncached
+
+    @staticmethod
+    def _tokens(content: list[dict]) -> list[str]:
+        tokens = []
+        for block in content:
+            if "text" in block:
+                tokens.extend(word + " " for word in block["text"].split())
+            if "toolUse" in block:
+                # toolUse の input は4文字ずつの断片を1トークンとして扱う
+                raw = json.dumps(block["toolUse"]["input"])
+                tokens.extend(raw[i : i + 4] for i in range(0, len(raw), 4))
+        return tokens
+
+    def _usage(self, content: list[dict]) -> dict:
+        output_tokens = len(self._tokens(content))
+        return {**self._last_input_usage, "outputTokens": output_tokens}
+
+    def converse(self, **kwargs) -> dict:
+        content = self._next_turn(kwargs)
+        tokens = self._tokens(content)
+        time.sleep(
+            self._input_latency()
+            + self.first_token_latency
+            + self.per_token_latency * len(tokens)
+        )
+        stop_reason = (
+            "tool_use" if any("toolUse" in c for c in content) else "end_turn"
+        )
+        return {
+            "output": {"message": {"role": "assistant", "content": content}},
+            "stopReason": stop_reason,
+            "usage": self._usage(content),
+        }
+
+    def converse_stream(self, **kwargs) -> dict:
+        content = self._next_turn(kwargs)
+        return {"stream": self._events(content)}
+
+    def _events(self, content: list[dict]):
+        time.sleep(self._input_latency() + self.first_token_latency)
+        yield {"messageStart": {"role": "assistant"}}
+
+        for index, block in enumerate(content):
+            if "text" in block:
+                for word in block["text"].split():
+                    time.sleep(self.per_token_latency)
+                    yield {
+                        "contentBlockDelta": {
+                            "contentBlockIndex": index,
+                            "delta": {"text": word + " "},
+                        }
+                    }
+            elif "toolUse" in block:
+                tool_use = block["toolUse"]
+                yield {
+                    "contentBlockStart": {
+                        "contentBlockIndex": index,
+                        "start": {
+                            "toolUse": {
+                                "toolUseId": tool_use["toolUseId"],
+                                "name": tool_use["name"],
+                            }
+                        },
+                    }
+                }
+                # input のJSONは数文字ずつの断片に分けて届ける
+                raw = json.dumps(tool_use["input"])
+                for i in range(0, len(raw), 4):
+                    time.sleep(self.per_token_latency)
+                    yield {
+                        "contentBlockDelta": {
+                            "contentBlockIndex": index,
+                            "delta": {"toolUse": {"input": raw[i : i + 4]}},
+                        }
+                    }
+            yield {"contentBlockStop": {"contentBlockIndex": index}}
+
+        stop_reason = (
+            "tool_use" if any("toolUse" in c for c in content) else "end_turn"
+        )
+        yield {"messageStop": {"stopReason": stop_reason}}
+        yield {"metadata": {"usage": self._usage(content), "metrics": {}}}
@@ -0,0 +1,131 @@
+"""ベンチマーク用の、障害を注入できる Bedrock（bedrock-runtime）の HTTP サーバーのスタブ
+
+ローカルのポートで POST /model/{modelId}/converse を受け付け、固定のテキストの応答を返す。
+boto3 のクライアントを endpoint_url でこのサーバーに向ければ、リトライや接続プールも含めて
+実際の呼び出しと同じ経路を通る（実際の Bedrock には一切接続しない）。
+ - latency:       応答までの待ち時間（秒）
+ - tail_rate:     その割合のリクエストだけ tail_latency 秒待たせる（遅い応答の裾野）
+ - throttle_rate: その割合のリクエストに 429 ThrottlingException を返す
+ - capacity:      同時に処理するリクエストの上限。超えた分には 429 ThrottlingException を返す（0 は無制限）
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_CONVERSE_PATH = re.compile(r"^/model/[^/]+/converse$")
+
+
+class FaultyBedrockServer:
+    def __init__(
+        self,
+        latency: float = 0.05,
+        tail_rate: float = 0.0,
+        tail_latency: float = 1.0,
+        throttle_rate: float = 0.0,
+        capacity: int = 0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.throttle_rate = throttle_rate
+        self.capacity = capacity
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.stats = {"requests": 0, "throttled": 0, "slow": 0}
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FaultyBedrockServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.stats = {"requests": 0, "throttled": 0, "slow": 0}
+
+    def _admit(self) -> tuple[bool, float]:
+        """(受け付けるか, 待ち時間) を決める"""
+        with self._lock:
+            self.stats["requests"] += 1
+            throttled = self._random.random() < self.throttle_rate or (
+                self.capacity and self.in_flight >= self.capacity
+            )
+            if throttled:
+                self.stats["throttled"] += 1
+                return False, 0.0
+            self.in_flight += 1
+            slow = self._random.random() < self.tail_rate
+            if slow:
+                self.stats["slow"] += 1
+            return True, self.tail_latency if slow else self.latency
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, body: dict, headers: dict | None = None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if not _CONVERSE_PATH.match(self.path):
+                    self._reply(404, {"message": "not found"})
+                    return
+                admitted, delay = server._admit()
+                if not admitted:
+                    self._reply(
+                        429,
+                        {"message": "Too many requests, please wait before trying again."},
+                        {"x-amzn-ErrorType": "ThrottlingException"},
+                    )
+                    return
+                try:
+                    time.sleep(delay)
+                finally:
+                    server._release()
+                self._reply(
+                    200,
+                    {
+                        "output": {
+                            "message": {"role": "assistant", "content": [{"text": "ok"}]}
+                        },
+                        "stopReason": "end_turn",
+                        "usage": {"inputTokens": 10, "outputTokens": 1, "totalTokens": 11},
+                        "metrics": {"latencyMs": int(delay * 1000)},
+                    },
+                )
+
+        return Handler
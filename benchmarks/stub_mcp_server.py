@@ -0,0 +1,54 @@
+"""ベンチマーク用のMCPサーバーのスタブ（stdio）
+
+npx でのパッケージ解決やサーバーの初期化を模して、起動時に STARTUP_DELAY 秒待つ。
+STUB_MCP_CRASH_MARKER にファイルのパスを指定すると、そのファイルがない間は crash_once の呼び出しの
+途中でサーバーのプロセスを終了する（ファイルを作ってから終了するので、再起動後の呼び出しは成功する）。
+"""
+
+import os
+import time
+
+from mcp.server.fastmcp import FastMCP, Image
+
+time.sleep(float(os.getenv("STUB_MCP_STARTUP_DELAY", "1.0")))
+
+mcp = FastMCP("stub", log_level="WARNING")
+
+
+@mcp.tool()
+def search_docs(query: str) -> str:
+    """ドキュメントを検索する"""
+    return f"{query} に関するドキュメント"
+
+
+@mcp.tool()
+def slow_search(query: str) -> str:
+    """時間のかかる検索（0.5秒待つ）"""
+    time.sleep(0.5)
+    return f"{query} に関するドキュメント"
+
+
+@mcp.tool()
+def render_chart(query: str) -> list:
+    """説明の文と画像を返す"""
+    return [f"{query} のグラフ", Image(data=b"\x89PNG\r\n\x1a\n", format="png")]
+
+
+@mcp.tool()
+def write_file(path: str, content: str) -> str:
+    """ファイルに書き込む（スタブなので実際には書き込まない）"""
+    return f"{path} に {len(content)} 文字書き込みました"
+
+
+@mcp.tool()
+def crash_once(query: str) -> str:
+    """1回目の呼び出しの途中でサーバーが落ちる検索"""
+    marker = os.getenv("STUB_MCP_CRASH_MARKER")
+    if marker and not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return f"{query} に関するドキュメント"
+
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
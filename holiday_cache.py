@@ -0,0 +1,183 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+# NOTE: `holiday-jp.github.io` ではなく `holidays-jp.github.io` が正しいエンドポイント。
+HOLIDAY_API_URL = "https://holidays-jp.github.io/api/v1/date.json"
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "agent_book", "holidays.json"
+)
+# 祝日データは年に数回しか更新されないため、1日を既定のTTLとする
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+
+class HolidayCache:
+    """祝日APIのレスポンスをディスクにキャッシュし、年ごとの索引で引けるようにする。
+
+    - TTL内はネットワークに出ずメモリ/ディスクのデータを返す
+    - TTL切れの場合は ETag / Last-Modified を使った条件付きGETで再検証する
+    - serve_stale=True の場合、APIに接続できなくても古いデータで応答する
+    """
+
+    def __init__(
+        self,
+        url: str = HOLIDAY_API_URL,
+        cache_path: str | None = DEFAULT_CACHE_PATH,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        serve_stale: bool = True,
+        timeout: float = 10,
+    ):
+        self.url = url
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.serve_stale = serve_stale
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._holidays: dict[str, str] = {}  # {"YYYY-MM-DD": "祝日名", ...}
+        self._fetched_at = 0.0
+        self._etag: str | None = None
+        self._last_modified: str | None = None
+
+        # 索引: 全日付のソート済みリストと、年 -> ソート済み日付リスト
+        self._dates: list[str] = []
+        self._year_index: dict[int, list[str]] = {}
+
+    # ---
+    # 検索API
+    # ---
+    def by_year(self, year: int) -> dict[str, str]:
+        """指定年の祝日を返す"""
+        self._ensure_fresh()
+        dates = self._year_index.get(int(year), [])
+        return {d: self._holidays[d] for d in dates}
+
+    def by_month(self, year: int, month: int) -> dict[str, str]:
+        """指定年月の祝日を返す"""
+        self._ensure_fresh()
+        dates = self._year_index.get(int(year), [])
+        prefix = f"{int(year):04d}-{int(month):02d}-"
+        lo = bisect_left(dates, prefix)
+        hi = bisect_right(dates, prefix + "99")
+        return {d: self._holidays[d] for d in dates[lo:hi]}
+
+    def between(self, start: str, end: str) -> dict[str, str]:
+        """start <= 日付 <= end（YYYY-MM-DD、両端を含む）の祝日を返す"""
+        self._ensure_fresh()
+        lo = bisect_left(self._dates, start)
+        hi = bisect_right(self._dates, end)
+        return {d: self._holidays[d] for d in self._dates[lo:hi]}
+
+    # ---
+    # キャッシュの管理
+    # ---
+    def _ensure_fresh(self):
+        with self._lock:
+            if not self._loaded:
+                self._load_from_disk()
+                self._loaded = True
+
+            if self._holidays and time.time() - self._fetched_at < self.ttl:
+                return
+
+            try:
+                self._revalidate()
+            except RuntimeError:
+                if self._holidays and self.serve_stale:
+                    print(
+                        "祝日APIに接続できないため、キャッシュ済みの古いデータを返します。",
+                        file=sys.stderr,
+                    )
+                    return
+                raise
+
+    def _revalidate(self):
+        headers = {"User-Agent": "agent_book/1.0 (urllib)"}
+        if self._holidays:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+
+        req = Request(self.url, headers=headers)
+        try:
+            with urlopen(req, timeout=self.timeout) as response:
+                data = response.read().decode("utf-8")
+                holidays = json.loads(data)
+                self._etag = response.headers.get("ETag")
+                self._last_modified = response.headers.get("Last-Modified")
+        except HTTPError as e:
+            # 304 Not Modified は urllib では HTTPError として送出される
+            if e.code == 304 and self._holidays:
+                self._fetched_at = time.time()
+                self._save_to_disk()
+                return
+            raise RuntimeError(
+                f"祝日APIがHTTPエラーを返しました: {e.code} {e.reason}\n"
+                f"URL: {self.url}\n"
+                "エンドポイントが変更/廃止された可能性があります。"
+            ) from e
+        except URLError as e:
+            raise RuntimeError(
+                f"祝日APIへの接続に失敗しました: {e.reason}\nURL: {self.url}"
+            ) from e
+        except (OSError, ValueError) as e:
+            # タイムアウトや壊れたJSONも接続失敗と同じ扱いにする
+            raise RuntimeError(
+                f"祝日APIへの接続に失敗しました: {e}\nURL: {self.url}"
+            ) from e
+
+        self._set_holidays(holidays)
+        self._fetched_at = time.time()
+        self._save_to_disk()
+
+    def _set_holidays(self, holidays: dict[str, str]):
+        self._holidays = holidays
+        self._dates = sorted(holidays)
+        year_index: dict[int, list[str]] = {}
+        for d in self._dates:
+            year_index.setdefault(int(d[:4]), []).append(d)
+        self._year_index = year_index
+
+    def _load_from_disk(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            self._set_holidays(cached["holidays"])
+            self._fetched_at = float(cached.get("fetched_at", 0))
+            self._etag = cached.get("etag")
+            self._last_modified = cached.get("last_modified")
+        except (OSError, ValueError, KeyError):
+            # 壊れたキャッシュは無視して取り直す
+            return
+
+    def _save_to_disk(self):
+        if not self.cache_path:
+            return
+        cache_dir = os.path.dirname(self.cache_path) or "."
+        os.makedirs(cache_dir, exist_ok=True)
+        payload = {
+            "fetched_at": self._fetched_at,
+            "etag": self._etag,
+            "last_modified": self._last_modified,
+            "holidays": self._holidays,
+        }
+        # 書き込み途中のファイルを読まれないよう、一時ファイルから置き換える
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,447 @@
+"""エージェントの回答のキャッシュ（同じ質問・ほぼ同じ質問には、グラフを実行せずに前回の回答を返す）
+
+同じ調査の依頼が繰り返されると、そのたびに LLM とツールを何往復もするループを最初から実行する。
+CachedGraph はコンパイル済みのグラフ（StateGraph / Functional API の entrypoint）を包み、
+入力の質問（最後の HumanMessage）で前回の出力を探す。
+ - まず、正規化した質問（全角・半角、空白、大文字小文字、末尾の句読点を統一）が一致するものを探す
+ - 見つからなければ、文字 n-gram の MinHash（LSH）で候補を絞り、n-gram の Jaccard 係数が
+   threshold 以上のもののうち最も近いものを使う（外部の埋め込みサービスは使わない）。
+   ただし、数字と英単語（年・バージョン・「ECS」「EKS」などのサービス名）がすべて一致する場合だけ
+ - 出力はエージェントごとの namespace に分けて保存する（ツールやプロンプトの違うエージェントの回答を返さない）
+ - 出力は TTL（秒）が過ぎたら使わない。件数が max_entries を超えたら古く使われたものから捨てる
+ - config の configurable に bypass_answer_cache=True を渡すと、キャッシュを使わずに実行する（結果は保存する）
+ - interrupt（承認待ち）で止まった場合は、再開して最後まで終わったときの出力を元の質問で保存する
+出力は質問だけで決まる前提なので、スレッドの履歴を使って回答するエージェントには使わない。
+また、キャッシュから返すと SNS への送信やファイルの書き込みも行われないため、副作用のある
+エージェントは side_effects=True を指定し、allow_side_effects=True で明示的に有効にした場合だけ使える。
+
+ANSWER_CACHE=1 の場合だけ with_answer_cache がグラフを包む（副作用のあるエージェントは
+ANSWER_CACHE_SIDE_EFFECTS=1 も必要）。終了時に命中率などを表示する。
+"""
+
+import atexit
+import copy
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from tool_cache import normalize_args
+
+DEFAULT_TTL = 60 * 60
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_MAX_ENTRIES = 1024
+
+# 文字 n-gram の長さと MinHash のハッシュ関数の数（BANDS × ROWS）
+NGRAM = 3
+BANDS = 16
+ROWS = 4
+_PRIME = (1 << 61) - 1
+_random = random.Random(0)
+_PERMUTATIONS = [
+    (_random.randrange(1, _PRIME), _random.randrange(0, _PRIME)) for _ in range(BANDS * ROWS)
+]
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s。、．，.,!?！？]+$")
+_KEY_TOKEN = re.compile(r"[0-9]+|[a-z]+")
+
+
+def normalize_question(question: str) -> str:
+    return _TRAILING_PUNCTUATION.sub("", normalize_args(question))
+
+
+def shingles(text: str) -> frozenset[str]:
+    """空白を除いた文字 n-gram（日本語は単語に分かち書きせずに比べられる）"""
+    compact = text.replace(" ", "")
+    if len(compact) <= NGRAM:
+        return frozenset([compact])
+    return frozenset(compact[i : i + NGRAM] for i in range(len(compact) - NGRAM + 1))
+
+
+def key_tokens(text: str) -> tuple[str, ...]:
+    """数字と英単語（ほぼ同じ質問でも一致しなければならない部分）
+
+    空白を除いてから取り出すので、「Strands Agents」と「StrandsAgents」は同じになる。
+    """
+    return tuple(sorted(_KEY_TOKEN.findall(text.replace(" ", ""))))
+
+
+def minhash(grams: frozenset[str]) -> list[int]:
+    hashes = [
+        int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "big")
+        for g in grams
+    ]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def jaccard(a: frozenset[str], b: frozenset[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _key(namespace: str, normalized: str) -> str:
+    return f"{namespace}\0{normalized}"
+
+
+@dataclass
+class _Entry:
+    namespace: str
+    question: str
+    grams: frozenset[str]
+    tokens: tuple[str, ...]
+    bands: list[tuple[int, ...]]
+    expires_at: float
+    output: Any
+
+
+class AnswerCache:
+    """正規化した質問と MinHash の索引で前回の出力を探すキャッシュ（スレッドセーフ）
+
+    Args:
+        ttl: 出力を使う期間（秒）
+        threshold: ほぼ同じ質問とみなす Jaccard 係数の下限（1.0 で完全一致のみ）
+        max_entries: 保存する件数の上限
+        allow_side_effects: 副作用のあるエージェントの出力もキャッシュしてよいか
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        threshold: float = DEFAULT_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        allow_side_effects: bool = False,
+    ):
+        self.ttl = ttl
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.allow_side_effects = allow_side_effects
+
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        # (バンドの番号, バンドのハッシュ値) -> そのバンドを持つ質問のキー（namespace と正規化した質問）
+        self._buckets: dict[tuple[int, tuple[int, ...]], set[str]] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "exact_hits": 0,
+            "near_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "stores": 0,
+            "expired": 0,
+            "evictions": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "AnswerCache":
+        return cls(
+            ttl=float(os.getenv("ANSWER_CACHE_TTL", DEFAULT_TTL)),
+            threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", DEFAULT_THRESHOLD)),
+            allow_side_effects=os.getenv("ANSWER_CACHE_SIDE_EFFECTS") == "1",
+        )
+
+    def _remove_locked(self, key: str):
+        entry = self._entries.pop(key)
+        for band in enumerate(entry.bands):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+
+    def _live_locked(self, key: str, now: float) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= now:
+            self._remove_locked(key)
+            self.stats["expired"] += 1
+            return None
+        return entry
+
+    def get(self, question: str, namespace: str = "") -> tuple[str, Any] | None:
+        """("exact" | "near", 出力のコピー) を返す（見つからなければ None）"""
+        normalized = normalize_question(question)
+        key = _key(namespace, normalized)
+        now = time.time()
+        with self._lock:
+            entry = self._live_locked(key, now)
+            kind = "exact"
+            if entry is None and self.threshold < 1.0:
+                kind = "near"
+                grams = shingles(normalized)
+                tokens = key_tokens(normalized)
+                bands = self._bands(grams)
+                candidates = set().union(
+                    *(self._buckets.get(band, ()) for band in enumerate(bands))
+                )
+                best = 0.0
+                for candidate in candidates:
+                    found = self._live_locked(candidate, now)
+                    if found is None or found.namespace != namespace or found.tokens != tokens:
+                        continue
+                    similarity = jaccard(grams, found.grams)
+                    if similarity >= self.threshold and similarity > best:
+                        best, entry, key = similarity, found, candidate
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats[f"{kind}_hits"] += 1
+            output = entry.output
+        return kind, copy.deepcopy(output)
+
+    def put(self, question: str, output: Any, namespace: str = ""):
+        normalized = normalize_question(question)
+        key = _key(namespace, normalized)
+        grams = shingles(normalized)
+        entry = _Entry(
+            namespace=namespace,
+            question=question,
+            grams=grams,
+            tokens=key_tokens(normalized),
+            bands=self._bands(grams),
+            expires_at=time.time() + self.ttl,
+            output=copy.deepcopy(output),
+        )
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = entry
+            for band in enumerate(entry.bands):
+                self._buckets.setdefault(band, set()).add(key)
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove_locked(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    @staticmethod
+    def _bands(grams: frozenset[str]) -> list[tuple[int, ...]]:
+        signature = minhash(grams)
+        return [tuple(signature[i * ROWS : (i + 1) * ROWS]) for i in range(BANDS)]
+
+    def record_bypass(self):
+        with self._lock:
+            self.stats["bypassed"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def summary(self) -> str:
+        hits = self.stats["exact_hits"] + self.stats["near_hits"]
+        lookups = hits + self.stats["misses"]
+        rate = hits / lookups if lookups else 0.0
+        return (
+            f"answer cache: exact_hits={self.stats['exact_hits']} near_hits={self.stats['near_hits']} "
+            f"misses={self.stats['misses']} hit_rate={rate:.0%} bypassed={self.stats['bypassed']} "
+            f"expired={self.stats['expired']} evictions={self.stats['evictions']} "
+            f"entries={len(self._entries)}"
+        )
+
+
+def question_of(input: Any) -> str | None:
+    """新しい質問だけの入力なら、その質問（最後の HumanMessage）を返す
+
+    履歴（AIMessage / ToolMessage）を含む入力や、interrupt からの再開（Command）は None。
+    """
+    messages = input.get("messages") if isinstance(input, dict) else input
+    if not isinstance(messages, (list, tuple)) or not messages:
+        return None
+    if not all(isinstance(m, (HumanMessage, SystemMessage)) for m in messages):
+        return None
+    question = messages[-1]
+    if not isinstance(question, HumanMessage) or not isinstance(question.content, str):
+        return None
+    return question.content
+
+
+def _thread_id(config: dict | None) -> str | None:
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+class CachedGraph:
+    """グラフの ainvoke / invoke / astream の前に AnswerCache を置く
+
+    キャッシュから返す場合、astream は最終的な出力を1つの更新（entrypoint は {関数名: 出力}、
+    StateGraph は {グラフの名前: 出力}）として返す（stream_mode="messages" のトークンは流れない）。
+    StateGraph の astream は最終的な出力を1つの更新として流さないため、保存は ainvoke / invoke のときだけ。
+
+    Args:
+        side_effects: グラフが SNS への送信やファイルの書き込みをするか
+        resume_cacheable: interrupt から再開する値（Command.resume）を受け取り、その実行の出力を
+            保存してよいかを返す（ツールの利用を拒否した場合の回答を保存しないため）
+        namespace: キャッシュを分ける名前（省略時はグラフの名前。同じ AnswerCache を使う
+            エージェントごとに別の名前にする）
+    """
+
+    def __init__(
+        self,
+        graph,
+        cache: AnswerCache,
+        side_effects: bool = False,
+        resume_cacheable: Callable[[Any], bool] | None = None,
+        namespace: str | None = None,
+    ):
+        if side_effects and not cache.allow_side_effects:
+            raise ValueError(
+                "副作用のあるエージェントの回答をキャッシュすると、送信や書き込みが行われなくなります。"
+                "使う場合は AnswerCache(allow_side_effects=True) を指定してください。"
+            )
+        self.graph = graph
+        self.cache = cache
+        self.resume_cacheable = resume_cacheable
+        # 最終的な出力の更新のキー（entrypoint は関数名のノードが1つだけ）
+        self.name = next(iter(graph.nodes)) if len(graph.nodes) == 1 else graph.name
+        self.namespace = namespace or self.name
+        # interrupt で止まった実行の質問（thread_id -> 質問）。再開して終わったら保存する
+        self._pending: OrderedDict[str, str] = OrderedDict()
+        self._pending_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.graph, name)
+
+    def _lookup(self, input, config) -> tuple[str | None, Any]:
+        """(保存に使う質問, キャッシュの出力) を返す（保存しない場合の質問は None）"""
+        question = question_of(input)
+        thread_id = _thread_id(config)
+        if question is None:
+            with self._pending_lock:
+                question = self._pending.pop(thread_id, None)
+            resume = getattr(input, "resume", None)
+            if self.resume_cacheable is not None and not self.resume_cacheable(resume):
+                question = None
+            return question, None
+        if ((config or {}).get("configurable") or {}).get("bypass_answer_cache"):
+            self.cache.record_bypass()
+            return question, None
+        hit = self.cache.get(question, self.namespace)
+        return question, (hit[1] if hit else None)
+
+    def _remember(self, question: str | None, output, config, interrupted: bool):
+        if question is None:
+            return
+        if interrupted:
+            thread_id = _thread_id(config)
+            if thread_id is not None:
+                with self._pending_lock:
+                    self._pending[thread_id] = question
+                    while len(self._pending) > self.cache.max_entries:
+                        self._pending.popitem(last=False)
+            return
+        self.cache.put(question, output, self.namespace)
+
+    async def _interrupted(self, config) -> bool:
+        if self.graph.checkpointer is None or _thread_id(config) is None:
+            return False
+        state = await self.graph.aget_state(config)
+        return bool(state.interrupts)
+
+    def _interrupted_sync(self, config) -> bool:
+        if self.graph.checkpointer is None or _thread_id(config) is None:
+            return False
+        return bool(self.graph.get_state(config).interrupts)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        question, cached = self._lookup(input, config)
+        if cached is not None:
+            return cached
+        output = await self.graph.ainvoke(input, config=config, **kwargs)
+        self._remember(question, output, config, await self._interrupted(config))
+        return output
+
+    def invoke(self, input, config=None, **kwargs):
+        question, cached = self._lookup(input, config)
+        if cached is not None:
+            return cached
+        output = self.graph.invoke(input, config=config, **kwargs)
+        self._remember(question, output, config, self._interrupted_sync(config))
+        return output
+
+    def _cached_chunk(self, output, stream_mode, subgraphs: bool):
+        update = {self.name: output}
+        if isinstance(stream_mode, (list, tuple)):
+            if "updates" not in stream_mode:
+                return None
+            return ((), "updates", update) if subgraphs else ("updates", update)
+        if stream_mode != "updates":
+            return output if stream_mode == "values" else None
+        return ((), update) if subgraphs else update
+
+    def _final_output(self, chunk, stream_mode, subgraphs: bool):
+        """ストリームの要素がグラフの最終的な出力の更新（{self.name: 出力}）なら (True, 出力)"""
+        if isinstance(stream_mode, (list, tuple)):
+            if subgraphs:
+                namespace, mode, data = chunk
+            else:
+                (mode, data), namespace = chunk, ()
+        else:
+            mode = stream_mode
+            namespace, data = chunk if subgraphs else ((), chunk)
+        if namespace or mode != "updates" or not isinstance(data, dict) or self.name not in data:
+            return False, None
+        return True, data[self.name]
+
+    async def astream(self, input, config=None, stream_mode="updates", subgraphs=False, **kwargs):
+        question, cached = self._lookup(input, config)
+        if cached is not None:
+            if (chunk := self._cached_chunk(cached, stream_mode, subgraphs)) is not None:
+                yield chunk
+            return
+
+        final, output = False, None
+        async for chunk in self.graph.astream(
+            input, config=config, stream_mode=stream_mode, subgraphs=subgraphs, **kwargs
+        ):
+            found, value = self._final_output(chunk, stream_mode, subgraphs)
+            if found:
+                final, output = True, value
+            yield chunk
+        if final:
+            self._remember(question, output, config, await self._interrupted(config))
+        elif question is not None and await self._interrupted(config):
+            self._remember(question, None, config, interrupted=True)
+
+
+# プロセス全体で共有するキャッシュ（ANSWER_CACHE=1 のとき、終了時に命中率を表示する）
+_shared: AnswerCache | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> AnswerCache:
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = AnswerCache.from_env()
+            atexit.register(
+                lambda: _shared.stats["stores"] + _shared.stats["bypassed"]
+                and print(f"[answer_cache] {_shared.summary()}")
+            )
+        return _shared
+
+
+def answer_cache_enabled() -> bool:
+    return os.getenv("ANSWER_CACHE") == "1"
+
+
+def with_answer_cache(graph, namespace: str, side_effects: bool = False, resume_cacheable=None):
+    """ANSWER_CACHE=1 ならグラフを CachedGraph で包む
+
+    プロセス全体で1つのキャッシュを共有するため、エージェントごとに別の namespace を指定する。
+    副作用のあるエージェントは ANSWER_CACHE_SIDE_EFFECTS=1 の場合だけ包む（そうでなければそのまま返す）。
+    """
+    if not answer_cache_enabled():
+        return graph
+    cache = shared_cache()
+    if side_effects and not cache.allow_side_effects:
+        return graph
+    return CachedGraph(
+        graph,
+        cache,
+        side_effects=side_effects,
+        resume_cacheable=resume_cacheable,
+        namespace=namespace,
+    )
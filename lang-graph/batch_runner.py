@@ -0,0 +1,152 @@
+"""調査エージェント（create_agent.py のグラフ）に質問をまとめて流すバッチ実行
+
+入力はJSONL（1行1件、{"id": ..., "question": ...}。id は省略時に行番号）。
+結果は完了した順に出力JSONLへ追記するため、途中で落ちても
+同じコマンドを再実行すれば成功済みの質問を飛ばして再開できる。
+
+実行例:
+  python lang-graph/batch_runner.py questions.jsonl results.jsonl \\
+      --concurrency 8 --bedrock-rps 2 --tavily-rps 1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from langchain_core.messages import HumanMessage
+
+from message_text import content_to_text
+from rate_limit import configure_limiter
+from trace_callbacks import traced_config
+
+
+def load_questions(path: str) -> list[dict]:
+    """質問のJSONLを読み込む（question のない行があれば、実行を始める前に行番号つきで ValueError）"""
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_no}: JSONとして読み込めません: {e}") from e
+            if isinstance(record, str):
+                record = {"question": record}
+            if not isinstance(record, dict) or not isinstance(record.get("question"), str):
+                raise ValueError(f"{path}:{line_no}: question（文字列）がありません: {line}")
+            record.setdefault("id", str(line_no))
+            record["id"] = str(record["id"])
+            questions.append(record)
+    return questions
+
+
+def load_completed_ids(path: str) -> set[str]:
+    """出力JSONLのうち、成功済みの質問IDを返す（再開用）"""
+    if not os.path.exists(path):
+        return set()
+    completed = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 書き込み途中で落ちた最終行は無視する
+                continue
+            if record.get("status") == "ok":
+                completed.add(str(record["id"]))
+    return completed
+
+
+async def run_question(graph, record: dict, semaphore: asyncio.Semaphore) -> dict:
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            response = await graph.ainvoke(
+                {"messages": [HumanMessage(content=record["question"])]},
+                config=traced_config(),
+            )
+            answer = content_to_text(response["messages"][-1].content)
+            result = {"status": "ok", "answer": answer}
+        except Exception as e:
+            result = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+        latency = time.perf_counter() - start
+
+    return {
+        "id": record["id"],
+        "question": record["question"],
+        **result,
+        "latency_sec": round(latency, 3),
+        "finished_at": time.time(),
+    }
+
+
+async def run_batch(
+    graph,
+    input_path: str,
+    output_path: str,
+    concurrency: int = 4,
+) -> dict:
+    """質問を並行に実行し、終わったものから順に出力JSONLへ書き出す"""
+    questions = load_questions(input_path)
+    completed = load_completed_ids(output_path)
+    pending = [q for q in questions if q["id"] not in completed]
+    print(
+        f"質問 {len(questions)} 件（完了済み {len(questions) - len(pending)} 件、"
+        f"実行 {len(pending)} 件、並列数 {concurrency}）"
+    )
+
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.create_task(run_question(graph, q, semaphore)) for q in pending]
+
+    counts = {"ok": 0, "error": 0}
+    start = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as out:
+        for finished in asyncio.as_completed(tasks):
+            record = await finished
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            # 1件ごとにディスクへ書き出し、クラッシュしても結果を失わないようにする
+            out.flush()
+            os.fsync(out.fileno())
+            counts[record["status"]] += 1
+            print(
+                f"[{record['status']}] id={record['id']} "
+                f"latency={record['latency_sec']:.2f}s"
+            )
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        **counts,
+        "elapsed_sec": round(elapsed, 3),
+        "throughput_per_min": round(len(pending) / elapsed * 60, 2) if elapsed else 0,
+    }
+    print(f"完了: {summary}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="質問のJSONL")
+    parser.add_argument("output", help="結果を追記するJSONL")
+    parser.add_argument("--concurrency", type=int, default=4, help="同時実行数")
+    parser.add_argument(
+        "--bedrock-rps", type=float, default=0, help="Bedrockへの毎秒リクエスト数（0は無制限）"
+    )
+    parser.add_argument(
+        "--tavily-rps", type=float, default=0, help="Tavilyへの毎秒リクエスト数（0は無制限）"
+    )
+    args = parser.parse_args()
+
+    configure_limiter("bedrock", args.bedrock_rps)
+    configure_limiter("tavily", args.tavily_rps)
+
+    from create_agent import get_graph
+
+    asyncio.run(run_batch(get_graph(), args.input, args.output, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
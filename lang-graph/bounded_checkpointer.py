@@ -0,0 +1,239 @@
+"""使われなくなったスレッドを削除する MemorySaver
+
+Streamlit の画面は会話ごとに uuid4 のスレッドIDを作るが、MemorySaver はそのチェックポイントを
+削除しないため、サーバーを動かし続けるとメモリの使用量が増え続ける。
+BoundedMemorySaver はスレッドごとの最終アクセス時刻とサイズ（シリアライズ後のバイト数）を記録し、
+次のスレッドを丸ごと削除する。
+ - 最後に読み書きしてから max_idle 秒たったスレッド（sweep_interval 秒ごとに確認する）
+ - 合計サイズが max_bytes を超えた場合、最後に使われたのが古いスレッドから順に
+   （書き込み中のスレッドと、実行中・承認待ち（interrupt）で max_idle 秒以内に使われたスレッドは削除しない）
+
+削除したスレッドを再開しようとすると、チェックポイントがない状態（新しい会話）として扱われる。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from langgraph.checkpoint.base import WRITES_IDX_MAP
+from langgraph.constants import START
+from langgraph.checkpoint.memory import MemorySaver
+
+DEFAULT_MAX_IDLE = 60 * 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_SWEEP_INTERVAL = 60
+
+
+@dataclass
+class _ThreadUsage:
+    last_access: float
+    bytes: int = 0
+    # delete_thread はすべてのキーを走査するため、スレッドごとにキーを覚えておく
+    blob_keys: set = field(default_factory=set)
+    write_keys: set = field(default_factory=set)
+    # 実行中または承認待ち（interrupt）で、まだ最後まで進んでいない
+    running: bool = False
+
+
+def _has_next_tasks(checkpoint) -> bool:
+    """次に実行するタスクが残っているチェックポイントか（入力の直後・ノードの途中）"""
+    return any(
+        channel == START or channel.startswith("branch:to:")
+        for channel in checkpoint.get("updated_channels") or ()
+    )
+
+
+def _typed_size(value: tuple[str, bytes]) -> int:
+    return len(value[0]) + len(value[1])
+
+
+class BoundedMemorySaver(MemorySaver):
+    """アイドル時間と合計サイズの上限つきの MemorySaver
+
+    Args:
+        max_idle: この秒数だけ読み書きのないスレッドを削除する（None なら削除しない）
+        max_bytes: すべてのスレッドの合計サイズの上限（None なら上限なし）
+        sweep_interval: アイドルのスレッドを確認する間隔（秒）
+    """
+
+    def __init__(
+        self,
+        max_idle: float | None = DEFAULT_MAX_IDLE,
+        max_bytes: int | None = DEFAULT_MAX_BYTES,
+        sweep_interval: float = DEFAULT_SWEEP_INTERVAL,
+        *,
+        serde=None,
+        clock=time.monotonic,
+    ):
+        super().__init__(serde=serde)
+        self.max_idle = max_idle
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+
+        # 最後に使われたのが古い順
+        self._threads: OrderedDict[str, _ThreadUsage] = OrderedDict()
+        self._bytes = 0
+        self._last_sweep = clock()
+        self._lock = threading.RLock()
+        self.stats = {"evicted_idle": 0, "evicted_bytes": 0, "evicted_total_bytes": 0}
+
+    # ---
+    # 読み書き（非同期版の aget_tuple / aput / aput_writes もここを通る）
+    # ---
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            self._sweep_locked()
+            if thread_id in self._threads:
+                self._touch_locked(thread_id)
+            result = super().get_tuple(config)
+            if thread_id not in self._threads and not self.storage.get(thread_id):
+                # storage は defaultdict なので、まだ書き込みのないスレッドの空の dict を残さない
+                self.storage.pop(thread_id, None)
+            return result
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            usage = self._touch_locked(thread_id)
+            blob_keys = [(thread_id, checkpoint_ns, k, v) for k, v in new_versions.items()]
+            ns_storage = self.storage[thread_id][checkpoint_ns]
+            before = sum(_typed_size(self.blobs[key]) for key in blob_keys if key in self.blobs)
+            if (saved := ns_storage.get(checkpoint["id"])) is not None:
+                before += _typed_size(saved[0]) + _typed_size(saved[1])
+
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+
+            saved = ns_storage[checkpoint["id"]]
+            after = _typed_size(saved[0]) + _typed_size(saved[1])
+            after += sum(_typed_size(self.blobs[key]) for key in blob_keys)
+            usage.blob_keys.update(blob_keys)
+            usage.running = _has_next_tasks(checkpoint)
+            self._add_bytes_locked(usage, after - before)
+            self._enforce_locked(thread_id)
+            return next_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        outer_key = (
+            thread_id,
+            config["configurable"].get("checkpoint_ns", ""),
+            config["configurable"]["checkpoint_id"],
+        )
+        inner_keys = [
+            (task_id, WRITES_IDX_MAP.get(channel, idx)) for idx, (channel, _) in enumerate(writes)
+        ]
+        with self._lock:
+            usage = self._touch_locked(thread_id)
+            stored = self.writes.get(outer_key, {})
+            before = sum(_typed_size(stored[key][2]) for key in inner_keys if key in stored)
+
+            super().put_writes(config, writes, task_id, task_path)
+
+            stored = self.writes.get(outer_key, {})
+            after = sum(_typed_size(stored[key][2]) for key in inner_keys if key in stored)
+            usage.write_keys.add(outer_key)
+            # 書き込みの後には次のチェックポイントが続く（interrupt の場合は再開まで止まる）
+            usage.running = True
+            self._add_bytes_locked(usage, after - before)
+            self._enforce_locked(thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            usage = self._threads.pop(thread_id, None)
+            if usage is None:
+                super().delete_thread(thread_id)
+                return
+            self._bytes -= usage.bytes
+            self.storage.pop(thread_id, None)
+            for key in usage.write_keys:
+                self.writes.pop(key, None)
+            for key in usage.blob_keys:
+                self.blobs.pop(key, None)
+
+    # ---
+    # 削除
+    # ---
+    def _touch_locked(self, thread_id: str) -> _ThreadUsage:
+        usage = self._threads.get(thread_id)
+        if usage is None:
+            usage = self._threads[thread_id] = _ThreadUsage(last_access=self.clock())
+        else:
+            usage.last_access = self.clock()
+            self._threads.move_to_end(thread_id)
+        return usage
+
+    def _add_bytes_locked(self, usage: _ThreadUsage, size: int):
+        usage.bytes += size
+        self._bytes += size
+
+    def _evict_locked(self, thread_id: str, reason: str):
+        size = self._threads[thread_id].bytes
+        self.delete_thread(thread_id)
+        self.stats[f"evicted_{reason}"] += 1
+        self.stats["evicted_total_bytes"] += size
+
+    def _sweep_locked(self):
+        now = self.clock()
+        if self.max_idle is None or now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        # 古い順に並んでいるので、アイドル時間が max_idle 未満のスレッドが出てきたら終わり
+        while self._threads:
+            thread_id, usage = next(iter(self._threads.items()))
+            if now - usage.last_access < self.max_idle:
+                break
+            self._evict_locked(thread_id, "idle")
+
+    def _protected_locked(self, usage: _ThreadUsage, now: float) -> bool:
+        """実行中・承認待ちのスレッドは、max_idle 秒以内に使われていればサイズの上限で削除しない"""
+        return usage.running and (self.max_idle is None or now - usage.last_access < self.max_idle)
+
+    def _enforce_locked(self, current_thread_id: str):
+        self._sweep_locked()
+        if self.max_bytes is None or self._bytes <= self.max_bytes:
+            return
+        now = self.clock()
+        candidates = [
+            thread_id
+            for thread_id, usage in self._threads.items()
+            if thread_id != current_thread_id and not self._protected_locked(usage, now)
+        ]
+        for thread_id in candidates:
+            if self._bytes <= self.max_bytes:
+                break
+            self._evict_locked(thread_id, "bytes")
+
+    def evict_idle(self) -> int:
+        """アイドルのスレッドを今すぐ削除し、削除した数を返す"""
+        with self._lock:
+            before = self.stats["evicted_idle"]
+            self._last_sweep = float("-inf")
+            self._sweep_locked()
+            return self.stats["evicted_idle"] - before
+
+    # ---
+    # メトリクス
+    # ---
+    def metrics(self) -> dict:
+        with self._lock:
+            now = self.clock()
+            oldest = next(iter(self._threads.values()), None)
+            return {
+                "live_threads": len(self._threads),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "oldest_idle_seconds": now - oldest.last_access if oldest else 0.0,
+                **self.stats,
+            }
+
+    def summary(self) -> str:
+        m = self.metrics()
+        return (
+            f"checkpointer: live_threads={m['live_threads']} bytes={m['bytes']:,} "
+            f"oldest_idle={m['oldest_idle_seconds']:.0f}s evicted_idle={m['evicted_idle']} "
+            f"evicted_bytes={m['evicted_bytes']} freed={m['evicted_total_bytes']:,}"
+        )
@@ -1,13 +1,11 @@
 import asyncio
-import boto3
-import operator
 import os
 import re
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
-from langchain_core.messages import AnyMessage, AIMessage, HumanMessage, SystemMessage
-from langchain.tools import tool
-from langchain_tavily import TavilySearch
-from langchain.chat_models import init_chat_model
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
 from pydantic import BaseModel
@@ -15,17 +13,37 @@ from typing import Annotated, Dict, List, Union
 
 from dotenv import load_dotenv
 
+import repo_root  # noqa: F401
+
+from answer_cache import with_answer_cache
+from message_log import MessageLog, MessageLogChannel
+from model_router import init_routed_chat_model
+from prompt_cache import (
+    cached_tools,
+    prompt_cache_enabled,
+    report_cache_usage,
+    with_system_prompt,
+)
+
+from rate_limit import limiter
+from tool_compaction import tool_output_compactor
+from sns_publisher import PublishError, get_publisher
+from tool_cache import ToolResultCache, read_only
+from trace_callbacks import traced_config
+
 load_dotenv()
 
 
 class AgentState(BaseModel):
-    messages: Annotated[list[AnyMessage], operator.add]
+    # operator.add だと更新のたびにリスト全体をコピーするため、追記専用のログを使う
+    messages: Annotated[MessageLog, MessageLogChannel]
 
 
-builder = StateGraph(AgentState)
+# TavilySearch の name（ツール自体は get_tools() で作る）
+web_search_tool_name = "tavily_search"
 
-
-web_search_tool = TavilySearch(max_results=3)
+# PublishBatch の結果（エントリごとの成功・失敗）を待つ時間（秒）
+SNS_PUBLISH_TIMEOUT = 30
 
 
 @tool
@@ -38,18 +56,56 @@ def send_aws_sns(text: str):
             "を設定してください。"
         )
 
-    sns = boto3.client("sns")
-    sns.publish(TopicArn=topic_arn, Message=text)
-    return "Message sent to AWS SNS topic"
+    # クライアントを使い回し、他の送信とまとめて PublishBatch で送る
+    future = get_publisher(topic_arn).publish(text)
+    try:
+        message_id = future.result(timeout=SNS_PUBLISH_TIMEOUT)
+    except PublishError as e:
+        return f"AWS SNS への送信に失敗しました: {e}"
+    except FutureTimeoutError:
+        return (
+            f"AWS SNS への送信に失敗しました: {SNS_PUBLISH_TIMEOUT}秒以内に結果が返りませんでした"
+        )
+    return f"Message sent to AWS SNS topic (MessageId: {message_id})"
 
 
-tools = [web_search_tool, send_aws_sns]
 modelId = "global.anthropic.claude-opus-4-5-20251101-v1:0"
 
-llm_with_tools = init_chat_model(
-    model=modelId,
-    model_provider="bedrock_converse",
-).bind_tools(tools)
+# BEDROCK_PROMPT_CACHE=1 の場合、システムプロンプト・ツール定義・履歴をキャッシュさせる
+use_prompt_cache = prompt_cache_enabled()
+
+# ツール・LLM のクライアント・グラフは import 時には作らず、最初に使うときに作る
+# （Tavily のキーや AWS の認証情報がなくても import でき、起動も速くなる）。
+# 差し替える場合は、使う前にこれらの変数に代入しておく。
+tools: list | None = None
+llm_with_tools = None
+graph = None
+_init_lock = threading.RLock()
+
+
+def get_tools() -> list:
+    global tools
+    with _init_lock:
+        if tools is None:
+            from langchain_tavily import TavilySearch
+
+            # 同じ質問を繰り返し調査しても検索し直さないよう、結果を1時間キャッシュする
+            web_search_tool = read_only(TavilySearch(max_results=3), ttl=60 * 60)
+            tools = [web_search_tool, send_aws_sns]
+        return tools
+
+
+def get_llm_with_tools():
+    global llm_with_tools
+    with _init_lock:
+        if llm_with_tools is None:
+            # MODEL_ROUTING=1 の場合、簡単なステップは速いモデルに送る（model_router.py）
+            llm_tools = get_tools()
+            llm_with_tools = init_routed_chat_model(
+                modelId,
+                model_provider="bedrock_converse",
+            ).bind_tools(cached_tools(llm_tools) if use_prompt_cache else llm_tools)
+        return llm_with_tools
 
 
 system_prompt = """
@@ -59,15 +115,36 @@ system_prompt = """
 
 
 async def agent(state: AgentState) -> Dict[str, List[AIMessage]]:
-    response = await llm_with_tools.ainvoke(
-        [SystemMessage(content=system_prompt)] + state.messages
+    # バッチ実行時は Bedrock への毎秒リクエスト数を制限する（既定は無制限）
+    await limiter("bedrock").acquire()
+    response = await get_llm_with_tools().ainvoke(
+        with_system_prompt(system_prompt, state.messages, cache=use_prompt_cache)
     )
+    if use_prompt_cache:
+        report_cache_usage(response)
 
     return {"messages": [response]}
 
 
-builder.add_node("agent", agent)
-builder.add_node("tools", ToolNode(tools))
+# read_only のツール（Web検索）の結果だけをキャッシュする（SNS への送信は毎回実行する）
+tool_cache = ToolResultCache(path=os.getenv("TOOL_CACHE_PATH"))
+
+# TOOL_OUTPUT_COMPACTION=1 の場合、ツールの結果を小さくしてから履歴に戻す（キャッシュには元の結果を保存する）
+compactor = tool_output_compactor()
+
+
+async def run_tool_call(request, execute):
+    async def limited_execute(request):
+        # キャッシュになかった Web 検索だけ Tavily のリミッターを通してから実行する
+        if request.tool_call["name"] == web_search_tool_name:
+            await limiter("tavily").acquire()
+        return await execute(request)
+
+    if compactor is None:
+        return await tool_cache.awrap_tool_call(request, limited_execute)
+    return await compactor.awrap_tool_call(
+        request, lambda request: tool_cache.awrap_tool_call(request, limited_execute)
+    )
 
 
 ## ツールNodeがEnd Nodeに遷移する関数
@@ -78,17 +155,36 @@ def route_node(state: AgentState) -> Union[str]:
     return "tools"
 
 
-builder.add_edge(START, "agent")
-builder.add_conditional_edges("agent", route_node)
-builder.add_edge("tools", "agent")
+def build_graph(checkpointer=None):
+    builder = StateGraph(AgentState)
+    builder.add_node("agent", agent)
+    builder.add_node("tools", ToolNode(get_tools(), awrap_tool_call=run_tool_call))
+    builder.add_edge(START, "agent")
+    builder.add_conditional_edges("agent", route_node)
+    builder.add_edge("tools", "agent")
+    return builder.compile(checkpointer=checkpointer)
+
 
-graph = builder.compile()
+def get_graph():
+    """プロセス内で共有するグラフ（最初の呼び出し時に作る）
+
+    ANSWER_CACHE=1 と ANSWER_CACHE_SIDE_EFFECTS=1 の場合、同じ・ほぼ同じ質問には前回の回答を返す
+    （SNS への送信も行わないため、明示的に有効にした場合だけ）。
+    """
+    global graph
+    with _init_lock:
+        if graph is None:
+            graph = with_answer_cache(build_graph(), "create_agent", side_effects=True)
+        return graph
 
 
 # AIエージェントの呼び出しと同時に、ユーザーの質問を初期メッセージとしてグラフを起動する
 async def main():
     question = "LangGraphの基本を優しく解説して"
-    response = await graph.ainvoke({"messages": [HumanMessage(content=question)]})
+    # TRACE_PATH / TRACE_SUMMARY を指定すると、ノード・LLM・ツールごとの span を記録する
+    response = await get_graph().ainvoke(
+        {"messages": [HumanMessage(content=question)]}, config=traced_config()
+    )
 
     return response
 
@@ -1,50 +1,123 @@
-from botocore.config import Config
-from langchain.chat_models import init_chat_model
-from langchain_community.agent_toolkits import FileManagementToolkit
-from langchain_tavily import TavilySearch
+import asyncio
+import functools
+import os
+import sys
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
 from langchain_core.messages import (
     AIMessage,
-    SystemMessage,
     BaseMessage,
     ToolMessage,
     ToolCall,
 )
+from langgraph.config import get_config
 from langgraph.types import interrupt
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.func import entrypoint, task
 from langgraph.graph import add_messages
 
 from dotenv import load_dotenv
 
+# lang-graph 直下のモジュール（sqlite_checkpointer など）を読み込めるようにする
+# （リポジトリ直下の共通モジュールは repo_root が追加する）
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import repo_root  # noqa: E402,F401
+
+from answer_cache import with_answer_cache  # noqa: E402
+from bounded_checkpointer import (  # noqa: E402
+    DEFAULT_MAX_BYTES,
+    DEFAULT_MAX_IDLE,
+    BoundedMemorySaver,
+)
+from model_router import init_routed_chat_model  # noqa: E402
+from prompt_cache import (  # noqa: E402
+    cached_tools,
+    prompt_cache_enabled,
+    report_cache_usage,
+    with_system_prompt,
+)
+from speculative_tools import speculative_executor  # noqa: E402
+from sqlite_checkpointer import SqliteDeltaSaver  # noqa: E402
+from tool_cache import ToolResultCache, read_only  # noqa: E402
+from tool_compaction import tool_output_compactor  # noqa: E402
+from trace_callbacks import traced_config  # noqa: E402
+
 load_dotenv()
 
 model_id = "global.anthropic.claude-opus-4-5-20251101-v1:0"
 model_provider = "bedrock_converse"
 
-# ツールの定義
-web_search = TavilySearch(max_results=2, topic="general")
+# ツール名（ツール自体は最初の実行時に作る）
+web_search_name = "tavily_search"  # TavilySearch の name
+write_file_name = "write_file"
 
 working_directory = "report"
-# ローカルファイルウィ扱うツールキット
-file_toolkit = FileManagementToolkit(
-    root_dir=str(working_directory),
-    selected_tools=["write_file"],  # ファイルへの書き込みツールを指定
-)
-write_file = file_toolkit.get_tools()[0]
-
-# 使用するツールキットのリスト
-tools = [web_search, write_file]
-tools_by_name = {tool.name: tool for tool in tools}
 
-config = Config(
-    read_timeout=300,
-)
+# ツールと LLM のクライアントは作成に時間がかかり、Tavily のキーや AWS の認証情報も必要なため、
+# import 時には作らず、最初に使うときに作る（get_tools_by_name / get_llm_with_tools）。
+# 差し替える場合は、使う前にこれらの変数に代入しておく。
+tools: list | None = None
+tools_by_name: dict | None = None
+llm_with_tools = None
+_init_lock = threading.RLock()
+
+# read_only のツール（web_search）の結果だけをキャッシュする（write_file は毎回実行する）
+# TOOL_CACHE_PATH を指定すると、再起動後もキャッシュを使う
+tool_cache = ToolResultCache(path=os.getenv("TOOL_CACHE_PATH"))
+
+# SPECULATIVE_TOOLS=1 の場合、承認を待つ間に read_only のツール（web_search）を先に実行しておく
+# （承認されたらその結果を使い、拒否されたら捨てる / write_file は承認されるまで実行しない）
+speculation = speculative_executor()
+
+# TOOL_OUTPUT_COMPACTION=1 の場合、Web検索の結果を小さくしてから履歴に戻す（キャッシュには元の結果を保存する）
+compactor = tool_output_compactor()
+
+# BEDROCK_PROMPT_CACHE=1 の場合、システムプロンプト・ツール定義・履歴をキャッシュさせる
+use_prompt_cache = prompt_cache_enabled()
+
+
+def get_tools() -> list:
+    global tools
+    with _init_lock:
+        if tools is None:
+            from langchain_community.agent_toolkits import FileManagementToolkit
+            from langchain_tavily import TavilySearch
+
+            # Web検索は同じ調査で何度も同じ検索をするため、結果を1時間キャッシュする
+            web_search = read_only(TavilySearch(max_results=2, topic="general"), ttl=60 * 60)
+            # ローカルファイルウィ扱うツールキット
+            file_toolkit = FileManagementToolkit(
+                root_dir=str(working_directory),
+                selected_tools=["write_file"],  # ファイルへの書き込みツールを指定
+            )
+            write_file = file_toolkit.get_tools()[0]
+            tools = [web_search, write_file]
+        return tools
+
+
+def get_tools_by_name() -> dict:
+    global tools_by_name
+    with _init_lock:
+        if tools_by_name is None:
+            tools_by_name = {tool.name: tool for tool in get_tools()}
+        return tools_by_name
+
+
+def get_llm_with_tools():
+    global llm_with_tools
+    with _init_lock:
+        if llm_with_tools is None:
+            # MODEL_ROUTING=1 の場合、簡単なステップは速いモデルに送る（model_router.py）
+            # Bedrock のクライアントは共有のもの（bedrock_client.py / read_timeout は既定で300秒）を使う
+            llm_tools = get_tools()
+            llm_with_tools = init_routed_chat_model(
+                model_id,
+                model_provider=model_provider,
+            ).bind_tools(cached_tools(llm_tools) if use_prompt_cache else llm_tools)
+        return llm_with_tools
 
-llm_with_tools = init_chat_model(
-    model=model_id,
-    model_provider=model_provider,
-    config=config,
-).bind_tools(tools)
 
 system_prompt = """
 あなたの責務はユーザーからのリクエストを調査し、調査結果をファイルに出力することです。
@@ -57,33 +130,77 @@ system_prompt = """
 """
 
 
+# ツールごとの実行時間の上限（秒）。超えた場合はエラーの ToolMessage を返して処理を続ける
+tool_timeouts = {web_search_name: 30, write_file_name: 10}
+DEFAULT_TOOL_TIMEOUT = 60
+
+
 # LLMを呼び出すタスク
+# ainvoke を使うので、LLM の応答を待つ間もイベントループは他の処理を進められる
 @task
-def invoke_llm(messages: list[BaseMessage]) -> AIMessage:
-    response = llm_with_tools.invoke([SystemMessage(content=system_prompt)] + messages)
+async def invoke_llm(messages: list[BaseMessage]) -> AIMessage:
+    response = await get_llm_with_tools().ainvoke(
+        with_system_prompt(system_prompt, messages, cache=use_prompt_cache)
+    )
+    if use_prompt_cache:
+        report_cache_usage(response)
     return response
 
 
-# ツールを実行するタスク
+def speculation_key(tool_call: ToolCall) -> tuple:
+    # tool_call_id はスレッド（会話）をまたいで重なりうるため、thread_id と組にする
+    return get_config()["configurable"].get("thread_id"), tool_call["id"]
+
+
+# 承認を求める前に、read_only のツールだけ先に実行し始めるタスク
+# タスクの結果はチェックポイントに残るので、再開時（entrypoint の再実行）にはもう一度実行しない
 @task
-def use_tool(tool_call: ToolCall) -> ToolMessage:
-    tool = tools_by_name[tool_call["name"]]
-    observation = tool.invoke(tool_call["args"])
+async def speculate(tool_calls: list[ToolCall]) -> list[str]:
+    started: list[str] = []
+    for tool_call in tool_calls:
+        tool = get_tools_by_name().get(tool_call["name"])
+        run = functools.partial(tool_cache.invoke, tool, tool_call["args"])
+        if tool is not None and speculation.start(speculation_key(tool_call), tool, run):
+            started.append(tool_call["id"])
+    return started
 
+
+# ツールを実行するタスク
+# 承認を待つ間に先に実行していた場合は、その結果（実行中なら完了）を待つ
+@task
+async def use_tool(tool_call: ToolCall) -> ToolMessage:
+    tool = get_tools_by_name()[tool_call["name"]]
+    timeout = tool_timeouts.get(tool.name, DEFAULT_TOOL_TIMEOUT)
+    future = speculation.take(speculation_key(tool_call)) if speculation else None
+    try:
+        observation = await asyncio.wait_for(
+            asyncio.wrap_future(future)
+            if future is not None
+            else tool_cache.ainvoke(tool, tool_call["args"]),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError:
+        return ToolMessage(
+            content=f"ツールの実行が {timeout} 秒以内に終わらなかったため中断しました。",
+            name=tool.name,
+            tool_call_id=tool_call["id"],
+            status="error",
+        )
+
+    if compactor is not None:
+        observation = compactor.compact(tool.name, observation)
     return ToolMessage(content=observation, tool_call_id=tool_call["id"])
 
 
-# ask_humanタスク （関数）
-# Human-in-the-Loopのためのタスクの中心的な役割を担います。
-def ask_human(tool_call: ToolCall):
+# ツール呼び出しの内容を、承認画面に表示する文字列にする
+def describe_tool_call(tool_call: ToolCall) -> str:
     tool_name = tool_call["name"]
     tool_args = tool_call.get("args", {}) or {}
-    tool_data = {"name": tool_name}
 
     # NOTE: ここは tool_args(dict) ではなく tool_name(str) で分岐する
     lines: list[str] = [f"* ツール名", f"  - {tool_name}"]
 
-    if tool_name == web_search.name:
+    if tool_name == web_search_name:
         lines.append("* 引数")
         if isinstance(tool_args, dict):
             for key, value in tool_args.items():
@@ -91,7 +208,7 @@ def ask_human(tool_call: ToolCall):
         else:
             lines.append(f"  - {tool_args}")
 
-    elif tool_name == write_file.name:
+    elif tool_name == write_file_name:
         filename = tool_args.get("filename", "") if isinstance(tool_args, dict) else ""
         content = tool_args.get("content", "") if isinstance(tool_args, dict) else ""
         lines.append("* ファイル名")
@@ -104,19 +221,63 @@ def ask_human(tool_call: ToolCall):
         lines.append("* 引数")
         lines.append(f"  - {tool_args}")
 
-    tool_data["args"] = "\n".join(lines)
-    feedback = interrupt(tool_data)
+    return "\n".join(lines)
 
-    if feedback == "APPROVE":
-        return tool_call
 
+def deny_tool_call(tool_call: ToolCall) -> ToolMessage:
     return ToolMessage(
         content="ツールの利用が拒否されたため、処理を終了してください。",
-        name=tool_name,
+        name=tool_call["name"],
         tool_call_id=tool_call["id"],
     )
 
 
+# ask_humanタスク （関数）
+# Human-in-the-Loopのためのタスクの中心的な役割を担います。
+def ask_human(tool_call: ToolCall):
+    tool_data = {"name": tool_call["name"], "args": describe_tool_call(tool_call)}
+    feedback = interrupt(tool_data)
+
+    if feedback == "APPROVE":
+        return tool_call
+
+    return deny_tool_call(tool_call)
+
+
+# ask_human_batch（関数）
+# 1ターンのすべてのツール呼び出しを1回の interrupt でまとめて確認する。
+# ツール呼び出しごとに interrupt すると、その数だけ画面とのやり取りと再開
+# （entrypoint の先頭からの再実行）が必要になるため。
+# 再開時の値は {tool_call_id: "APPROVE" | "DENY"}（指定のないものは拒否）か、
+# すべてに同じ応答をする場合は "APPROVE" / "DENY" の文字列を受け付ける。
+def ask_human_batch(tool_calls: list[ToolCall]) -> list[ToolCall | ToolMessage]:
+    feedback = interrupt(
+        {
+            "tool_calls": [
+                {
+                    "id": tool_call["id"],
+                    "name": tool_call["name"],
+                    "args": describe_tool_call(tool_call),
+                }
+                for tool_call in tool_calls
+            ]
+        }
+    )
+
+    results: list[ToolCall | ToolMessage] = []
+    for tool_call in tool_calls:
+        if isinstance(feedback, dict):
+            decision = feedback.get(tool_call["id"])
+        else:
+            decision = feedback
+        results.append(tool_call if decision == "APPROVE" else deny_tool_call(tool_call))
+    return results
+
+
+# APPROVAL_MODE=per_call の場合は、従来どおりツール呼び出しごとに承認を求める
+batch_approval = os.getenv("APPROVAL_MODE", "batch") != "per_call"
+
+
 # ---
 # Human in the Loop のAI agentではagent関数内部ではwhileによる無限ループで
 # ツール実行とLLM推論を繰り返しています。
@@ -125,13 +286,23 @@ def ask_human(tool_call: ToolCall):
 
 # ツールのリストはadd_messagesで統合する
 # チェックポイインターの設定
-checkpointer = MemorySaver()
+# CHECKPOINT_DB を指定した場合は SQLite に保存し、再起動後も会話を再開できるようにする
+# メモリに保存する場合は、使われなくなった会話（スレッド）を削除してメモリの使用量を抑える
+#  - CHECKPOINT_MAX_IDLE 秒（既定は1時間）読み書きのないスレッド
+#  - 合計サイズが CHECKPOINT_MAX_BYTES（既定は256MB）を超えた場合は、古く使われたスレッドから
+if checkpoint_db := os.getenv("CHECKPOINT_DB"):
+    checkpointer = SqliteDeltaSaver(checkpoint_db)
+else:
+    checkpointer = BoundedMemorySaver(
+        max_idle=float(os.getenv("CHECKPOINT_MAX_IDLE", DEFAULT_MAX_IDLE)),
+        max_bytes=int(os.getenv("CHECKPOINT_MAX_BYTES", DEFAULT_MAX_BYTES)),
+    )
 
 
 @entrypoint(checkpointer)
-def agent(messages):
+async def async_agent(messages):
     # LLMの呼び出し
-    llm_response = invoke_llm(messages).result()
+    llm_response = await invoke_llm(messages)
 
     # ツールの呼び出しがある限り繰り返す
     while True:
@@ -144,30 +315,95 @@ def agent(messages):
         approved_tool_calls: list[ToolCall] = []
         tool_messages: list[ToolMessage] = []
 
+        # 承認を待つ間に、read_only のツールを先に実行し始める
+        if speculation is not None:
+            await speculate(llm_response.tool_calls)
+
         # 各ツール呼び出しに対してユーザーの承認を求める
         # - APPROVE: tool_call をそのまま実行
         # - DENY: toolUse に対応する toolResult(ToolMessage) を必ず履歴に残す
-        for tool_call in llm_response.tool_calls:
-            feedback = ask_human(tool_call)
+        if batch_approval:
+            feedbacks = ask_human_batch(llm_response.tool_calls)
+        else:
+            feedbacks = [ask_human(tool_call) for tool_call in llm_response.tool_calls]
+
+        for feedback in feedbacks:
             if isinstance(feedback, ToolMessage):
                 tool_messages.append(feedback)
+                # 拒否されたツールを先に実行していた場合は、その結果を捨てる
+                if speculation is not None:
+                    speculation.discard(
+                        speculation_key({"id": feedback.tool_call_id, "name": feedback.name})
+                    )
             else:
                 approved_tool_calls.append(feedback)
 
-        # 承認されたツールを実行
-        tool_futures = []
-        for tool_call in approved_tool_calls:
-            tool_futures.append(use_tool(tool_call))
-
-        # Future が完了するのを待って結果だけを集める
-        for future in tool_futures:
-            tool_messages.append(future.result())
+        # 承認されたツールを同時に実行し、すべて終わるのを待つ
+        tool_messages.extend(
+            await asyncio.gather(*(use_tool(tool_call) for tool_call in approved_tool_calls))
+        )
 
         # toolResult を履歴に追加（承認・拒否どちらも含む）
         if tool_messages:
             messages = add_messages(messages, tool_messages)
 
         # LLMの呼び出し
-        llm_response = invoke_llm(messages).result()
+        llm_response = await invoke_llm(messages)
 
     return llm_response
+
+
+class SyncAgent:
+    """async_agent を同期のコードから使うための薄いラッパー
+
+    専用のスレッドでイベントループを動かし続け、astream / ainvoke をそのループで実行する。
+    呼び出しのたびにループを作り直さないので、ループに紐づくクライアント（Bedrock の非同期
+    接続など）も使い回せる。
+    TRACE_PATH / TRACE_SUMMARY を指定した場合は、ノード・LLM・ツールの span を記録する。
+    """
+
+    def __init__(self, async_entrypoint):
+        self.async_entrypoint = async_entrypoint
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+
+    def _run(self, coroutine):
+        # ループのスレッドは最初の呼び出し時に起動する（import しただけではスレッドを作らない）
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def stream(self, input, config=None, **kwargs) -> Iterator:
+        stream = self.async_entrypoint.astream(input, config=traced_config(config), **kwargs)
+        try:
+            while True:
+                try:
+                    yield self._run(stream.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            # interrupt などで途中で読むのをやめた場合も、非同期のストリームを閉じる
+            self._run(stream.aclose())
+
+    def invoke(self, input, config=None, **kwargs):
+        return self._run(
+            self.async_entrypoint.ainvoke(input, config=traced_config(config), **kwargs)
+        )
+
+
+def all_approved(resume) -> bool:
+    """ツールの利用を1つでも拒否して再開した実行の回答は、回答キャッシュに保存しない"""
+    decisions = resume.values() if isinstance(resume, dict) else [resume]
+    return all(decision == "APPROVE" for decision in decisions)
+
+
+# 同期版の API（app.py などから agent.stream / agent.invoke で使う）
+# ANSWER_CACHE=1 と ANSWER_CACHE_SIDE_EFFECTS=1 の場合、同じ・ほぼ同じ依頼には前回の回答を返す
+# （レポートのファイルも書き込まないため、明示的に有効にした場合だけ）
+agent = SyncAgent(
+    with_answer_cache(
+        async_agent, "functional_api_agent", side_effects=True, resume_cacheable=all_approved
+    )
+)
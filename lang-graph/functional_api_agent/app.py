@@ -1,11 +1,19 @@
+import time
 import uuid
+
 import streamlit as st
 from langchain_core.messages import HumanMessage
 from langgraph.types import Command
 from langchain_core.messages import AIMessage
 
 # agent_coreからエージェントをインポートする
-from agent_core import agent
+import agent_core
+from message_text import content_to_text
+
+
+# Streamlit は操作のたびにこのファイルを再実行するが、agent_core は最初の import の一度だけ
+# 読み込まれるため、エージェントとチェックポインターはすべてのセッションで同じものを使う
+agent, checkpointer = agent_core.agent, agent_core.checkpointer
 
 
 def init_session_state():
@@ -30,6 +38,14 @@ def init_session_state():
     if "latest_user_input" not in st.session_state:
         st.session_state.latest_user_input = None
 
+    # LLM の出力をトークン単位で表示するか
+    if "stream_tokens" not in st.session_state:
+        st.session_state.stream_tokens = True
+
+    # 直近の実行で最初のトークンが表示されるまでの時間（秒）
+    if "ttft" not in st.session_state:
+        st.session_state.ttft = None
+
 
 def reset_session():
     """セッションの状態をリセットする"""
@@ -39,14 +55,69 @@ def reset_session():
     st.session_state.final_result = None
     st.session_state.thread_id = None
     st.session_state.latest_user_input = None
+    st.session_state.ttft = None
 
 
 # セッション状態の初期化を実行
 init_session_state()
 
 
+def handle_update(task_name: str, result) -> bool:
+    """updates の1件を処理する（interrupt で止まった場合は True を返す）"""
+    # updates では途中経過で result が None になることがあるため安全にスキップ
+    if result is None:
+        return False
+
+    # interruptの場合
+    if task_name == "__interrupt__":
+        st.session_state.tool_info = result[0].value
+        st.session_state.waiting_for_approval = True
+        return True
+
+    # 最終回答の場合（キーは entrypoint の関数名）
+    elif task_name == "async_agent":
+        # 返り値の形が環境/バージョンで揺れるので吸収する
+        if hasattr(result, "content"):
+            st.session_state.final_result = result.content
+        elif isinstance(result, dict) and "content" in result:
+            st.session_state.final_result = result["content"]
+        else:
+            st.session_state.final_result = str(result)
+        st.session_state.waiting_for_approval = False
+        st.session_state.tool_info = None
+
+    # LLM推論の場合
+    elif task_name == "invoke_llm":
+        # chunkキー名の誤り（involve_llm）を回避し、resultを参照する
+        if isinstance(result.content, list):
+            for content in result.content:
+                if content["type"] == "text":
+                    st.session_state.messages.append(
+                        {
+                            "role": "assistant",
+                            "content": content["text"],
+                        }
+                    )
+        else:
+            # テキストが1本の場合も表示できるようにする
+            if isinstance(result, AIMessage) and isinstance(result.content, str):
+                st.session_state.messages.append(
+                    {"role": "assistant", "content": result.content}
+                )
+
+    # ツール実行の場合
+    elif task_name == "use_tool":
+        st.session_state.messages.append(
+            {
+                "role": "assistant",
+                "content": "ツールを実行！",
+            }
+        )
+    return False
+
+
 # エージェントの実行関数
-def run_agent(resume: str | None = None):
+def run_agent(resume: str | dict | None = None):
     """エージェントを実行し、結果を処理する"""
     # AIエージェント呼び出しに使うconfigurationの作成
     config = {"configurable": {"thread_id": st.session_state.thread_id}}
@@ -55,67 +126,67 @@ def run_agent(resume: str | None = None):
     # NOTE: agent_core 側は LangChain BaseMessage を期待するため、
     # UI表示用の st.session_state.messages(dict) は入力に使わない
     if resume:
+        # 承認待ちのまま放置された会話は、チェックポインターから削除されていることがある
+        if checkpointer.get_tuple(config) is None:
+            st.session_state.messages.append(
+                {
+                    "role": "assistant",
+                    "content": "会話の有効期限が切れました。もう一度リクエストを入力してください。",
+                }
+            )
+            st.session_state.tool_info = None
+            return
         agent_input = Command(resume=resume)
     else:
         if not st.session_state.latest_user_input:
             raise RuntimeError("latest_user_input が未設定です。")
         agent_input = [HumanMessage(content=st.session_state.latest_user_input)]
 
-    # 結果を処理
+    if not st.session_state.stream_tokens:
+        # 結果を処理
+        with st.spinner("処理中...", show_time=True):
+            for chunk in agent.stream(agent_input, config=config, stream_mode="updates"):
+                for task_name, result in chunk.items():
+                    if handle_update(task_name, result):
+                        return
+        return
+
+    # トークン単位で表示する場合は messages も受け取る
+    # invoke_llm タスクの中の LLM 呼び出しは entrypoint の下の名前空間になるため subgraphs=True が必要
+    start = time.perf_counter()
+    st.session_state.ttft = None
+    placeholder = None
+    message_id = None
+    text = ""
     with st.spinner("処理中...", show_time=True):
-        for chunk in agent.stream(agent_input, config=config, mode="updates"):
-            for task_name, result in chunk.items():
-                # updates では途中経過で result が None になることがあるため安全にスキップ
-                if result is None:
-                    continue
-
-                # interruptの場合
-                if task_name == "__interrupt__":
-                    st.session_state.tool_info = result[0].value
-                    st.session_state.waiting_for_approval = True
-                    return
-
-                # 最終回答の場合
-                elif task_name == "agent":
-                    # 返り値の形が環境/バージョンで揺れるので吸収する
-                    if hasattr(result, "content"):
-                        st.session_state.final_result = result.content
-                    elif isinstance(result, dict) and "content" in result:
-                        st.session_state.final_result = result["content"]
-                    else:
-                        st.session_state.final_result = str(result)
-                    st.session_state.waiting_for_approval = False
-                    st.session_state.tool_info = None
-
-                # LLM推論の場合
-                elif task_name == "invoke_llm":
-                    # chunkキー名の誤り（involve_llm）を回避し、resultを参照する
-                    if isinstance(result.content, list):
-                        for content in result.content:
-                            if content["type"] == "text":
-                                st.session_state.messages.append(
-                                    {
-                                        "role": "assistant",
-                                        "content": content["text"],
-                                    }
-                                )
-                    else:
-                        # テキストが1本の場合も表示できるようにする
-                        if isinstance(result, AIMessage) and isinstance(
-                            result.content, str
-                        ):
-                            st.session_state.messages.append(
-                                {"role": "assistant", "content": result.content}
-                            )
-
-                # ツール実行の場合
-                elif task_name == "use_tool":
-                    st.session_state.messages.append(
-                        {
-                            "role": "assistant",
-                            "content": "ツールを実行！",
-                        }
-                    )
+        for _, mode, data in agent.stream(
+            agent_input,
+            config=config,
+            stream_mode=["updates", "messages"],
+            subgraphs=True,
+        ):
+            if mode == "updates":
+                for task_name, result in data.items():
+                    if handle_update(task_name, result):
+                        return
+                continue
+
+            message, metadata = data
+            if metadata.get("langgraph_node") != "invoke_llm":
+                continue
+            token = content_to_text(message.content)
+            if not token:
+                continue
+            if st.session_state.ttft is None:
+                st.session_state.ttft = time.perf_counter() - start
+                print(f"[stream] TTFT={st.session_state.ttft * 1000:.0f}ms")
+            # LLM の呼び出しごとに新しい吹き出しに書き込む
+            if message.id != message_id:
+                message_id = message.id
+                placeholder = st.chat_message("assistant").empty()
+                text = ""
+            text += token
+            placeholder.markdown(text)
 
 
 # ユーザーからのツール実行の承認・拒否を受け取る関数
@@ -137,9 +208,56 @@ def feedback():
     return feedback_result
 
 
+# 1ターンのすべてのツール呼び出しをまとめて承認・拒否する関数
+def batch_feedback(tool_calls: list[dict]):
+    """ツール呼び出しごとの承認・拒否を {tool_call_id: "APPROVE" | "DENY"} で返す"""
+    decisions = {}
+    for i, tool_call in enumerate(tool_calls, start=1):
+        st.info(f"ツール呼び出し {i}/{len(tool_calls)}\n\n{tool_call['args']}")
+        choice = st.radio(
+            "このツール呼び出しを",
+            ["承認", "拒否"],
+            key=f"decision_{tool_call['id']}",
+            horizontal=True,
+        )
+        decisions[tool_call["id"]] = "APPROVE" if choice == "承認" else "DENY"
+
+    submit_column, approve_all_column, deny_all_column = st.columns(3)
+    feedback_result = None
+
+    with submit_column:
+        if st.button("送信"):
+            feedback_result = decisions
+
+    with approve_all_column:
+        if st.button("すべて承認"):
+            feedback_result = {tool_call["id"]: "APPROVE" for tool_call in tool_calls}
+
+    with deny_all_column:
+        if st.button("すべて拒否"):
+            feedback_result = {tool_call["id"]: "DENY" for tool_call in tool_calls}
+
+    return feedback_result
+
+
+def feedback_summary(feedback_result: str | dict) -> str:
+    """承認・拒否の結果をチャット欄に表示する文字列にする"""
+    if isinstance(feedback_result, str):
+        return feedback_result
+    approved = sum(1 for decision in feedback_result.values() if decision == "APPROVE")
+    return f"承認 {approved} 件 / 拒否 {len(feedback_result) - approved} 件"
+
+
 def app():
     # タイトルの設定
     st.title("WebリサーチAIエージェント")
+    st.sidebar.toggle("LLM の出力をトークン単位で表示", key="stream_tokens")
+    if hasattr(checkpointer, "metrics"):
+        metrics = checkpointer.metrics()
+        st.sidebar.caption(
+            f"会話: {metrics['live_threads']} 件 / {metrics['bytes'] / 1024 / 1024:.1f}MB"
+            f"（削除済み {metrics['evicted_idle'] + metrics['evicted_bytes']} 件）"
+        )
 
     # メッセージ表示エリア
     for msg in st.session_state.messages:
@@ -148,17 +266,24 @@ def app():
         else:
             st.chat_message("assistant").write(msg["content"])
 
+    if st.session_state.ttft is not None:
+        st.caption(f"最初のトークンが表示されるまで: {st.session_state.ttft * 1000:.0f}ms")
+
     # ツール承認の確認（待機中のみ表示）
     if st.session_state.waiting_for_approval:
         if st.session_state.tool_info:
-            st.info(st.session_state.tool_info["args"])
-            if st.session_state.tool_info.get("name") == "web_file":
-                with st.container(height=400):
-                    st.html(st.session_state.tool_info["html"], width="stretch")
-
-            feedback_result = feedback()
+            if "tool_calls" in st.session_state.tool_info:
+                # まとめて承認する場合（1回の interrupt にすべてのツール呼び出しが入っている）
+                feedback_result = batch_feedback(st.session_state.tool_info["tool_calls"])
+            else:
+                st.info(st.session_state.tool_info["args"])
+                if st.session_state.tool_info.get("name") == "web_file":
+                    with st.container(height=400):
+                        st.html(st.session_state.tool_info["html"], width="stretch")
+
+                feedback_result = feedback()
             if feedback_result:
-                st.chat_message("user").write(feedback_result)
+                st.chat_message("user").write(feedback_summary(feedback_result))
                 # いったん待機状態を解除してから、interruptをresumeして継続実行する
                 st.session_state.waiting_for_approval = False
                 run_agent(resume=feedback_result)
@@ -1,9 +1,7 @@
 import asyncio
-import operator
 import os
-from langchain.chat_models import init_chat_model
-from langchain_core.messages import AnyMessage, AIMessage, HumanMessage, SystemMessage
-from langchain_mcp_adapters.client import MultiServerMCPClient
+import sys
+from langchain_core.messages import AIMessage, HumanMessage
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
 from pydantic import BaseModel
@@ -11,50 +9,75 @@ from typing import Annotated, Dict, List, Union
 
 from dotenv import load_dotenv
 
+import repo_root  # noqa: F401
+
+from answer_cache import with_answer_cache
+from mcp_pool import MCPSessionPool
+from message_log import MessageLog, MessageLogChannel
+from model_router import init_routed_chat_model
+from prompt_cache import (
+    cached_tools,
+    prompt_cache_enabled,
+    report_cache_usage,
+    with_system_prompt,
+)
+from tool_compaction import tool_output_compactor
+from trace_callbacks import traced_config
+
 load_dotenv()
 
 
-mcp_client = None
+# MCPサーバーの接続設定
+mcp_connections = {
+    # filesystem MCP
+    "file-system": {
+        "command": "npx",
+        "args": ["-y", "@modelcontextprotocol/server-filesystem", "./"],
+        "transport": "stdio",
+    },
+    # AWS Knowledge MCPサーバー
+    "aws-knowledge-mcp-server": {
+        "url": "https://knowledge-mcp.global.api.aws",
+        "transport": "streamable_http",
+    },
+}
+
+# セッションとツールのスキーマはプロセス内で使い回す（グラフを何度実行しても再起動しない）
+mcp_pool = MCPSessionPool(mcp_connections)
 tools = None
 llm_with_tools = None
 
+# BEDROCK_PROMPT_CACHE=1 の場合、システムプロンプト・ツール定義・履歴をキャッシュさせる
+use_prompt_cache = prompt_cache_enabled()
+
+# TOOL_OUTPUT_COMPACTION=1 の場合、AWS のドキュメントなどの検索結果を小さくしてから履歴に戻す
+compactor = tool_output_compactor()
 
-async def initialize_llm():
-    """MCPクライアントとツールを初期化する"""
-    global mcp_client, tools, llm_with_tools
 
+async def initialize_llm():
+    """MCPのツールとLLMを初期化する（2回目以降は何もしない）"""
+    global tools, llm_with_tools
+    if llm_with_tools is not None:
+        return
     # filesystem MCP に渡す許可ディレクトリは存在している必要があるため、
     # 起動前に作成しておく（存在していれば何もしない）
     docs_dir = os.path.abspath(os.path.join(os.getcwd(), "docs"))
     os.makedirs(docs_dir, exist_ok=True)
 
-    mcp_client = MultiServerMCPClient(
-        {
-            # filesystem MCP
-            "file-system": {
-                "command": "npx",
-                "args": ["-y", "@modelcontextprotocol/server-filesystem", "./"],
-                "transport": "stdio",
-            },
-            # AWS Knowledge MCPサーバー
-            "aws-knowledge-mcp-server": {
-                "url": "https://knowledge-mcp.global.api.aws",
-                "transport": "streamable_http",
-            },
-        }
-    )
-
     model_id = "global.anthropic.claude-opus-4-5-20251101-v1:0"
-    tools = await mcp_client.get_tools()
+    # スキーマがキャッシュ済みならサーバーは起動せず、ツールが呼ばれたときに起動する
+    tools = await mcp_pool.get_tools()
 
-    llm_with_tools = init_chat_model(
-        model=model_id, model_provider="bedrock_converse"
-    ).bind_tools(tools)
+    # MODEL_ROUTING=1 の場合、簡単なステップは速いモデルに送る（model_router.py）
+    llm_with_tools = init_routed_chat_model(
+        model_id, model_provider="bedrock_converse"
+    ).bind_tools(cached_tools(tools) if use_prompt_cache else tools)
 
 
 # ステートの定義
 class AgentState(BaseModel):
-    messages: Annotated[list[AnyMessage], operator.add]
+    # operator.add だと更新のたびにリスト全体をコピーするため、追記専用のログを使う
+    messages: Annotated[MessageLog, MessageLogChannel]
 
 
 system_prompt = """
@@ -66,8 +89,10 @@ system_prompt = """
 
 async def agent(state: AgentState) -> Dict[str, List[AIMessage]]:
     response = await llm_with_tools.ainvoke(
-        [SystemMessage(content=system_prompt)] + state.messages
+        with_system_prompt(system_prompt, state.messages, cache=use_prompt_cache)
     )
+    if use_prompt_cache:
+        report_cache_usage(response)
     return {"messages": [response]}
 
 
@@ -84,26 +109,45 @@ def route_node(state: AgentState) -> Union[str]:
     return "tools"  # toolsノードへ遷移
 
 
-async def main():
-    # MCPクライアントとツールを初期化
+async def build_graph():
+    # MCPのツールとLLMを初期化
     await initialize_llm()
 
     # グラフの構築
     builder = StateGraph(AgentState)
     builder.add_node("agent", agent)
-    builder.add_node("tools", ToolNode(tools))
+    builder.add_node(
+        "tools",
+        ToolNode(tools, awrap_tool_call=compactor.awrap_tool_call if compactor else None),
+    )
     builder.add_edge(START, "agent")
     builder.add_conditional_edges("agent", route_node)
     builder.add_edge("tools", "agent")
-    graph = builder.compile()
-
-    question = "Amazon Bedrockで利用可能なモデルプロバイダーを教えてください。"
-
-    # グラフの実行
-    result = await graph.ainvoke({"messages": [HumanMessage(content=question)]})
-    print(result)
+    return builder.compile()
+
+
+async def main(questions: list[str] | None = None):
+    # ANSWER_CACHE=1 と ANSWER_CACHE_SIDE_EFFECTS=1 の場合、同じ・ほぼ同じ質問には前回の回答を返す
+    # （ファイルへの出力も行わないため、明示的に有効にした場合だけ）
+    graph = with_answer_cache(await build_graph(), "mcp_agent", side_effects=True)
+
+    questions = questions or [
+        "Amazon Bedrockで利用可能なモデルプロバイダーを教えてください。"
+    ]
+
+    # グラフの実行（複数の質問でも MCP サーバーは起動したまま使い回す）
+    result = None
+    try:
+        for question in questions:
+            result = await graph.ainvoke(
+                {"messages": [HumanMessage(content=question)]}, config=traced_config()
+            )
+            print(result)
+    finally:
+        await mcp_pool.close()
+    print(f"MCP: {mcp_pool.stats}")
     return result
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(sys.argv[1:]))
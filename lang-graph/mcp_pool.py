@@ -0,0 +1,267 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+import anyio
+from langchain_core.tools import StructuredTool, ToolException
+from langchain_mcp_adapters.client import MultiServerMCPClient
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+
+DEFAULT_SCHEMA_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "agent_book", "mcp_tools.json"
+)
+# ツールのスキーマはサーバーのバージョンが変わらない限り同じなので、長めにキャッシュする
+DEFAULT_SCHEMA_TTL = 24 * 60 * 60
+DEFAULT_HEALTH_CHECK_INTERVAL = 30.0
+
+
+def _connection_lost(error: Exception) -> bool:
+    """サーバーとの接続が切れたことによる例外か（ツール自体のエラーは再試行しない）"""
+    if isinstance(error, McpError):
+        return error.error.code == CONNECTION_CLOSED
+    return True
+
+
+def _content_text(content) -> str:
+    """ツールの結果のコンテンツ1つ分の文字列（テキスト以外は省略したことだけを残す）"""
+    content_type = getattr(content, "type", "")
+    if content_type == "text":
+        return content.text
+    return f"[{content_type or 'content'} omitted]"
+
+
+@dataclass
+class _ServerHandle:
+    """起動中のMCPサーバー（セッション）1つ分の状態"""
+
+    session: object
+    task: asyncio.Task
+    stop: asyncio.Event
+    last_checked: float = field(default_factory=time.monotonic)
+
+
+class MCPSessionPool:
+    """MCPサーバーのセッションをプロセス内で使い回すプール
+
+    - セッション（stdio のサーバープロセス / streamable_http の接続）は一度開いたら
+      close() まで維持し、グラフを何度実行しても再起動しない
+    - ツールのスキーマはディスクにキャッシュし、2回目以降はサーバーを起動せずにツールを作る
+    - サーバーはそのサーバーのツールが初めて呼ばれたときに起動する
+    - 一定間隔で ping を送り、応答しないサーバーは再起動する
+    """
+
+    def __init__(
+        self,
+        connections: dict[str, dict],
+        schema_cache_path: str | None = DEFAULT_SCHEMA_CACHE_PATH,
+        schema_ttl: float = DEFAULT_SCHEMA_TTL,
+        health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL,
+    ):
+        self.connections = connections
+        self.schema_cache_path = schema_cache_path
+        self.schema_ttl = schema_ttl
+        self.health_check_interval = health_check_interval
+
+        self._client = MultiServerMCPClient(connections)
+        self._handles: dict[str, _ServerHandle] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._tools: list[StructuredTool] | None = None
+        self.stats = {"server_starts": 0, "restarts": 0, "schema_fetches": 0}
+
+    # ---
+    # ツール
+    # ---
+    async def get_tools(self) -> list[StructuredTool]:
+        """全サーバーのツールを返す（スキーマはキャッシュから作り、サーバーは起動しない）"""
+        if self._tools is None:
+            cache = self._load_schema_cache()
+            tools = []
+            for server in self.connections:
+                schemas = await self._server_schemas(server, cache)
+                tools.extend(self._make_tool(server, schema) for schema in schemas)
+            self._save_schema_cache(cache)
+            self._tools = tools
+        return self._tools
+
+    def invalidate(self, server: str | None = None):
+        """ツールのスキーマのキャッシュを破棄する（server 省略時は全サーバー）"""
+        cache = self._load_schema_cache()
+        for name in [server] if server else list(self.connections):
+            cache.pop(name, None)
+        self._save_schema_cache(cache)
+        self._tools = None
+
+    async def _server_schemas(self, server: str, cache: dict) -> list[dict]:
+        entry = cache.get(server)
+        if (
+            entry
+            and entry.get("config_hash") == self._config_hash(server)
+            and time.time() - entry.get("fetched_at", 0) < self.schema_ttl
+        ):
+            return entry["tools"]
+
+        session = await self.session(server)
+        result = await session.list_tools()
+        self.stats["schema_fetches"] += 1
+        schemas = [
+            {
+                "name": t.name,
+                "description": t.description or "",
+                "inputSchema": t.inputSchema,
+            }
+            for t in result.tools
+        ]
+        cache[server] = {
+            "config_hash": self._config_hash(server),
+            "fetched_at": time.time(),
+            "tools": schemas,
+        }
+        return schemas
+
+    def _make_tool(self, server: str, schema: dict) -> StructuredTool:
+        name = schema["name"]
+
+        async def call_tool(**arguments):
+            return await self.call_tool(server, name, arguments)
+
+        return StructuredTool(
+            name=name,
+            description=schema["description"],
+            args_schema=schema["inputSchema"],
+            coroutine=call_tool,
+        )
+
+    async def call_tool(self, server: str, name: str, arguments: dict) -> str:
+        """ツールを呼び出す（接続が切れていた場合は一度だけ再起動して再試行する）"""
+        for attempt in range(2):
+            session = await self.session(server)
+            try:
+                result = await session.call_tool(name, arguments)
+                break
+            except (anyio.ClosedResourceError, anyio.BrokenResourceError, OSError, McpError) as e:
+                # stdio のサーバーが呼び出しの途中で落ちた場合は McpError（Connection closed）になる
+                if attempt or not _connection_lost(e):
+                    raise
+                await self._restart(server, session)
+
+        output = "\n".join(_content_text(c) for c in result.content)
+        if result.isError:
+            raise ToolException(output)
+        return output
+
+    # ---
+    # セッション
+    # ---
+    async def session(self, server: str):
+        """サーバーのセッションを返す（未起動なら起動し、古ければヘルスチェックする）"""
+        lock = self._locks.setdefault(server, asyncio.Lock())
+        async with lock:
+            handle = self._handles.get(server)
+            if handle and handle.task.done():
+                # サーバープロセスが終了している
+                await self._stop(server)
+                self.stats["restarts"] += 1
+                handle = None
+            elif handle and time.monotonic() - handle.last_checked > self.health_check_interval:
+                if await self._healthy(handle):
+                    handle.last_checked = time.monotonic()
+                else:
+                    await self._stop(server)
+                    self.stats["restarts"] += 1
+                    handle = None
+
+            if handle is None:
+                handle = await self._start(server)
+            return handle.session
+
+    async def _healthy(self, handle: _ServerHandle) -> bool:
+        try:
+            await asyncio.wait_for(handle.session.send_ping(), timeout=5)
+            return True
+        except Exception:
+            return False
+
+    async def _start(self, server: str) -> _ServerHandle:
+        ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        stop = asyncio.Event()
+        # anyio のキャンセルスコープは開いたタスクで閉じる必要があるため、
+        # セッションごとに専用のタスクで async with を保持し続ける
+        task = asyncio.create_task(self._hold_session(server, ready, stop))
+        session = await ready
+        handle = _ServerHandle(session=session, task=task, stop=stop)
+        self._handles[server] = handle
+        self.stats["server_starts"] += 1
+        return handle
+
+    async def _hold_session(self, server: str, ready: asyncio.Future, stop: asyncio.Event):
+        try:
+            async with self._client.session(server) as session:
+                ready.set_result(session)
+                await stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+
+    async def _restart(self, server: str, failed):
+        """failed のセッションのサーバーを止める（次の session() で起動し直す）
+
+        同時に実行していた呼び出しがどちらも失敗した場合、先に再起動した呼び出しの
+        新しいサーバーを止めないよう、まだ failed のセッションが使われている場合だけ止める。
+        """
+        lock = self._locks.setdefault(server, asyncio.Lock())
+        async with lock:
+            handle = self._handles.get(server)
+            if handle is None or handle.session is not failed:
+                return
+            await self._stop(server)
+            self.stats["restarts"] += 1
+
+    async def _stop(self, server: str):
+        handle = self._handles.pop(server, None)
+        if handle is None:
+            return
+        handle.stop.set()
+        try:
+            await asyncio.wait_for(handle.task, timeout=5)
+        except Exception:
+            handle.task.cancel()
+
+    async def close(self):
+        """起動中のすべてのサーバーを停止する"""
+        for server in list(self._handles):
+            await self._stop(server)
+
+    # ---
+    # スキーマのキャッシュ
+    # ---
+    def _config_hash(self, server: str) -> str:
+        config = json.dumps(self.connections[server], sort_keys=True, default=str)
+        return hashlib.sha256(config.encode("utf-8")).hexdigest()
+
+    def _load_schema_cache(self) -> dict:
+        if not self.schema_cache_path or not os.path.exists(self.schema_cache_path):
+            return {}
+        try:
+            with open(self.schema_cache_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_schema_cache(self, cache: dict):
+        if not self.schema_cache_path:
+            return
+        cache_dir = os.path.dirname(self.schema_cache_path) or "."
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False)
+            os.replace(tmp_path, self.schema_cache_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
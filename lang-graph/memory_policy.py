@@ -0,0 +1,170 @@
+"""会話の履歴をトークン数の上限内に収めるためのメモリーポリシー
+
+create_react_agent の pre_model_hook として使う。checkpointer にはこれまで通り
+すべてのメッセージを保存し、LLM に渡す入力（llm_input_messages）だけを次の形にする。
+
+    [SystemMessage(これまでの会話の要約)] + 要約していない直近のターンのメッセージ
+
+ - ターンは HumanMessage から次の HumanMessage の直前までとし、ターン単位で切り詰める
+   （ツール呼び出しの AIMessage とその ToolMessage が別々になることはない）
+ - 要約していないターンが keep_last_turns + summarize_every - 1 ターンを超えるか、
+   max_tokens を超えたら、直近 keep_last_turns ターンを残して古いターンを要約に回す
+   （最新の1ターンは必ず残す）
+ - 要約は state["memory_summary"] に保存し、前回の要約に新しく溢れた分だけを追記して更新する
+   （毎回履歴全体を要約し直さない）
+"""
+
+import json
+from collections.abc import Callable, Sequence
+
+from langchain_core.messages import (
+    AnyMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+)
+from langgraph.prebuilt.chat_agent_executor import AgentState
+from typing_extensions import NotRequired
+
+import repo_root  # noqa: F401
+
+from message_text import content_to_text
+from tool_compaction import estimate_tokens as estimate_text_tokens
+
+# メッセージごとのロールや区切りの分
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = """あなたは会話の記録係です。
+これまでの会話の要約と、その後に続く会話が与えられます。
+要約に新しい会話の内容を追記し、更新した要約だけを出力してください。
+- ユーザーの質問・依頼、ツールの実行結果、それに対する回答の要点を残してください。
+- 数値や固有名詞など、後の会話で参照されそうな情報は省略しないでください。
+- {max_tokens} トークン程度以内にまとめてください。
+"""
+
+# (これまでの要約, 新しく要約に含めるメッセージ) -> 更新した要約
+Summarizer = Callable[[str, Sequence[BaseMessage]], str]
+
+
+class MemoryState(AgentState):
+    """要約を保存するキーを追加した create_react_agent の state"""
+
+    memory_summary: NotRequired[dict]
+
+
+def estimate_tokens(message: BaseMessage) -> int:
+    """メッセージのトークン数の見積もり（APIを呼ばず、同じ入力には常に同じ値を返す）
+
+    本文とツール呼び出しの文字列を tool_compaction.estimate_tokens で見積もり、メッセージごとの分を足す。
+    """
+    text = content_to_text(message.content)
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        text += json.dumps(
+            [{"name": c["name"], "args": c["args"]} for c in tool_calls],
+            ensure_ascii=False,
+        )
+    return MESSAGE_OVERHEAD_TOKENS + estimate_text_tokens(text)
+
+
+def llm_summarizer(llm, max_tokens: int = 500) -> Summarizer:
+    """チャットモデルで要約を更新する Summarizer を作る"""
+    system_prompt = SUMMARY_PROMPT.format(max_tokens=max_tokens)
+
+    def summarize(summary: str, messages: Sequence[BaseMessage]) -> str:
+        lines = []
+        for m in messages:
+            line = f"{m.type}: {content_to_text(m.content)}"
+            if tool_calls := getattr(m, "tool_calls", None):
+                line += f" {json.dumps(tool_calls, ensure_ascii=False)}"
+            lines.append(line)
+        transcript = "\n".join(lines)
+        response = llm.invoke(
+            [
+                SystemMessage(content=system_prompt),
+                HumanMessage(
+                    content=f"# これまでの要約\n{summary or '（なし）'}\n\n# 新しい会話\n{transcript}"
+                ),
+            ]
+        )
+        return content_to_text(response.content)
+
+    return summarize
+
+
+class MemoryPolicy:
+    """履歴をトークン数の上限内に収める pre_model_hook
+
+    Args:
+        summarizer: 要約を更新する関数（llm_summarizer(llm) など）
+        max_tokens: LLM に渡す履歴（要約を含む）のトークン数の上限
+        keep_last_turns: 要約せずにそのまま渡す直近のターン数
+        summary_max_tokens: 要約に割り当てるトークン数
+        summarize_every: 要約していないターンが keep_last_turns をこのターン数だけ超えたら、
+            まとめて要約する（1 なら毎ターン要約する。大きいほど要約の呼び出しが減る）
+    """
+
+    def __init__(
+        self,
+        summarizer: Summarizer,
+        max_tokens: int = 4000,
+        keep_last_turns: int = 6,
+        summary_max_tokens: int = 500,
+        summarize_every: int = 4,
+    ):
+        self.summarizer = summarizer
+        self.max_tokens = max_tokens
+        self.keep_last_turns = max(1, keep_last_turns)
+        self.summary_max_tokens = summary_max_tokens
+        self.summarize_every = max(1, summarize_every)
+
+    def pre_model_hook(self, state: dict) -> dict:
+        messages: list[AnyMessage] = state["messages"]
+        memory = state.get("memory_summary") or {"text": "", "summarized": 0}
+        summarized = memory["summarized"]
+
+        cut = self._recent_start(messages, summarized)
+        if cut > summarized:
+            # 前回の要約以降に溢れたメッセージだけを要約に追記する
+            memory = {
+                "text": self.summarizer(memory["text"], messages[summarized:cut]),
+                "summarized": cut,
+            }
+
+        llm_input = list(messages[memory["summarized"] :])
+        if memory["text"]:
+            llm_input.insert(
+                0, SystemMessage(content=f"これまでの会話の要約:\n{memory['text']}")
+            )
+        return {"llm_input_messages": llm_input, "memory_summary": memory}
+
+    def _recent_start(self, messages: Sequence[AnyMessage], summarized: int) -> int:
+        """そのまま渡す直近のターンの先頭の位置を返す（要約が不要なら summarized を返す）
+
+        末尾から HumanMessage を区切りにさかのぼり、要約していないターンが
+        keep_last_turns + summarize_every - 1 ターン以内かつトークン数の上限内なら要約しない。
+        超えた場合は直近 keep_last_turns ターン（上限内に収まる分）を残し、それより前を要約に回す。
+        最新の1ターンは上限を超えても残す。要約済みの範囲より前は見ないので、
+        履歴が長くなってもコストは増えない。
+        """
+        budget = self.max_tokens - self.summary_max_tokens
+        limit = self.keep_last_turns + self.summarize_every - 1
+        starts: list[int] = []
+        tokens = turn_tokens = 0
+        for i in range(len(messages) - 1, summarized - 1, -1):
+            turn_tokens += estimate_tokens(messages[i])
+            if not isinstance(messages[i], HumanMessage):
+                continue
+            if len(starts) == limit or (starts and tokens + turn_tokens > budget):
+                overflow = True
+                break
+            tokens += turn_tokens
+            turn_tokens = 0
+            starts.append(i)
+        else:
+            # 要約済みの位置までさかのぼった（HumanMessage より前のメッセージが残っている場合もある）
+            overflow = bool(starts) and tokens + turn_tokens > budget
+
+        if not overflow:
+            return summarized
+        return starts[min(len(starts), self.keep_last_turns) - 1]
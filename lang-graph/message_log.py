@@ -0,0 +1,157 @@
+from collections.abc import Iterable, Sequence
+from itertools import islice
+from typing import Any
+
+from langgraph.channels.binop import BinaryOperatorAggregate
+
+
+class MessageLogView(Sequence):
+    """MessageLog の先頭に prefix（SystemMessage など）を付けた読み取り専用のビュー
+
+    作成時点の長さで固定されるため、後からログに追記されても内容は変わらない。
+    リストを作り直さないので、LLM呼び出しのたびに履歴全体をコピーせずに済む。
+    """
+
+    __slots__ = ("_prefix", "_items", "_end")
+
+    def __init__(self, prefix: Sequence, items: list, end: int):
+        self._prefix = tuple(prefix)
+        self._items = items
+        self._end = end
+
+    def __len__(self) -> int:
+        return len(self._prefix) + self._end
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("MessageLogView index out of range")
+        if index < len(self._prefix):
+            return self._prefix[index]
+        return self._items[index - len(self._prefix)]
+
+    def __iter__(self):
+        yield from self._prefix
+        yield from islice(self._items, self._end)
+
+    def __repr__(self) -> str:
+        return f"MessageLogView({list(self)!r})"
+
+
+class MessageLog(Sequence):
+    """追記専用のメッセージ履歴
+
+    operator.add のように更新のたびに新しいリストを作らず、内部のリストへ追記する。
+    内部のリストは追記後の MessageLog と共有し、各 MessageLog は自分の長さまでしか見ないため、
+    古い MessageLog の内容は変わらない（LangGraph がチャネルをコピーしても安全）。
+    """
+
+    __slots__ = ("_items", "_len")
+
+    def __init__(self, messages: Iterable = ()):
+        self._items = list(messages)
+        self._len = len(self._items)
+
+    @classmethod
+    def _shared(cls, items: list, length: int) -> "MessageLog":
+        log = cls.__new__(cls)
+        log._items = items
+        log._len = length
+        return log
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._items[i] for i in range(*index.indices(self._len))]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("MessageLog index out of range")
+        return self._items[index]
+
+    def __iter__(self):
+        return islice(self._items, self._len)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (MessageLog, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"MessageLog({list(self)!r})"
+
+    def appended(self, messages: Iterable) -> "MessageLog":
+        """messages を追記した MessageLog を返す（自分自身は変更しない）
+
+        自分が最新（内部のリストの末尾まで見ている）なら内部のリストに追記するだけで済む。
+        すでに他の更新が追記されている場合だけ、自分の長さまでをコピーして分岐する。
+        """
+        if self._len == len(self._items):
+            items = self._items
+        else:
+            items = self._items[: self._len]
+        items.extend(messages)
+        return MessageLog._shared(items, len(items))
+
+    def view(self, prefix: Sequence = ()) -> MessageLogView:
+        """現時点の履歴の先頭に prefix を付けたビューを返す（コピーしない）"""
+        return MessageLogView(prefix, self._items, self._len)
+
+    # pydantic の BaseModel（AgentState）のフィールドとして使えるようにする。
+    # list が渡された場合だけ MessageLog に変換し、MessageLog はそのまま通す。
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type, handler):
+        from pydantic_core import core_schema
+
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(list),
+        )
+
+    @classmethod
+    def _validate(cls, value) -> "MessageLog":
+        if isinstance(value, MessageLog):
+            return value
+        if isinstance(value, (list, tuple)):
+            return cls(value)
+        raise TypeError(f"MessageLog にはメッセージのリストを指定してください: {value!r}")
+
+
+def append_messages(current: MessageLog | list | None, update) -> MessageLog:
+    """AgentState.messages のreducer（更新分だけを追記する）
+
+    チェックポイントから復元した値などで current が list の場合は、最初の一度だけ変換する。
+    """
+    log = current if isinstance(current, MessageLog) else MessageLog(current or [])
+    if update is None:
+        return log
+    if not isinstance(update, (list, tuple, MessageLog)):
+        update = [update]
+    return log.appended(update)
+
+
+class MessageLogChannel(BinaryOperatorAggregate):
+    """MessageLog を値に持つチャネル（AgentState.messages に Annotated で指定する）
+
+    チェックポイントにはメッセージの list として保存し、復元時に MessageLog に戻す。
+    MessageLog 自体を保存すると JsonPlusSerializer の登録されていない型になり、
+    LANGGRAPH_STRICT_MSGPACK=true では復元できないため。
+    """
+
+    def __init__(self, typ: type = MessageLog, operator=append_messages):
+        super().__init__(typ, operator)
+
+    def from_checkpoint(self, checkpoint: Any) -> "MessageLogChannel":
+        channel = super().from_checkpoint(checkpoint)
+        if isinstance(channel.value, (list, tuple)):
+            channel.value = MessageLog(channel.value)
+        return channel
+
+    def checkpoint(self) -> Any:
+        value = super().checkpoint()
+        return list(value) if isinstance(value, MessageLog) else value
@@ -0,0 +1,20 @@
+from typing import Any
+
+
+def content_to_text(content: Any) -> str:
+    """LangChainのmessage.content(str | list[str | dict])を人間が読める文字列へ正規化する。
+
+    文字列のブロックと text を持つブロックだけをつなげ、ツール呼び出しや画像などのブロックは除く。
+    """
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            block
+            if isinstance(block, str)
+            else block["text"]
+            if isinstance(block, dict) and isinstance(block.get("text"), str)
+            else ""
+            for block in content
+        )
+    return str(content)
@@ -0,0 +1,329 @@
+"""エージェントの1ステップごとに、速いモデル（fast）と強いモデル（strong）を使い分ける
+
+どのステップでも同じ大きなモデルを呼ぶと、「検索結果を受けて send_aws_sns を呼ぶ」
+「Add 2 and 4 に答える」といった簡単なステップでも待ち時間と料金がかかる。
+ModelRouter は呼び出しのたびに、安く求められる特徴だけを見てどちらのモデルに送るかを決める。
+ - 履歴が長い（メッセージ数・文字数が上限を超える）場合は strong
+ - 直前がツールの結果の場合（結果を受けて次の行動を決めるだけ）は fast。
+   ただし、ツールがエラーを返した場合は立て直しが必要なので strong
+ - それ以外は、最後のユーザーの質問を classifier（既定は classify_question）で分類する
+fast の応答のツール呼び出しが壊れている（解析できない・存在しないツール・必須の引数がない）場合や
+fast の呼び出しが失敗した場合は、同じ入力で strong を呼び直す（fallback）。
+
+init_chat_model と同じように bind_tools() でき、LangChain の Runnable として
+グラフのノード・create_react_agent のどちらにも渡せる。tier ごとの件数・待ち時間と、
+すべて strong で呼んだ場合と比べて短縮できた時間（推定）は RouterStats に集計する。
+
+MODEL_ROUTING=1 の場合だけ init_routed_chat_model / routed が ModelRouter を返す
+（fast のモデルは FAST_MODEL_ID で変更できる）。終了時に tier ごとの集計を表示する。
+"""
+
+import atexit
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+    convert_to_messages,
+)
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+import repo_root  # noqa: F401
+
+from bedrock_client import get_bedrock_client
+from message_text import content_to_text
+
+TIERS = ("fast", "strong")
+
+DEFAULT_FAST_MODEL_ID = "global.anthropic.claude-haiku-4-5-20251001-v1:0"
+
+# これを超える履歴は要約・判断が難しくなるため strong に送る
+DEFAULT_MAX_FAST_MESSAGES = 20
+DEFAULT_MAX_FAST_CHARS = 12000
+
+# 説明・比較・調査などを求める質問は strong に送る（それ以外の短い質問は fast）
+_STRONG_QUESTION = re.compile(
+    r"解説|説明|比較|設計|分析|調査|考察|理由|なぜ|どうして|まとめ|要約|レポート|"
+    r"explain|compare|design|analy|research|summar|report|why|how does",
+    re.IGNORECASE,
+)
+MAX_FAST_QUESTION_CHARS = 200
+
+
+def routing_enabled() -> bool:
+    return os.getenv("MODEL_ROUTING") == "1"
+
+
+def fast_model_id() -> str:
+    return os.getenv("FAST_MODEL_ID") or DEFAULT_FAST_MODEL_ID
+
+
+def classify_question(question: str) -> str:
+    """質問の文面だけで tier を決める（短く、説明や調査を求めていない質問は fast）"""
+    if len(question) > MAX_FAST_QUESTION_CHARS or _STRONG_QUESTION.search(question):
+        return "strong"
+    return "fast"
+
+
+@dataclass
+class RouteFeatures:
+    message_count: int
+    history_chars: int
+    pending_tool_results: int  # 最後の AIMessage のあとに届いたツールの結果の数
+    tool_error: bool
+    question: str
+
+    @classmethod
+    def from_messages(cls, messages: list[BaseMessage]) -> "RouteFeatures":
+        history = [m for m in messages if not isinstance(m, SystemMessage)]
+        pending = []
+        for message in reversed(history):
+            if not isinstance(message, ToolMessage):
+                break
+            pending.append(message)
+        question = next(
+            (
+                content_to_text(m.content)
+                for m in reversed(history)
+                if isinstance(m, HumanMessage)
+            ),
+            "",
+        )
+        return cls(
+            message_count=len(history),
+            history_chars=sum(len(content_to_text(m.content)) for m in history),
+            pending_tool_results=len(pending),
+            tool_error=any(getattr(m, "status", None) == "error" for m in pending),
+            question=question,
+        )
+
+
+def _tool_spec(tool: Any) -> tuple[str, set[str]] | None:
+    """bind_tools に渡したツールの (名前, 必須の引数)。キャッシュポイントなどは None"""
+    if isinstance(tool, dict) and "cachePoint" in tool:
+        return None
+    try:
+        function = convert_to_openai_tool(tool)["function"]
+    except (TypeError, ValueError, KeyError):
+        return None
+    return function["name"], set(function.get("parameters", {}).get("required", []))
+
+
+def malformed_reason(response: BaseMessage, tool_specs: dict[str, set[str]]) -> str | None:
+    """fast の応答を使えない理由（使える場合は None）"""
+    if not isinstance(response, AIMessage):
+        return "not_ai_message"
+    if response.invalid_tool_calls:
+        return "invalid_tool_call"
+    for call in response.tool_calls:
+        if not isinstance(call.get("args"), dict):
+            return "invalid_args"
+        if tool_specs:
+            if call["name"] not in tool_specs:
+                return "unknown_tool"
+            if tool_specs[call["name"]] - call["args"].keys():
+                return "missing_args"
+    if not response.tool_calls and not content_to_text(response.content).strip():
+        return "empty"
+    return None
+
+
+class RouterStats:
+    """tier ごとの件数・待ち時間と、fallback の件数（スレッドセーフ）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()  # 応答を返した tier ごとの件数（fallback は strong に数える）
+        self.reasons = Counter()
+        self.fallbacks = Counter()
+        self.latency_ms = {tier: [] for tier in TIERS}  # モデルの呼び出しごとの待ち時間
+
+    def record(self, tier: str, reason: str, calls: list[tuple[str, float]], fallback: str | None):
+        with self._lock:
+            self.requests[tier] += 1
+            self.reasons[reason] += 1
+            if fallback is not None:
+                self.fallbacks[fallback] += 1
+            for called, ms in calls:
+                self.latency_ms[called].append(ms)
+
+    def latency_saved_ms(self) -> float | None:
+        """すべて strong で呼んだ場合（strong の平均の待ち時間 × 件数）と比べて短縮した時間の推定"""
+        with self._lock:
+            strong = self.latency_ms["strong"]
+            if not strong:
+                return None
+            total = sum(self.requests.values())
+            actual = sum(sum(values) for values in self.latency_ms.values())
+            return total * (sum(strong) / len(strong)) - actual
+
+    def summary(self) -> str:
+        saved = self.latency_saved_ms()
+        with self._lock:
+            lines = []
+            for tier in TIERS:
+                values = self.latency_ms[tier]
+                average = sum(values) / len(values) if values else 0.0
+                lines.append(
+                    f"{tier:<6} requests={self.requests[tier]:>5} calls={len(values):>5} "
+                    f"avg={average:>8.1f}ms"
+                )
+            lines.append(
+                "fallbacks: "
+                + (", ".join(f"{k}={v}" for k, v in self.fallbacks.items()) or "0")
+            )
+            lines.append("reasons: " + ", ".join(f"{k}={v}" for k, v in self.reasons.items()))
+            lines.append(
+                "latency saved (vs strong only): "
+                + ("-" if saved is None else f"{saved:.0f}ms")
+            )
+            return "\n".join(lines)
+
+
+class ModelRouter(Runnable):
+    """fast / strong の2つのチャットモデルを、呼び出しごとに使い分ける Runnable"""
+
+    def __init__(
+        self,
+        fast,
+        strong,
+        classifier: Callable[[str], str] = classify_question,
+        max_fast_messages: int = DEFAULT_MAX_FAST_MESSAGES,
+        max_fast_chars: int = DEFAULT_MAX_FAST_CHARS,
+        stats: RouterStats | None = None,
+        tool_specs: dict[str, set[str]] | None = None,
+    ):
+        self.fast = fast
+        self.strong = strong
+        self.classifier = classifier
+        self.max_fast_messages = max_fast_messages
+        self.max_fast_chars = max_fast_chars
+        self.stats = stats or RouterStats()
+        self.tool_specs = tool_specs or {}
+
+    def bind_tools(self, tools: list, **kwargs) -> "ModelRouter":
+        """両方のモデルに同じツールを bind したルーター（集計は共有する）"""
+        specs = [spec for spec in map(_tool_spec, tools) if spec is not None]
+        return ModelRouter(
+            self.fast.bind_tools(tools, **kwargs),
+            self.strong.bind_tools(tools, **kwargs),
+            classifier=self.classifier,
+            max_fast_messages=self.max_fast_messages,
+            max_fast_chars=self.max_fast_chars,
+            stats=self.stats,
+            tool_specs=dict(specs),
+        )
+
+    def route(self, messages: list[BaseMessage]) -> tuple[str, str]:
+        """(tier, 理由) を返す"""
+        features = RouteFeatures.from_messages(messages)
+        if (
+            features.message_count > self.max_fast_messages
+            or features.history_chars > self.max_fast_chars
+        ):
+            return "strong", "long_history"
+        if features.tool_error:
+            return "strong", "tool_error"
+        if features.pending_tool_results:
+            return "fast", "tool_results"
+        return self.classifier(features.question), "classifier"
+
+    @staticmethod
+    def _messages(input: Any) -> list[BaseMessage]:
+        if hasattr(input, "to_messages"):
+            return input.to_messages()
+        if isinstance(input, str):
+            return [HumanMessage(content=input)]
+        return convert_to_messages(input)
+
+    def _model(self, tier: str):
+        return self.fast if tier == "fast" else self.strong
+
+    def invoke(self, input, config=None, **kwargs):
+        messages = self._messages(input)
+        tier, reason = self.route(messages)
+        calls, fallback = [], None
+        if tier == "fast":
+            started = time.perf_counter()
+            try:
+                response = self.fast.invoke(messages, config, **kwargs)
+                fallback = malformed_reason(response, self.tool_specs)
+            except Exception as e:
+                fallback = f"error:{type(e).__name__}"
+            calls.append(("fast", (time.perf_counter() - started) * 1000))
+            if fallback is None:
+                self.stats.record("fast", reason, calls, None)
+                return response
+
+        started = time.perf_counter()
+        response = self.strong.invoke(messages, config, **kwargs)
+        calls.append(("strong", (time.perf_counter() - started) * 1000))
+        self.stats.record("strong", reason, calls, fallback)
+        return response
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        messages = self._messages(input)
+        tier, reason = self.route(messages)
+        calls, fallback = [], None
+        if tier == "fast":
+            started = time.perf_counter()
+            try:
+                response = await self.fast.ainvoke(messages, config, **kwargs)
+                fallback = malformed_reason(response, self.tool_specs)
+            except Exception as e:
+                fallback = f"error:{type(e).__name__}"
+            calls.append(("fast", (time.perf_counter() - started) * 1000))
+            if fallback is None:
+                self.stats.record("fast", reason, calls, None)
+                return response
+
+        started = time.perf_counter()
+        response = await self.strong.ainvoke(messages, config, **kwargs)
+        calls.append(("strong", (time.perf_counter() - started) * 1000))
+        self.stats.record("strong", reason, calls, fallback)
+        return response
+
+
+# プロセス全体で共有する集計（MODEL_ROUTING=1 のとき、終了時に表示する）
+stats = RouterStats()
+_report_registered = False
+
+
+def routed(fast, strong):
+    """MODEL_ROUTING=1 なら fast / strong を使い分ける ModelRouter、そうでなければ strong を返す"""
+    global _report_registered
+    if not routing_enabled():
+        return strong
+    if not _report_registered:
+        _report_registered = True
+        atexit.register(
+            lambda: sum(stats.requests.values()) and print(f"[model_router]\n{stats.summary()}")
+        )
+    return ModelRouter(fast, strong, stats=stats)
+
+
+def init_routed_chat_model(model_id: str, model_provider: str = "bedrock_converse", **kwargs):
+    """init_chat_model(model_id) の代わりに使う（MODEL_ROUTING=1 なら FAST_MODEL_ID と使い分ける）
+
+    Bedrock のモデルには、adaptive リトライなどを設定した共有のクライアント（bedrock_client.py）を渡す。
+    """
+    from langchain.chat_models import init_chat_model
+
+    if model_provider == "bedrock_converse":
+        kwargs.setdefault("client", get_bedrock_client())
+
+    strong = init_chat_model(model=model_id, model_provider=model_provider, **kwargs)
+    if not routing_enabled():
+        return strong
+    fast = init_chat_model(model=fast_model_id(), model_provider=model_provider, **kwargs)
+    return routed(fast, strong)
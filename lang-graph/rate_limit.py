@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """1秒あたりのリクエスト数を制限するトークンバケット（asyncio用）
+
+    rate <= 0 の場合は制限しない。capacity まではバーストを許可する。
+    """
+
+    def __init__(self, rate: float = 0.0, capacity: float | None = None):
+        self.configure(rate, capacity)
+
+    def configure(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+        # トークンが足りない場合は先に予約（マイナス残高）してから、補充されるまで待つ。
+        # await の前に予約を済ませるので、ロックなしでも到着順に払い出される。
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+# 呼び出し先（bedrock, tavily など）ごとのリミッター
+_limiters: dict[str, TokenBucket] = {}
+
+
+def limiter(name: str) -> TokenBucket:
+    """名前に対応するリミッターを返す（未設定の場合は制限なし）"""
+    if name not in _limiters:
+        _limiters[name] = TokenBucket()
+    return _limiters[name]
+
+
+def configure_limiter(name: str, rate: float, capacity: float | None = None):
+    """名前に対応するリミッターの毎秒リクエスト数を設定する"""
+    limiter(name).configure(rate, capacity)
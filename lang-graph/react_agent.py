@@ -1,18 +1,30 @@
 from langgraph.prebuilt import create_react_agent
-from langchain.tools import tool
+from langchain_core.tools import tool
 from langchain_core.messages import HumanMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 import os
 from dotenv import load_dotenv
-from typing import Any
+
+from langgraph.checkpoint.memory import InMemorySaver
+from memory_policy import MemoryPolicy, MemoryState, llm_summarizer
+from message_text import content_to_text
+from model_router import routed
+from sqlite_checkpointer import SqliteDeltaSaver
+from trace_callbacks import traced_config
 
 load_dotenv()
 
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash", api_key=os.getenv("GEMINI_API_KEY")
-)
+# Gemini のクライアントは import 時には作らず、実行するときに作る
+# （GEMINI_API_KEY がなくても import でき、build_agent にテスト用のモデルも渡せる）
+def get_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    def gemini(model: str):
+        return ChatGoogleGenerativeAI(model=model, api_key=os.getenv("GEMINI_API_KEY"))
+
+    # MODEL_ROUTING=1 の場合、「Add 2 and 4」のような簡単なステップは flash-lite に送る
+    return routed(gemini("gemini-2.5-flash-lite"), gemini("gemini-2.5-flash"))
 
 
 @tool
@@ -27,56 +39,59 @@ def multiply(a: int, b: int) -> int:
     return a * b
 
 
-for i, t in enumerate([add, multiply]):
-    print(f"Tool_{i+1}:")
-    print(f"Name: {t.name} \nDescription: {t.description}")
-    print("-" * 50)
+def get_checkpointer():
+    # CHECKPOINT_DB を指定した場合は SQLite に保存し、再実行しても同じ会話を続けられる
+    if checkpoint_db := os.getenv("CHECKPOINT_DB"):
+        return SqliteDeltaSaver(checkpoint_db)
+    return InMemorySaver()
 
-agent = create_react_agent(llm, [add, multiply])  # 　ツールはリストで渡す
 
-from langgraph.checkpoint.memory import InMemorySaver
+def build_agent(llm, checkpointer=None, tools=None):
+    # 履歴全体を毎回送らないよう、古いターンは要約して直近のターンだけを渡す
+    memory_policy = MemoryPolicy(llm_summarizer(llm), max_tokens=4000, keep_last_turns=6)
+
+    return create_react_agent(
+        model=llm,
+        tools=tools or [add, multiply],
+        checkpointer=checkpointer,
+        state_schema=MemoryState,
+        pre_model_hook=memory_policy.pre_model_hook,
+    )
+
+
+def main():
+    for i, t in enumerate([add, multiply]):
+        print(f"Tool_{i+1}:")
+        print(f"Name: {t.name} \nDescription: {t.description}")
+        print("-" * 50)
+
+    agent_with_memory = build_agent(get_llm(), checkpointer=get_checkpointer())
+
+    session_id = "test_session"
+    # TRACE_PATH / TRACE_SUMMARY を指定すると、ノード・LLM・ツールごとの span を記録する
+    config = traced_config({"configurable": {"thread_id": session_id}})
+
+    # first input
+    user_input1 = "Add 2 and 4"
+    response = agent_with_memory.invoke(
+        {"messages": [HumanMessage(content=user_input1)]}, config=config
+    )
+    print("Answer 1: ", content_to_text(response["messages"][-1].content))
+
+    # second input
+    user_input2 = "Multiply that by 5"
+    response = agent_with_memory.invoke(
+        {"messages": [HumanMessage(content=user_input2)]}, config=config
+    )
+    print("Answer 2: ", content_to_text(response["messages"][-1].content))
+
+    # third input
+    user_input3 = "What was the first question?"
+    response = agent_with_memory.invoke(
+        {"messages": [HumanMessage(content=user_input3)]}, config=config
+    )
+    print("Answer 3: ", content_to_text(response["messages"][-1].content))
+
 
-checkpointer = InMemorySaver()
-
-agent_with_memory = create_react_agent(
-    model=llm, tools=[add, multiply], checkpointer=checkpointer
-)
-
-session_id = "test_session"
-config = {"configurable": {"thread_id": session_id}}
-
-
-def content_to_text(content: Any) -> str:
-    """LangChainのmessage.content(str | list[dict])を人間が読める文字列へ正規化する。"""
-    if isinstance(content, str):
-        return content
-    if isinstance(content, list):
-        parts: list[str] = []
-        for p in content:
-            if isinstance(p, dict) and "text" in p and isinstance(p["text"], str):
-                parts.append(p["text"])
-        if parts:
-            return "".join(parts)
-    return str(content)
-
-
-# first input
-user_input1 = "Add 2 and 4"
-response = agent_with_memory.invoke(
-    {"messages": [HumanMessage(content=user_input1)]}, config=config
-)
-print("Answer 1: ", content_to_text(response["messages"][-1].content))
-
-# second input
-user_input2 = "Multiply that by 5"
-response = agent_with_memory.invoke(
-    {"messages": [HumanMessage(content=user_input2)]}, config=config
-)
-print("Answer 2: ", content_to_text(response["messages"][-1].content))
-
-# third input
-user_input3 = "What was the first question?"
-response = agent_with_memory.invoke(
-    {"messages": [HumanMessage(content=user_input3)]}, config=config
-)
-print("Answer 3: ", content_to_text(response["messages"][-1].content))
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""リポジトリ直下の共通モジュール（prompt_cache・tool_compaction・tracing など）を読み込めるようにする
+
+lang-graph のモジュールは、共通モジュールを import する前に `import repo_root` する。
+lang-graph/main.py が直下の main.py より優先されるよう、sys.path の末尾に追加する。
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = str(Path(__file__).resolve().parents[1])
+
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
@@ -0,0 +1,217 @@
+"""SNS へのメッセージ送信をまとめて行うパブリッシャー
+
+send_aws_sns ツールは呼び出しのたびに boto3.client("sns") を作り直し（認証情報の解決と
+新しい接続が毎回発生する）、1件ずつ Publish していた。SNSPublisher は次のように送る。
+ - クライアントはプロセス内で1つだけ作り、使い回す
+ - メッセージはバッファに貯め、PublishBatch（最大10件）でまとめて送る
+   送信していない間に届いたメッセージはすぐに送り、送信中に届いたものだけが次のバッチにまとまる
+   （max_delay > 0 の場合は、最初の1件から max_delay 秒まで待ってまとめる。SNS_BATCH_MAX_DELAY で指定）
+   送信するのは「10件たまった」「合計サイズが上限に達した」「最初の1件から max_delay 秒たった」のいずれか
+ - publish() は Future を返し、エントリごとの成功（MessageId）・失敗を呼び出し元に返す
+ - プロセス終了時（atexit）に残っているメッセージを同期的に送信する
+"""
+
+import atexit
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import boto3
+
+# PublishBatch の上限（エントリ数・リクエスト全体のサイズ）
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_BYTES = 256 * 1024
+DEFAULT_MAX_DELAY = 0.0
+
+
+class PublishError(RuntimeError):
+    """PublishBatch でエントリの送信に失敗した"""
+
+    def __init__(self, code: str, message: str, sender_fault: bool):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.sender_fault = sender_fault
+
+
+class SNSPublisher:
+    """メッセージをバッファしてPublishBatchで送信する
+
+    Args:
+        topic_arn: 送信先の SNS トピックの ARN
+        client: boto3 の SNS クライアント（省略時は shared_client() を使う）
+        max_batch: 1回の PublishBatch で送るエントリ数（最大10）
+        max_delay: 最初のメッセージを受け取ってから送信するまでの最大の待ち時間（秒）。
+            0 の場合は待たずに送信する（1件だけの呼び出しを遅らせない）
+    """
+
+    def __init__(
+        self,
+        topic_arn: str,
+        client=None,
+        max_batch: int = MAX_BATCH_ENTRIES,
+        max_delay: float = DEFAULT_MAX_DELAY,
+    ):
+        self.topic_arn = topic_arn
+        self.client = client or shared_client()
+        self.max_batch = min(max(1, max_batch), MAX_BATCH_ENTRIES)
+        self.max_delay = max_delay
+        self.fifo = topic_arn.endswith(".fifo")
+
+        self._buffer: list[tuple[str, Future]] = []
+        self._buffer_bytes = 0
+        self._oldest: float | None = None
+        # 送信を待っているバッチ（10件たまった・サイズが上限に達したもの）
+        self._ready: list[list[tuple[str, Future]]] = []
+        self._condition = threading.Condition()
+        # 送信（PublishBatch の呼び出し）は1つずつ行う
+        self._send_lock = threading.Lock()
+        self._closed = False
+        self.stats = {"messages": 0, "batches": 0, "failed": 0}
+
+        self._thread = threading.Thread(
+            target=self._run, name="sns-publisher", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def publish(self, message: str) -> Future:
+        """メッセージをバッファに追加する（Future の結果は MessageId、失敗時は PublishError）"""
+        future: Future = Future()
+        size = len(message.encode("utf-8"))
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("SNSPublisher は終了しています")
+            # 追加すると合計サイズが上限を超える場合は、先に今のバッファを送信待ちにする
+            if self._buffer and self._buffer_bytes + size > MAX_BATCH_BYTES:
+                self._ready.append(self._take_locked())
+            self._buffer.append((message, future))
+            self._buffer_bytes += size
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if len(self._buffer) >= self.max_batch:
+                self._ready.append(self._take_locked())
+            self._condition.notify()
+        return future
+
+    def flush(self):
+        """バッファに残っているメッセージをすべて送信し、結果が出るまで待つ"""
+        with self._condition:
+            batches = self._ready
+            self._ready = []
+            if self._buffer:
+                batches.append(self._take_locked())
+        for batch in batches:
+            self._send(batch)
+        # バックグラウンドのスレッドが送信中のバッチも待つ
+        with self._send_lock:
+            pass
+
+    def close(self):
+        """残っているメッセージを送信して、バックグラウンドのスレッドを止める"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    # ---
+    # 送信
+    # ---
+    def _take_locked(self) -> list[tuple[str, Future]]:
+        batch = self._buffer
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._oldest = None
+        return batch
+
+    def _expired_locked(self) -> bool:
+        return (
+            self._oldest is not None
+            and time.monotonic() - self._oldest >= self.max_delay
+        )
+
+    def _run(self):
+        """送信待ちのバッチと、最初のメッセージから max_delay 秒たったバッファを送信する"""
+        while True:
+            with self._condition:
+                while not (self._closed or self._ready or self._expired_locked()):
+                    timeout = (
+                        None
+                        if self._oldest is None
+                        else self.max_delay - (time.monotonic() - self._oldest)
+                    )
+                    self._condition.wait(timeout)
+                batches = self._ready
+                self._ready = []
+                if self._expired_locked():
+                    batches.append(self._take_locked())
+                if not batches and self._closed:
+                    return
+            for batch in batches:
+                self._send(batch)
+
+    def _send(self, batch: list[tuple[str, Future]]):
+        with self._send_lock:
+            entries = []
+            for i, (message, _) in enumerate(batch):
+                entry = {"Id": str(i), "Message": message}
+                if self.fifo:
+                    entry["MessageGroupId"] = "default"
+                    entry["MessageDeduplicationId"] = hashlib.sha256(
+                        message.encode("utf-8")
+                    ).hexdigest()
+                entries.append(entry)
+
+            try:
+                response = self.client.publish_batch(
+                    TopicArn=self.topic_arn, PublishBatchRequestEntries=entries
+                )
+            except Exception as e:
+                # リクエスト自体が失敗した場合は、バッチのすべてのエントリを失敗にする
+                self.stats["failed"] += len(batch)
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+
+            self.stats["batches"] += 1
+            self.stats["messages"] += len(response.get("Successful", []))
+            self.stats["failed"] += len(response.get("Failed", []))
+            for result in response.get("Successful", []):
+                batch[int(result["Id"])][1].set_result(result["MessageId"])
+            for result in response.get("Failed", []):
+                batch[int(result["Id"])][1].set_exception(
+                    PublishError(
+                        result.get("Code", ""),
+                        result.get("Message", ""),
+                        result.get("SenderFault", False),
+                    )
+                )
+
+
+_client = None
+_publishers: dict[str, SNSPublisher] = {}
+_lock = threading.RLock()
+
+
+def shared_client():
+    """プロセス内で共有する SNS クライアント（最初の呼び出し時に作る）"""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = boto3.client("sns")
+        return _client
+
+
+def get_publisher(topic_arn: str) -> SNSPublisher:
+    """トピックごとに1つの SNSPublisher を返す"""
+    with _lock:
+        if topic_arn not in _publishers:
+            _publishers[topic_arn] = SNSPublisher(
+                topic_arn,
+                max_delay=float(os.getenv("SNS_BATCH_MAX_DELAY", DEFAULT_MAX_DELAY)),
+            )
+        return _publishers[topic_arn]
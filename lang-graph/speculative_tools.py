@@ -0,0 +1,118 @@
+"""承認を待っている間に、副作用のないツールを先に実行しておく（投機的実行）
+
+Human-in-the-Loop のエージェントでは、ユーザーが承認してからツール（Web 検索など）を実行するため、
+ユーザーは自分のクリックを待ったあとに、さらに検索の完了を待つことになる。
+SpeculativeExecutor は、ツール呼び出しが提案された時点で read_only のツールだけをバックグラウンドの
+スレッドで実行し始め、結果を (thread_id, tool_call_id) ごとの保留テーブルに置いておく。
+ - 承認されたら take() で結果（実行中なら完了を待つ Future）を受け取る
+ - 拒否されたら discard() で捨てる（まだ始まっていなければ実行もしない）
+ - 承認も拒否もされないまま ttl 秒が過ぎたものは、次に start() したときに捨てる
+read_only の印がないツール（write_file や SNS への送信など）は start() しても実行しない。
+承認の時点ですでに進んでいた実行時間（隠せた待ち時間）を、承認ごとに表示して集計する。
+SPECULATIVE_TOOLS=1 の場合に speculative_executor() が SpeculativeExecutor を返す（終了時に集計を表示）。
+"""
+
+import atexit
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+
+from tool_cache import is_read_only
+
+DEFAULT_TTL = 10 * 60
+DEFAULT_MAX_WORKERS = 4
+
+
+class _Pending:
+    def __init__(self, tool_name: str, future: Future):
+        self.tool_name = tool_name
+        self.future = future
+        self.started_at = time.perf_counter()
+        self.finished_at: float | None = None
+        future.add_done_callback(self._finished)
+
+    def _finished(self, future: Future):
+        self.finished_at = time.perf_counter()
+
+
+class SpeculativeExecutor:
+    """read_only のツールを承認の前に実行し、結果を保留しておく（スレッドセーフ）"""
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="speculative-tool"
+        )
+        self._pending: dict[Hashable, _Pending] = {}
+        self._lock = threading.Lock()
+        self.stats = {"started": 0, "used": 0, "discarded": 0, "expired": 0}
+        self.hidden_ms: list[float] = []
+
+    def _expire_locked(self):
+        now = time.perf_counter()
+        for key in [k for k, p in self._pending.items() if now - p.started_at > self.ttl]:
+            self._pending.pop(key).future.cancel()
+            self.stats["expired"] += 1
+
+    def start(self, key: Hashable, tool, run: Callable[[], Any]) -> bool:
+        """tool が read_only なら run() をバックグラウンドで実行し始める（始めたら True）"""
+        if not is_read_only(tool):
+            return False
+        with self._lock:
+            self._expire_locked()
+            if key in self._pending:
+                return False
+            self._pending[key] = _Pending(tool.name, self._executor.submit(run))
+            self.stats["started"] += 1
+        return True
+
+    def take(self, key: Hashable) -> Future | None:
+        """承認されたツール呼び出しの実行結果の Future（先に実行していなければ None）"""
+        with self._lock:
+            pending = self._pending.pop(key, None)
+            if pending is None:
+                return None
+            self.stats["used"] += 1
+            # 承認の時点ですでに終わっていれば実行時間のすべて、実行中ならそこまでの時間を隠せた
+            now = time.perf_counter()
+            hidden_ms = ((pending.finished_at or now) - pending.started_at) * 1000
+            self.hidden_ms.append(hidden_ms)
+        print(f"[speculative] {pending.tool_name} hidden={hidden_ms:.0f}ms")
+        return pending.future
+
+    def discard(self, key: Hashable):
+        """拒否されたツール呼び出しの実行を取り消し、結果を捨てる"""
+        with self._lock:
+            pending = self._pending.pop(key, None)
+            if pending is None:
+                return
+            pending.future.cancel()
+            self.stats["discarded"] += 1
+
+    def summary(self) -> str:
+        with self._lock:
+            hidden = list(self.hidden_ms)
+            stats = dict(self.stats)
+            pending = len(self._pending)
+        average = sum(hidden) / len(hidden) if hidden else 0.0
+        return (
+            f"speculative tools: started={stats['started']} used={stats['used']} "
+            f"discarded={stats['discarded']} expired={stats['expired']} pending={pending} "
+            f"hidden_total={sum(hidden):.0f}ms hidden_avg={average:.0f}ms"
+        )
+
+
+def speculative_executor() -> SpeculativeExecutor | None:
+    """SPECULATIVE_TOOLS=1 なら SpeculativeExecutor、そうでなければ None を返す"""
+    if os.getenv("SPECULATIVE_TOOLS") != "1":
+        return None
+    executor = SpeculativeExecutor(
+        max_workers=int(os.getenv("SPECULATIVE_TOOLS_MAX_WORKERS", DEFAULT_MAX_WORKERS)),
+        ttl=float(os.getenv("SPECULATIVE_TOOLS_TTL", DEFAULT_TTL)),
+    )
+    atexit.register(
+        lambda: executor.stats["started"] and print(f"[speculative]\n{executor.summary()}")
+    )
+    return executor
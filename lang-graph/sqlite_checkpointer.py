@@ -0,0 +1,749 @@
+"""SQLite に保存するチェックポインター（メッセージ履歴を差分で保存する）
+
+MemorySaver / InMemorySaver はプロセスを再起動すると会話が消え、
+さらにステップごとにメッセージのリスト全体をもう一度保存するため、会話が長くなるほど
+1チェックポイントあたりのサイズが増え続ける。
+
+SqliteDeltaSaver は次のように保存する。
+ - 変更のあったチャネルだけを（チャネル, バージョン）ごとに保存する
+ - メッセージのリストは「メッセージのハッシュのリスト」として保存し、
+   前のバージョンからの差分（増えた分のハッシュ）だけを書く。
+   snapshot_every ステップごとに全体（スナップショット）を書き、
+   読み込み時は直近のスナップショットから差分を順に適用して復元する
+ - メッセージ本体はハッシュをキーにした表に1回だけ保存する（同じ内容は重複しない）
+ - WAL モードで開くため、書き込み中でも他のプロセス・スレッドから読み込める
+
+古いチェックポイントは compact() か次のコマンドで削除できる。
+    python lang-graph/sqlite_checkpointer.py compact checkpoints.db --keep-last 5
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+from collections.abc import AsyncIterator, Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+
+from message_log import MessageLog
+
+DEFAULT_SNAPSHOT_EVERY = 20
+# 差分の基準として覚えておくチャネル数の上限（古いものから忘れ、次回はスナップショットを書く）
+MAX_TIPS = 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+-- kind: empty / value（serde でそのまま保存）/ snapshot（ハッシュのリスト全体）/ delta（差分）
+CREATE TABLE IF NOT EXISTS channel_values (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    type TEXT,
+    blob BLOB,
+    base_version TEXT,
+    depth INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    hash TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    blob BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    type TEXT,
+    blob BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+class _Tip:
+    """チャネルごとに最後に書いたメッセージのリスト（次の差分の基準）"""
+
+    __slots__ = ("version", "messages", "hashes", "depth")
+
+    def __init__(self, version: str, messages: list, hashes: list[str], depth: int):
+        self.version = version
+        self.messages = messages
+        self.hashes = hashes
+        self.depth = depth
+
+
+class SqliteDeltaSaver(BaseCheckpointSaver[str]):
+    """メッセージ履歴を差分で保存する SQLite のチェックポインター
+
+    Args:
+        path: データベースファイルのパス
+        snapshot_every: この回数ごとに差分ではなく全体を保存する
+            （大きいほど書き込みは小さく、再開時の差分の適用は多くなる）
+    """
+
+    def __init__(
+        self,
+        path: str,
+        snapshot_every: int = DEFAULT_SNAPSHOT_EVERY,
+        *,
+        serde=None,
+    ):
+        super().__init__(serde=serde)
+        self.path = path
+        self.snapshot_every = max(1, snapshot_every)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._tips: dict[tuple[str, str, str], _Tip] = {}
+
+        self._conn().executescript(_SCHEMA)
+
+    # ---
+    # 接続
+    # ---
+    def _conn(self) -> sqlite3.Connection:
+        """スレッドごとの接続を返す（sqlite3 の接続はスレッド間で共有しない）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _write(self):
+        """書き込みは1つずつ、1つのトランザクションで行う"""
+        conn = self._conn()
+        with self._lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def __enter__(self) -> "SqliteDeltaSaver":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # ---
+    # 値の保存形式
+    # ---
+    @staticmethod
+    def _is_message_list(value: Any) -> bool:
+        return (
+            isinstance(value, (list, tuple, MessageLog))
+            and len(value) > 0
+            and all(isinstance(m, BaseMessage) for m in value)
+        )
+
+    def _store_message(self, conn: sqlite3.Connection, message: BaseMessage) -> str:
+        type_, blob = self.serde.dumps_typed(message)
+        digest = hashlib.blake2b(type_.encode() + b"\0" + blob, digest_size=16)
+        message_hash = digest.hexdigest()
+        conn.execute(
+            "INSERT OR IGNORE INTO messages (hash, type, blob) VALUES (?, ?, ?)",
+            (message_hash, type_, blob),
+        )
+        return message_hash
+
+    def _encode_value(self, conn: sqlite3.Connection, value: Any) -> tuple:
+        """writes の値を (kind, type, blob) にする（メッセージは本体を別の表へ）"""
+        if isinstance(value, BaseMessage):
+            return "message", None, self._store_message(conn, value)
+        if self._is_message_list(value):
+            hashes = [self._store_message(conn, m) for m in value]
+            return "messages", _container(value), json.dumps(hashes)
+        return ("value", *self.serde.dumps_typed(value))
+
+    def _encode_channel(
+        self,
+        conn: sqlite3.Connection,
+        thread_id: str,
+        checkpoint_ns: str,
+        channel: str,
+        version: str,
+        value: Any,
+    ) -> tuple:
+        """チャネルの値を (kind, type, blob, base_version, depth) にする"""
+        key = (thread_id, checkpoint_ns, channel)
+        if not self._is_message_list(value):
+            self._tips.pop(key, None)
+            return ("value", *self.serde.dumps_typed(value), None, 0)
+
+        messages = list(value)
+        tip = self._tips.pop(key, None)
+        if len(self._tips) >= MAX_TIPS:
+            del self._tips[next(iter(self._tips))]
+        # 前回書いたリストの先頭がそのまま残っていれば（同じオブジェクトなら）、
+        # 増えた分だけハッシュを計算して差分として保存する
+        if (
+            tip is not None
+            and tip.depth + 1 < self.snapshot_every
+            and len(messages) >= len(tip.messages)
+            and all(a is b for a, b in zip(messages, tip.messages))
+        ):
+            added = [self._store_message(conn, m) for m in messages[len(tip.messages) :]]
+            hashes = tip.hashes + added
+            self._tips[key] = _Tip(version, messages, hashes, tip.depth + 1)
+            delta = {"prefix": len(tip.hashes), "hashes": added}
+            return "delta", _container(value), json.dumps(delta), tip.version, tip.depth + 1
+
+        hashes = [self._store_message(conn, m) for m in messages]
+        self._tips[key] = _Tip(version, messages, hashes, 0)
+        return "snapshot", _container(value), json.dumps(hashes), None, 0
+
+    def _load_messages(self, conn: sqlite3.Connection, hashes: list[str]) -> list:
+        blobs: dict[str, tuple[str, bytes]] = {}
+        unique = list(dict.fromkeys(hashes))
+        # SQLite のプレースホルダ数の上限を超えないよう分けて読む
+        for i in range(0, len(unique), 500):
+            chunk = unique[i : i + 500]
+            rows = conn.execute(
+                f"SELECT hash, type, blob FROM messages WHERE hash IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            for message_hash, type_, blob in rows:
+                blobs[message_hash] = (type_, blob)
+        return [self.serde.loads_typed(blobs[h]) for h in hashes]
+
+    def _resolve_hashes(
+        self,
+        conn: sqlite3.Connection,
+        thread_id: str,
+        checkpoint_ns: str,
+        channel: str,
+        kind: str,
+        blob: Any,
+        base_version: str | None,
+    ) -> list[str]:
+        """差分をさかのぼり、直近のスナップショットから順に適用してハッシュのリストを作る"""
+        deltas = []
+        while kind == "delta":
+            deltas.append(json.loads(blob))
+            row = conn.execute(
+                "SELECT kind, blob, base_version FROM channel_values "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, base_version),
+            ).fetchone()
+            if row is None:
+                raise RuntimeError(
+                    f"差分の基準が見つかりません: {thread_id} {channel} {base_version}"
+                )
+            kind, blob, base_version = row
+        hashes = json.loads(blob)
+        for delta in reversed(deltas):
+            hashes = hashes[: delta["prefix"]] + delta["hashes"]
+        return hashes
+
+    def _load_channel_values(
+        self,
+        conn: sqlite3.Connection,
+        thread_id: str,
+        checkpoint_ns: str,
+        versions: ChannelVersions,
+        remember: bool = False,
+    ) -> dict[str, Any]:
+        values: dict[str, Any] = {}
+        for channel, version in versions.items():
+            row = conn.execute(
+                "SELECT kind, type, blob, base_version, depth FROM channel_values "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row is None or row[0] == "empty":
+                continue
+            kind, type_, blob, base_version, depth = row
+            if kind == "value":
+                values[channel] = self.serde.loads_typed((type_, blob))
+                continue
+            hashes = self._resolve_hashes(
+                conn, thread_id, checkpoint_ns, channel, kind, blob, base_version
+            )
+            messages = self._load_messages(conn, hashes)
+            values[channel] = _restore(type_, messages)
+            if remember:
+                # 再開後の次の書き込みも差分で済むよう、読み込んだリストを差分の基準にする
+                key = (thread_id, checkpoint_ns, channel)
+                self._tips[key] = _Tip(str(version), list(messages), hashes, depth)
+        return values
+
+    def _decode_write(self, conn: sqlite3.Connection, kind: str, type_: str, blob: Any):
+        if kind == "message":
+            return self._load_messages(conn, [blob])[0]
+        if kind == "messages":
+            return _restore(type_, self._load_messages(conn, json.loads(blob)))
+        return self.serde.loads_typed((type_, blob))
+
+    # ---
+    # 読み込み
+    # ---
+    def _build_tuple(
+        self, conn: sqlite3.Connection, row: tuple, remember: bool = False
+    ) -> CheckpointTuple:
+        (
+            thread_id,
+            checkpoint_ns,
+            checkpoint_id,
+            parent_checkpoint_id,
+            type_,
+            checkpoint_blob,
+            metadata_type,
+            metadata_blob,
+        ) = row
+        checkpoint = self.serde.loads_typed((type_, checkpoint_blob))
+        checkpoint["channel_values"] = self._load_channel_values(
+            conn, thread_id, checkpoint_ns, checkpoint["channel_versions"], remember
+        )
+        writes = conn.execute(
+            "SELECT task_id, idx, channel, kind, type, blob, task_path FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        writes.sort(key=lambda w: writes_sort_key(w[6], w[0], w[1]))
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=checkpoint,
+            metadata=self.serde.loads_typed((metadata_type, metadata_blob)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self._decode_write(conn, kind, w_type, blob))
+                for task_id, _, channel, kind, w_type, blob, _ in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        conn = self._conn()
+        # 読み込みの途中で書き込まれても一貫した状態を読むよう、読み込みトランザクションにする
+        conn.execute("BEGIN")
+        try:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = conn.execute(
+                    "SELECT * FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._build_tuple(conn, row, remember=True)
+        finally:
+            conn.execute("COMMIT")
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        conditions, params = [], []
+        if config:
+            conditions.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                conditions.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                conditions.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            conditions.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        conn = self._conn()
+        rows = conn.execute(
+            f"SELECT * FROM checkpoints {where} ORDER BY checkpoint_id DESC", params
+        ).fetchall()
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self.serde.loads_typed((row[6], row[7]))
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            yield self._build_tuple(conn, row)
+
+    # ---
+    # 書き込み
+    # ---
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values: dict[str, Any] = c.pop("channel_values")
+        type_, checkpoint_blob = self.serde.dumps_typed(c)
+        metadata_type, metadata_blob = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+
+        with self._write() as conn:
+            for channel, version in new_versions.items():
+                if channel in values:
+                    encoded = self._encode_channel(
+                        conn, thread_id, checkpoint_ns, channel, str(version), values[channel]
+                    )
+                else:
+                    encoded = ("empty", None, None, None, 0)
+                conn.execute(
+                    "INSERT OR REPLACE INTO channel_values VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, channel, str(version), *encoded),
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    checkpoint_blob,
+                    metadata_type,
+                    metadata_blob,
+                ),
+            )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._write() as conn:
+            for idx, (channel, value) in enumerate(writes):
+                write_idx = WRITES_IDX_MAP.get(channel, idx)
+                # 通常の書き込みは最初の1回だけ、特殊な書き込み（エラー・割り込みなど）は上書きする
+                verb = "INSERT OR REPLACE" if write_idx < 0 else "INSERT OR IGNORE"
+                conn.execute(
+                    f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint_id,
+                        task_id,
+                        write_idx,
+                        channel,
+                        *self._encode_value(conn, value),
+                        task_path,
+                    ),
+                )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._write() as conn:
+            for table in ("checkpoints", "channel_values", "writes"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+        for key in [k for k in self._tips if k[0] == thread_id]:
+            del self._tips[key]
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # ---
+    # 非同期版（sqlite3 は同期APIのため、スレッドで実行する）
+    # ---
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    # ---
+    # 圧縮
+    # ---
+    def compact(self, keep_last: int = 1, thread_id: str | None = None) -> dict:
+        """スレッドごとに最新の keep_last 件だけを残し、不要になった行とメッセージを削除する
+
+        残すチェックポインが参照する差分はスナップショットに書き換えてから、
+        古いチェックポイント・書き込み・チャネルの値を削除する。
+        最後にどこからも参照されていないメッセージ本体を削除し、ファイルを VACUUM する。
+        """
+        keep_last = max(1, keep_last)
+        size_before = self._database_size()
+        stats = {"checkpoints": 0, "channel_values": 0, "messages": 0}
+
+        with self._write() as conn:
+            if thread_id is None:
+                namespaces = conn.execute(
+                    "SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints"
+                ).fetchall()
+            else:
+                namespaces = conn.execute(
+                    "SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints WHERE thread_id = ?",
+                    (thread_id,),
+                ).fetchall()
+
+            for thread, ns in namespaces:
+                stats_ns = self._compact_namespace(conn, thread, ns, keep_last)
+                for key, count in stats_ns.items():
+                    stats[key] += count
+
+            stats["messages"] = self._collect_messages(conn)
+
+        self._tips.clear()
+        conn = self._conn()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        stats["bytes_before"] = size_before
+        stats["bytes_after"] = self._database_size()
+        return stats
+
+    def _compact_namespace(
+        self, conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str, keep_last: int
+    ) -> dict:
+        rows = conn.execute(
+            "SELECT checkpoint_id, type, checkpoint FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC",
+            (thread_id, checkpoint_ns),
+        ).fetchall()
+        keep, drop = rows[:keep_last], rows[keep_last:]
+
+        referenced = set()
+        for _, type_, blob in keep:
+            checkpoint = self.serde.loads_typed((type_, blob))
+            referenced.update(
+                (channel, str(version))
+                for channel, version in checkpoint["channel_versions"].items()
+            )
+
+        # 先にすべての差分を解決してから書き換える（基準の行を書き換える前に読むため）
+        snapshots = []
+        for channel, version in referenced:
+            row = conn.execute(
+                "SELECT kind, blob, base_version FROM channel_values "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, version),
+            ).fetchone()
+            if row is not None and row[0] == "delta":
+                hashes = self._resolve_hashes(
+                    conn, thread_id, checkpoint_ns, channel, *row
+                )
+                snapshots.append((json.dumps(hashes), channel, version))
+        conn.executemany(
+            "UPDATE channel_values SET kind = 'snapshot', blob = ?, base_version = NULL, depth = 0 "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+            [(blob, thread_id, checkpoint_ns, channel, version) for blob, channel, version in snapshots],
+        )
+
+        for checkpoint_id, _, _ in drop:
+            for table in ("checkpoints", "writes"):
+                conn.execute(
+                    f"DELETE FROM {table} "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                )
+
+        unreferenced = [
+            (channel, version)
+            for channel, version in conn.execute(
+                "SELECT channel, version FROM channel_values "
+                "WHERE thread_id = ? AND checkpoint_ns = ?",
+                (thread_id, checkpoint_ns),
+            ).fetchall()
+            if (channel, version) not in referenced
+        ]
+        conn.executemany(
+            "DELETE FROM channel_values "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+            [(thread_id, checkpoint_ns, channel, version) for channel, version in unreferenced],
+        )
+        return {"checkpoints": len(drop), "channel_values": len(unreferenced)}
+
+    def _collect_messages(self, conn: sqlite3.Connection) -> int:
+        """どのチャネルの値・書き込みからも参照されていないメッセージ本体を削除する"""
+        referenced: set[str] = set()
+        for kind, blob in conn.execute(
+            "SELECT kind, blob FROM channel_values WHERE kind IN ('snapshot', 'delta')"
+        ):
+            data = json.loads(blob)
+            referenced.update(data["hashes"] if kind == "delta" else data)
+        for kind, blob in conn.execute(
+            "SELECT kind, blob FROM writes WHERE kind IN ('message', 'messages')"
+        ):
+            referenced.update([blob] if kind == "message" else json.loads(blob))
+
+        unreferenced = [
+            (h,)
+            for (h,) in conn.execute("SELECT hash FROM messages").fetchall()
+            if h not in referenced
+        ]
+        conn.executemany("DELETE FROM messages WHERE hash = ?", unreferenced)
+        return len(unreferenced)
+
+    def _database_size(self) -> int:
+        return sum(
+            os.path.getsize(self.path + suffix)
+            for suffix in ("", "-wal")
+            if os.path.exists(self.path + suffix)
+        )
+
+
+def _container(value: Any) -> str:
+    return "MessageLog" if isinstance(value, MessageLog) else "list"
+
+
+def _restore(container: str, messages: list) -> Any:
+    return MessageLog(messages) if container == "MessageLog" else messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite チェックポインターの管理")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compact_parser = subparsers.add_parser(
+        "compact", help="古いチェックポイントと参照されていないメッセージを削除する"
+    )
+    compact_parser.add_argument("path", help="データベースファイルのパス")
+    compact_parser.add_argument(
+        "--keep-last", type=int, default=1, help="スレッドごとに残すチェックポイント数"
+    )
+    compact_parser.add_argument("--thread-id", help="対象のスレッド（省略時はすべて）")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        with SqliteDeltaSaver(args.path) as saver:
+            stats = saver.compact(keep_last=args.keep_last, thread_id=args.thread_id)
+        print(
+            f"削除: チェックポイント {stats['checkpoints']} 件 / "
+            f"チャネルの値 {stats['channel_values']} 件 / メッセージ {stats['messages']} 件"
+        )
+        print(f"サイズ: {stats['bytes_before']:,} bytes -> {stats['bytes_after']:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
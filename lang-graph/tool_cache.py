@@ -0,0 +1,254 @@
+"""ツールの実行結果のキャッシュ（TTL / バイト数の上限つき LRU / ディスク保存）
+
+同じ調査を何度も依頼されると、同じ Web 検索が毎回ネットワークに出ていく。
+ToolResultCache は「ツール名 + 正規化した引数」をキーに結果を保存し、期限内なら再利用する。
+
+ - キャッシュするのは read_only() で印を付けたツールだけ（write_file などの副作用があるツールは
+   印を付けないので、常に実行される）。有効期限（TTL）はツールごとに指定する
+ - 引数は Unicode 正規化・前後の空白の除去・連続する空白の圧縮・大文字小文字の統一をしてからキーにする
+ - メモリ上のキャッシュは合計サイズ（バイト）が max_bytes を超えたら古く使われたものから捨てる
+ - path を指定すると SQLite にも保存し、プロセスを再起動しても使える
+ - 関数のように呼ぶ invoke() と、ToolNode の wrap_tool_call / awrap_tool_call の両方で使える
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any
+
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_TTL = 60 * 60
+
+
+def read_only(tool: BaseTool, ttl: float = DEFAULT_TTL) -> BaseTool:
+    """副作用のない（同じ引数なら同じ結果を返してよい）ツールとして印を付ける"""
+    tool.metadata = {**(tool.metadata or {}), "read_only": True, "cache_ttl": ttl}
+    return tool
+
+
+def is_read_only(tool: BaseTool | None) -> bool:
+    return bool(tool is not None and (tool.metadata or {}).get("read_only"))
+
+
+def normalize_args(value: Any) -> Any:
+    """表記ゆれ（全角・半角、空白、大文字小文字）を吸収した引数を返す"""
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", value)).strip().casefold()
+    if isinstance(value, dict):
+        return {k: normalize_args(v) for k, v in sorted(value.items()) if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [normalize_args(v) for v in value]
+    return value
+
+
+def cache_key(tool_name: str, args: Any, kind: str = "result") -> str:
+    payload = json.dumps(
+        {"tool": tool_name, "kind": kind, "args": normalize_args(args)},
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ToolResultCache:
+    """ツールの実行結果のキャッシュ
+
+    Args:
+        max_bytes: メモリ上に保存する結果の合計サイズの上限
+        path: 結果を保存する SQLite ファイル（省略時はメモリのみ）
+        ttls: ツール名ごとの有効期限（秒）。read_only() で指定した値より優先する
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        path: str | None = None,
+        ttls: dict[str, float] | None = None,
+    ):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.ttls = ttls or {}
+
+        # key -> (tool_name, expires_at, value, size)
+        self._entries: OrderedDict[str, tuple[str, float, Any, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "disk_hits": 0, "evictions": 0}
+        self.tool_stats: dict[str, dict[str, int]] = {}
+
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tool_results ("
+                "key TEXT PRIMARY KEY, tool TEXT NOT NULL, expires_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+
+    def ttl_for(self, tool: BaseTool) -> float:
+        return self.ttls.get(tool.name, (tool.metadata or {}).get("cache_ttl", DEFAULT_TTL))
+
+    # ---
+    # 読み書き
+    # ---
+    def get(self, tool_name: str, args: Any, kind: str = "result") -> tuple[bool, Any]:
+        """(見つかったか, 値) を返す
+
+        kind は保存する値の種類（"result": ツールの戻り値, "message": ToolMessage の content）。
+        """
+        key = cache_key(tool_name, args, kind)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self._count(tool_name, "hits")
+                return True, entry[2]
+            if entry is not None:
+                self._remove_locked(key)
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT expires_at, value FROM tool_results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[0] > now:
+                    value = json.loads(row[1])
+                    self._store_locked(key, tool_name, row[0], value, len(row[1].encode("utf-8")))
+                    self.stats["disk_hits"] += 1
+                    self._count(tool_name, "hits")
+                    return True, value
+
+            self._count(tool_name, "misses")
+            return False, None
+
+    def put(self, tool_name: str, args: Any, value: Any, ttl: float, kind: str = "result"):
+        key = cache_key(tool_name, args, kind)
+        try:
+            serialized = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError):
+            # JSON にできない結果はサイズの見積もりだけ行い、ディスクには保存しない
+            serialized = None
+        size = len((serialized or repr(value)).encode("utf-8"))
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._store_locked(key, tool_name, expires_at, value, size)
+            if self._db is not None and serialized is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO tool_results VALUES (?, ?, ?, ?)",
+                    (key, tool_name, expires_at, serialized),
+                )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM tool_results")
+
+    def _store_locked(self, key: str, tool_name: str, expires_at: float, value: Any, size: int):
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove_locked(key)
+        self._entries[key] = (tool_name, expires_at, value, size)
+        self._bytes += size
+        # 古く使われたものから捨てる（ディスクには残る）
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove_locked(oldest)
+            self.stats["evictions"] += 1
+
+    def _remove_locked(self, key: str):
+        _, _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _count(self, tool_name: str, name: str):
+        self.stats[name] += 1
+        counters = self.tool_stats.setdefault(tool_name, {"hits": 0, "misses": 0})
+        counters[name] += 1
+
+    # ---
+    # ツールの呼び出し
+    # ---
+    def invoke(self, tool: BaseTool, args: dict) -> Any:
+        """tool.invoke(args) の結果を返す（read_only のツールはキャッシュを使う）"""
+        if not is_read_only(tool):
+            return tool.invoke(args)
+        found, value = self.get(tool.name, args)
+        if found:
+            return value
+        value = tool.invoke(args)
+        self.put(tool.name, args, value, self.ttl_for(tool))
+        return value
+
+    async def ainvoke(self, tool: BaseTool, args: dict) -> Any:
+        if not is_read_only(tool):
+            return await tool.ainvoke(args)
+        found, value = await asyncio.to_thread(self.get, tool.name, args)
+        if found:
+            return value
+        value = await tool.ainvoke(args)
+        await asyncio.to_thread(self.put, tool.name, args, value, self.ttl_for(tool))
+        return value
+
+    def _cached_message(self, request) -> ToolMessage | None:
+        if not is_read_only(request.tool):
+            return None
+        call = request.tool_call
+        found, content = self.get(call["name"], call["args"], kind="message")
+        if not found:
+            return None
+        return ToolMessage(content=content, name=call["name"], tool_call_id=call["id"])
+
+    def _store_message(self, request, result):
+        # エラーになった結果や Command（状態の更新）はキャッシュしない
+        if (
+            is_read_only(request.tool)
+            and isinstance(result, ToolMessage)
+            and result.status != "error"
+        ):
+            call = request.tool_call
+            self.put(
+                call["name"],
+                call["args"],
+                result.content,
+                self.ttl_for(request.tool),
+                kind="message",
+            )
+
+    def wrap_tool_call(self, request, execute):
+        """ToolNode(wrap_tool_call=...) に渡すラッパー"""
+        if (cached := self._cached_message(request)) is not None:
+            return cached
+        result = execute(request)
+        self._store_message(request, result)
+        return result
+
+    async def awrap_tool_call(self, request, execute):
+        """ToolNode(awrap_tool_call=...) に渡すラッパー"""
+        if (cached := await asyncio.to_thread(self._cached_message, request)) is not None:
+            return cached
+        result = await execute(request)
+        await asyncio.to_thread(self._store_message, request, result)
+        return result
+
+    def summary(self) -> str:
+        total = self.stats["hits"] + self.stats["misses"]
+        rate = self.stats["hits"] / total if total else 0.0
+        return (
+            f"tool cache: hits={self.stats['hits']} misses={self.stats['misses']} "
+            f"hit_rate={rate:.0%} disk_hits={self.stats['disk_hits']} "
+            f"evictions={self.stats['evictions']} entries={len(self._entries)} bytes={self._bytes:,}"
+        )
@@ -0,0 +1,122 @@
+"""LangGraph / LangChain の実行を tracing.py の span として記録するコールバック
+
+グラフに手を入れずに、実行時の config にコールバックを渡すだけで次の span を記録する。
+ - node: グラフのノード（agent / tools）と Functional API の entrypoint・task（invoke_llm / use_tool）
+ - llm:  チャットモデルの呼び出し（usage_metadata のトークン数つき）
+ - tool: ツールの呼び出し
+親子関係は LangChain の run_id / parent_run_id から、記録している一番近い祖先をたどって付ける。
+"""
+
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.errors import GraphInterrupt
+
+import repo_root  # noqa: F401
+
+from tracing import Tracer, message_usage, payload_bytes, tracer
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    # 別スレッドに回さず、イベントが起きたその場で時刻を記録する
+    run_inline = True
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self._spans = {}
+        # run_id -> 記録している一番近い祖先の span_id（自分を記録していれば自分）
+        self._nearest: dict[UUID, str | None] = {}
+
+    def _start(
+        self, run_id: UUID, parent_run_id: UUID | None, name: str | None, kind: str, **attributes
+    ):
+        parent_id = self._nearest.get(parent_run_id) if parent_run_id else None
+        if name is None:
+            self._nearest[run_id] = parent_id
+            return
+        span = self.tracer.start_span(name, kind, parent_id=parent_id, **attributes)
+        self._spans[run_id] = span
+        self._nearest[run_id] = span.span_id
+
+    def _end(self, run_id: UUID, error: BaseException | None = None, **attributes):
+        self._nearest.pop(run_id, None)
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        span.set(**attributes)
+        if isinstance(error, GraphInterrupt):
+            # 承認待ちの interrupt はエラーではなく、再開時に続きの span が記録される
+            span.status = "interrupted"
+            error = None
+        self.tracer.end_span(span, error=error)
+
+    # ---
+    # ノード・task
+    # ---
+    def on_chain_start(
+        self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs
+    ):
+        # ノードの中で動く Runnable（RunnableSequence など）も同じ langgraph_node を持つので、
+        # 名前がノード名と一致するものだけを記録する
+        name = kwargs.get("name")
+        node = (metadata or {}).get("langgraph_node")
+        traced = name if node is not None and name == node else None
+        attributes = {"input_bytes": payload_bytes(inputs)} if traced else {}
+        self._start(run_id, parent_run_id, traced, "node", **attributes)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        if run_id in self._spans:
+            self._end(run_id, output_bytes=payload_bytes(outputs))
+        else:
+            self._nearest.pop(run_id, None)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    # ---
+    # LLM
+    # ---
+    def on_chat_model_start(
+        self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs
+    ):
+        name = (metadata or {}).get("ls_model_name") or kwargs.get("name") or "chat_model"
+        self._start(run_id, parent_run_id, name, "llm", input_bytes=payload_bytes(messages))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        span = self._spans.get(run_id)
+        if span is not None and response.generations and response.generations[0]:
+            message = getattr(response.generations[0][0], "message", None)
+            span.set_usage(message_usage(message))
+            span.set(output_bytes=payload_bytes(message.content if message else ""))
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    # ---
+    # ツール
+    # ---
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._start(run_id, parent_run_id, name, "tool", input_bytes=payload_bytes(input_str))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id, output_bytes=payload_bytes(getattr(output, "content", output)))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+
+_handler: TracingCallbackHandler | None = None
+
+
+def traced_config(config: dict | None = None) -> dict | None:
+    """tracing が有効なら、config の callbacks にトレース用のコールバックを追加する"""
+    global _handler
+    if not tracer.enabled:
+        return config
+    if _handler is None:
+        _handler = TracingCallbackHandler(tracer)
+    config = dict(config or {})
+    config["callbacks"] = list(config.get("callbacks") or []) + [_handler]
+    return config
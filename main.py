@@ -1,51 +1,42 @@
-import boto3
+import argparse
 import os
 from dotenv import load_dotenv
-from botocore.exceptions import NoCredentialsError
-import json
-from urllib.request import Request, urlopen
-from urllib.error import HTTPError, URLError
+
+from bedrock_client import get_bedrock_client
+from bedrock_stream import converse_blocking, converse_streaming
+from holiday_cache import DEFAULT_CACHE_PATH, HolidayCache
+from prompt_cache import add_cache_points, prompt_cache_enabled
+from tool_compaction import tool_output_compactor
+from tool_loop import DEFAULT_MAX_ITERATIONS, ToolRegistry, run_tool_loop
+from tracing import converse_usage, payload_bytes, tracer
 
 load_dotenv()
 
-# リージョンは env を優先し、未設定なら us-east-1 をデフォルトにする
-region = os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION") or "us-east-1"
-profile = os.getenv("AWS_PROFILE")
-session = (
-    boto3.Session(region_name=region, profile_name=profile)
-    if profile
-    else boto3.Session(region_name=region)
-)
-client = session.client("bedrock-runtime")
+
+def get_client():
+    """プロセス内で共有する bedrock-runtime クライアント（最初の呼び出し時に作る）
+
+    リージョンは AWS_REGION / AWS_DEFAULT_REGION（未設定なら us-east-1）、プロファイルは AWS_PROFILE。
+    adaptive リトライ・接続プール・同時実行数の制限などは bedrock_client.py で設定する。
+    """
+    return get_bedrock_client()
+
+
 modelId = "global.anthropic.claude-opus-4-5-20251101-v1:0"
 
 
-def get_jp_holiday(year: int):
-    # NOTE: `holiday-jp.github.io` ではなく `holidays-jp.github.io` が正しいエンドポイント。
-    # 例: https://holidays-jp.github.io/api/v1/date.json
-    #
+# 祝日データはディスクにキャッシュし、年ごとの索引から引く
+holiday_cache = HolidayCache(
+    cache_path=os.getenv("HOLIDAY_CACHE_PATH") or DEFAULT_CACHE_PATH,
+)
+
+
+def get_jp_holiday(year: int, month: int | None = None):
     # 補足: このAPIは年指定のパラメータが効かず、複数年分が返ることがあるため
-    #      ここで指定年だけにフィルタします。
-    url = "https://holidays-jp.github.io/api/v1/date.json"
-
-    req = Request(url, headers={"User-Agent": "agent_book/1.0 (urllib)"})
-    try:
-        with urlopen(req, timeout=10) as response:
-            data = response.read().decode("utf-8")
-            holidays = json.loads(data)  # {"YYYY-MM-DD": "祝日名", ...}
-            year_prefix = f"{year}-"
-            filtered = {k: v for k, v in holidays.items() if k.startswith(year_prefix)}
-            return filtered
-    except HTTPError as e:
-        raise RuntimeError(
-            f"祝日APIがHTTPエラーを返しました: {e.code} {e.reason}\n"
-            f"URL: {url}\n"
-            "エンドポイントが変更/廃止された可能性があります。"
-        ) from e
-    except URLError as e:
-        raise RuntimeError(
-            f"祝日APIへの接続に失敗しました: {e.reason}\nURL: {url}"
-        ) from e
+    #      キャッシュ側の年索引で指定年（・月）だけを取り出します。
+    if month is not None:
+        return holiday_cache.by_month(year, month)
+    return holiday_cache.by_year(year)
 
 
 tools = [
@@ -58,6 +49,10 @@ tools = [
                     "type": "object",
                     "properties": {
                         "year": {"type": "integer", "description": "年"},
+                        "month": {
+                            "type": "integer",
+                            "description": "月（省略時は年全体）",
+                        },
                     },
                     "required": ["year"],
                 }
@@ -66,104 +61,146 @@ tools = [
     }
 ]
 
-input = "2025年の7月の日本の祝日を教えてください"
 
-# ---
-# 一回目の推論
-# ---
-print("一回目の推論")
-print("ユーザーの入力: ", input)
-
-response = client.converse(
-    modelId=modelId,
-    messages=[{"role": "user", "content": [{"text": input}]}],
-    toolConfig={
-        "tools": tools,
-    },
+def jp_holiday_tool(year: int, month: int | None = None) -> dict:
+    """get_jp_holiday ツールの実装（toolResult に載せる形で返す）"""
+    holidays = get_jp_holiday(year, month)
+    return {
+        "year": year,
+        "month": month,
+        "holidays": holidays,
+        "count": len(holidays),
+    }
+
+
+# TOOL_OUTPUT_COMPACTION=1 の場合、ツールの戻り値を小さくしてから toolResult にする
+compactor = tool_output_compactor()
+
+# toolSpec の name とツールの実装を対応付ける
+registry = ToolRegistry(
+    tools,
+    {"get_jp_holiday": jp_holiday_tool},
+    timeouts={"get_jp_holiday": 15},
+    postprocess=compactor.compact if compactor else None,
 )
 
-message = response["output"]["message"]
-texts = [c["text"] for c in message.get("content", []) if "text" in c]
-if texts:
-    print("AIの回答: ", "\n".join(texts))
-else:
+input = "2025年の7月の日本の祝日を教えてください"
+
+
+def converse(
+    messages: list[dict], stream: bool = False, prompt_cache: bool = False
+) -> dict:
+    """converse / converse_stream を切り替えて呼び出し、計測結果を表示する"""
+    kwargs = {
+        "modelId": modelId,
+        "messages": messages,
+        "toolConfig": registry.tool_config,
+    }
+    if prompt_cache:
+        # ツール定義と直前までの履歴は毎回同じなのでキャッシュさせる
+        kwargs = add_cache_points(kwargs)
+    # TRACE_PATH / TRACE_SUMMARY を指定すると、呼び出しごとの span（トークン数・サイズつき）を記録する
+    with tracer.span("converse", "llm", model=modelId, stream=stream) as span:
+        if stream:
+            # テキストの差分は届いた順にそのまま表示する
+            print("AIの回答: ", end="", flush=True)
+            response, metrics = converse_streaming(
+                get_client(), on_text=lambda text: print(text, end="", flush=True), **kwargs
+            )
+            print()
+        else:
+            response, metrics = converse_blocking(get_client(), **kwargs)
+        if tracer.enabled:
+            span.set_usage(converse_usage(response.get("usage", {})))
+            span.set(
+                input_bytes=payload_bytes(messages),
+                output_bytes=payload_bytes(response["output"]["message"]),
+                ttft_ms=(
+                    round(metrics.time_to_first_token * 1000, 1)
+                    if metrics.time_to_first_token is not None
+                    else None
+                ),
+            )
+    print(metrics.summary())
+    return response
+
+
+def print_answer(message: dict, streamed: bool = False):
+    texts = [c["text"] for c in message.get("content", []) if "text" in c]
+    if texts:
+        # ストリーミング時はテキストを表示済みなので繰り返さない
+        if not streamed:
+            print("AIの回答: ", "\n".join(texts))
+        return
+
     # 例: ツール呼び出し要求のみで、テキストが返らないケース
     tool_uses = [c["toolUse"] for c in message.get("content", []) if "toolUse" in c]
     if tool_uses:
-        tu = tool_uses[0]
-        print(
-            "AIの回答: ",
-            f"(toolUse) name={tu.get('name')} input={tu.get('input')}",
-        )
+        for tu in tool_uses:
+            print(
+                "AIの回答: ",
+                f"(toolUse) name={tu.get('name')} input={tu.get('input')}",
+            )
     else:
         print("AIの回答: (textなし)", message.get("content"))
 
-# Tool Useの要否を判定
-tool_use = None
-for content in message["content"]:
-    if "toolUse" in content:
-        tool_use = content["toolUse"]
-        break
-
-# ---
-# 二回目の推論
-# ---
-print("二回目の推論")
-
-if tool_use:
-    year = tool_use["input"]["year"]
-    holidays = get_jp_holiday(year)
-    tool_result = {
-        "year": year,
-        "holidays": holidays,
-        "count": len(holidays),
-    }
 
-    print("Tool Result: ", tool_result)
-    print()
+def main(
+    stream: bool = False,
+    max_iterations: int = DEFAULT_MAX_ITERATIONS,
+    prompt_cache: bool = False,
+):
+    print("ユーザーの入力: ", input)
+
+    iteration = 0
+
+    def converse_and_print(messages: list[dict]) -> dict:
+        nonlocal iteration
+        iteration += 1
+        print(f"{iteration}回目の推論")
+        response = converse(messages, stream=stream, prompt_cache=prompt_cache)
+        print_answer(response["output"]["message"], streamed=stream)
+        return response
+
+    def print_tool_results(tool_results: list[dict]):
+        for result in tool_results:
+            print("Tool Result: ", result["toolResult"])
+        print()
+
+    # 1ターン内の toolUse は並行に実行し、toolUse が返らなくなるまで推論を繰り返す
+    result = run_tool_loop(
+        converse_and_print,
+        [{"role": "user", "content": [{"text": input}]}],
+        registry,
+        max_iterations=max_iterations,
+        on_tool_results=print_tool_results,
+    )
+    if result.reached_max_iterations:
+        print(f"推論回数の上限（{max_iterations}回）に達したため終了しました。")
 
-    messages = [
-        {
-            "role": "user",
-            "content": [{"text": input}],
-        },
-        {
-            "role": "assistant",
-            "content": message["content"],
-        },
-        {
-            # Tool結果は user ロールで toolResult ブロックとして返す（content は配列）
-            "role": "user",
-            "content": [
-                {
-                    "toolResult": {
-                        "toolUseId": tool_use["toolUseId"],
-                        "content": [{"json": tool_result}],
-                    }
-                }
-            ],
-        },
-    ]
 
-    final_response = client.converse(
-        modelId=modelId,
-        messages=messages,
-        toolConfig={
-            "tools": tools,
-        },
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="converse_stream を使い、回答を届いた順に表示する",
     )
-
-    final_message = final_response["output"]["message"]
-    final_texts = [c["text"] for c in final_message.get("content", []) if "text" in c]
-    print(
-        "AIの回答: ",
-        "\n".join(final_texts) if final_texts else final_message.get("content"),
+    parser.add_argument(
+        "--max-iterations",
+        type=int,
+        default=DEFAULT_MAX_ITERATIONS,
+        help="推論回数の上限",
+    )
+    parser.add_argument(
+        "--prompt-cache",
+        action="store_true",
+        default=prompt_cache_enabled(),
+        help="Bedrock のプロンプトキャッシュを使う（BEDROCK_PROMPT_CACHE=1 でも有効）",
+    )
+    args = parser.parse_args()
+    main(
+        stream=args.stream,
+        max_iterations=args.max_iterations,
+        prompt_cache=args.prompt_cache,
     )
-else:
-    print("Tool Use: None")
-    # toolUse も text も無い場合があるので、上と同じ表示ロジックにする
-    if texts:
-        print("AIの回答: ", "\n".join(texts))
-    else:
-        print("AIの回答: (textなし)", message.get("content"))
-    print("Tool Use: None")
@@ -0,0 +1,130 @@
+import os
+
+# Bedrock のプロンプトキャッシュ用のキャッシュポイント。
+# このブロックより前（tools -> system -> messages の順）がキャッシュの対象になる。
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+
+def prompt_cache_enabled() -> bool:
+    """環境変数 BEDROCK_PROMPT_CACHE でプロンプトキャッシュを有効にする（既定は無効）"""
+    return os.getenv("BEDROCK_PROMPT_CACHE", "").strip().lower() in ("1", "true", "yes")
+
+
+def _history_cache_index(messages: list, is_cacheable) -> int | None:
+    """履歴の「変わらない部分」の末尾にあたるメッセージの位置を返す
+
+    最新のメッセージはターンごとに変わるため、それより前のメッセージのうち
+    キャッシュポイントを置けるものの最後を選ぶ。
+    """
+    for index in range(len(messages) - 2, -1, -1):
+        if is_cacheable(messages[index]):
+            return index
+    return None
+
+
+# ---
+# boto3 の converse / converse_stream 向け
+# ---
+def add_cache_points(request: dict) -> dict:
+    """converse の引数にキャッシュポイントを挿入したコピーを返す（引数は変更しない）
+
+    - system の末尾
+    - toolConfig.tools の末尾
+    - 直前までの会話履歴の末尾
+    """
+    request = dict(request)
+
+    if request.get("system"):
+        request["system"] = list(request["system"]) + [CACHE_POINT]
+
+    tool_config = request.get("toolConfig")
+    if tool_config and tool_config.get("tools"):
+        request["toolConfig"] = {
+            **tool_config,
+            "tools": list(tool_config["tools"]) + [CACHE_POINT],
+        }
+
+    messages = request.get("messages") or []
+    # toolResult だけのメッセージにも置けるが、content が空のものは除く
+    index = _history_cache_index(messages, lambda m: bool(m.get("content")))
+    if index is not None:
+        messages = list(messages)
+        cached = messages[index]
+        messages[index] = {**cached, "content": list(cached["content"]) + [CACHE_POINT]}
+        request["messages"] = messages
+
+    return request
+
+
+def cache_usage(usage: dict) -> tuple[int, int]:
+    """converse の usage から (キャッシュ読み込みトークン数, 書き込みトークン数) を返す"""
+    return (
+        usage.get("cacheReadInputTokens", 0) or 0,
+        usage.get("cacheWriteInputTokens", 0) or 0,
+    )
+
+
+# ---
+# LangChain (ChatBedrockConverse) 向け
+# ---
+def cached_system_message(system_prompt: str):
+    """末尾にキャッシュポイントを置いた SystemMessage を返す"""
+    from langchain_core.messages import SystemMessage
+
+    return SystemMessage(content=[{"type": "text", "text": system_prompt}, CACHE_POINT])
+
+
+def cached_tools(tools: list) -> list:
+    """bind_tools に渡すツールのリストの末尾にキャッシュポイントを追加する"""
+    return list(tools) + [CACHE_POINT]
+
+
+def with_history_cache_point(messages: list) -> list:
+    """直前までの会話履歴の末尾にキャッシュポイントを置いたメッセージのリストを返す
+
+    ToolMessage の content は toolResult の中身になりキャッシュポイントを置けないため、
+    Human/AI メッセージのうち最後のものに置く。元のメッセージは変更しない。
+    """
+    from langchain_core.messages import ToolMessage
+
+    index = _history_cache_index(messages, lambda m: not isinstance(m, ToolMessage))
+    if index is None:
+        return messages
+
+    cached = messages[index]
+    content = cached.content
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}] if content else []
+    messages = list(messages)
+    messages[index] = cached.model_copy(update={"content": list(content) + [CACHE_POINT]})
+    return messages
+
+
+def message_cache_usage(message) -> tuple[int, int]:
+    """AIMessage の usage_metadata から (キャッシュ読み込み, 書き込み) のトークン数を返す"""
+    usage = getattr(message, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    return details.get("cache_read", 0) or 0, details.get("cache_creation", 0) or 0
+
+
+def with_system_prompt(system_prompt: str, messages: list, cache: bool = False) -> list:
+    """システムプロンプトを先頭に付けた、LLMに渡すメッセージのリストを作る
+
+    cache=True の場合はシステムプロンプトと直前までの履歴の末尾にキャッシュポイントを置く。
+    messages が MessageLog の場合は、履歴をコピーせずにビューを返す。
+    """
+    from langchain_core.messages import SystemMessage
+
+    if not cache:
+        if hasattr(messages, "view"):
+            return messages.view(prefix=[SystemMessage(content=system_prompt)])
+        return [SystemMessage(content=system_prompt)] + messages
+    return [cached_system_message(system_prompt)] + with_history_cache_point(
+        list(messages)
+    )
+
+
+def report_cache_usage(message):
+    """AIMessage のキャッシュ読み込み・書き込みトークン数を表示する"""
+    cache_read, cache_write = message_cache_usage(message)
+    print(f"[prompt cache] cache_read={cache_read} cache_write={cache_write}")
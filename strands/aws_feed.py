@@ -0,0 +1,309 @@
+"""AWS の What's New フィードをメモリ（とディスク）に保持し、索引から引けるようにする
+
+get_aws_updates ツールは呼び出しのたびに RSS 全体をダウンロード・パースし、タイトルを
+先頭から1件ずつ調べていた。AwsFeedStore は次のように動く。
+ - バックグラウンドのスレッドが refresh_interval 秒ごとに ETag / Last-Modified を使った
+   条件付きGETで再取得し（変更がなければ 304 で本文は受け取らない）、新しいエントリだけを追加する
+ - タイトルの単語とサービス名（"Amazon ECS" の "ecs" など）から、エントリへの転置索引を作る。
+   各索引は公開日時の新しい順に並べてあるので、検索は索引を引いて先頭から取り出すだけで済む
+ - since（YYYY-MM-DD）を指定すると、その日以降に公開されたエントリだけを返す
+ - cache_path を指定すると、取得したエントリと ETag をディスクに保存し、再起動直後から使える
+"""
+
+import calendar
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import unicodedata
+from bisect import insort
+from datetime import datetime, timezone
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+import feedparser
+
+AWS_WHATS_NEW_URL = "https://aws.amazon.com/about-aws/whats-new/recent/feed/"
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "agent_book", "aws_whats_new.json"
+)
+# What's New は1日に数十件ほど追加されるため、15分ごとに確認する
+DEFAULT_REFRESH_INTERVAL = 15 * 60
+
+# サービス名の前に付く語（検索語に含まれていても絞り込みには使わない）
+VENDOR_WORDS = {"amazon", "aws"}
+
+
+def tokenize(text: str) -> list[str]:
+    """全角・半角と大文字小文字の違いをなくし、英数字の単語に分ける"""
+    return re.findall(r"[0-9a-z]+", unicodedata.normalize("NFKC", text).casefold())
+
+
+def service_names(title: str) -> set[str]:
+    """タイトル中の "Amazon ECS" / "AWS Lambda" のようなサービス名（先頭の単語を除いたもの）"""
+    names = set()
+    for match in re.finditer(r"\b(?:Amazon|AWS)\s+((?:[A-Z0-9][\w-]*\s*){1,4})", title):
+        words = tokenize(match.group(1))
+        # "Amazon Elastic Container Service" なら "elastic container service"、"elastic container"、"elastic"
+        for end in range(len(words), 0, -1):
+            names.add(" ".join(words[:end]))
+    return names
+
+
+def _published(entry) -> float:
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    return float(calendar.timegm(parsed)) if parsed else 0.0
+
+
+class AwsFeedStore:
+    """What's New フィードのエントリと、単語・サービス名からの転置索引
+
+    start() でバックグラウンドの再取得を始める（呼ばない場合は最初に読み込んだエントリだけを使う）。
+    """
+
+    def __init__(
+        self,
+        url: str = AWS_WHATS_NEW_URL,
+        cache_path: str | None = DEFAULT_CACHE_PATH,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+        timeout: float = 10,
+    ):
+        self.url = url
+        self.cache_path = cache_path
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        # 最後に取得（または 304 で確認）した時刻
+        self._fetched_at = 0.0
+        self._etag: str | None = None
+        self._last_modified: str | None = None
+
+        # id -> {"id", "title", "link", "published", "published_at", "summary"}
+        self._entries: dict[str, dict] = {}
+        # 単語 / サービス名 -> [(-published_at, id), ...]（新しい順）
+        self._tokens: dict[str, list[tuple[float, str]]] = {}
+        self._services: dict[str, list[tuple[float, str]]] = {}
+        self._token_sets: dict[str, set[str]] = {}
+        self.stats = {"fetches": 0, "not_modified": 0, "added": 0, "errors": 0}
+
+    # ---
+    # 検索API
+    # ---
+    def search(self, service_name: str, since: str | None = None, limit: int = 3) -> list[dict]:
+        """service_name に一致するエントリを新しい順に返す
+
+        "Amazon ECS ..." のようにそのサービスが主語になっているエントリ（サービス名の索引）を先に、
+        足りなければタイトルにすべての単語を含むエントリ（単語の索引）を返す。
+        since（YYYY-MM-DD）を指定すると、その日以降に公開されたものだけに絞り込む。
+        """
+        return self.search_many([service_name], since=since, limit=limit)[service_name]
+
+    def search_many(
+        self, service_names: list[str], since: str | None = None, limit: int = 3
+    ) -> dict[str, list[dict]]:
+        """複数のサービスをまとめて検索する（ロックは1回だけ取り、索引の同じ状態から引く）"""
+        self._ensure_loaded()
+        since_at = (
+            datetime.fromisoformat(since).replace(tzinfo=timezone.utc).timestamp()
+            if since
+            else None
+        )
+        with self._lock:
+            return {
+                name: self._search_locked(name, since_at, limit) for name in service_names
+            }
+
+    def _search_locked(self, service_name: str, since_at: float | None, limit: int) -> list[dict]:
+        words = tokenize(service_name)
+        # "Amazon ECS" と "AWS ECS" のどちらで聞かれても見つかるよう、先頭の語は除く
+        query = [w for w in words if w not in VENDOR_WORDS] or words
+        if not query:
+            return []
+        required = set(query)
+
+        # 単語の索引は一番短いものを順に見て、残りの単語はエントリの単語の集合で確認する
+        by_token = min((self._tokens.get(w, []) for w in query), key=len)
+        candidates = [
+            (self._services.get(" ".join(query), []), False),
+            (by_token, True),
+        ]
+        result = []
+        seen = set()
+        for postings, check_tokens in candidates:
+            for neg_published_at, entry_id in postings:
+                # 索引は新しい順なので、since より古いエントリが出てきたら残りも古い
+                if since_at is not None and -neg_published_at < since_at:
+                    break
+                if entry_id in seen:
+                    continue
+                if check_tokens and not required <= self._token_sets[entry_id]:
+                    continue
+                seen.add(entry_id)
+                entry = self._entries[entry_id]
+                result.append(
+                    {
+                        "title": entry["title"],
+                        "published": entry["published"],
+                        "summary": entry["summary"],
+                    }
+                )
+                if len(result) >= limit:
+                    return result
+        return result
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ---
+    # 取得・更新
+    # ---
+    def start(self):
+        """バックグラウンドでの定期的な再取得を始める"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="aws-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        self._ensure_loaded()
+        while True:
+            # ディスクから読み込んだエントリが古い場合は、すぐに再取得する
+            wait = self.refresh_interval - (time.time() - self._fetched_at)
+            if self._stop.wait(max(wait, 0)):
+                return
+            self._refresh_quietly()
+
+    def _ensure_loaded(self):
+        """初回だけ、ディスクのキャッシュか（なければ）ネットワークからエントリを読み込む
+
+        ディスクのキャッシュが古くてもそのまま使い、再取得はバックグラウンドのスレッドに任せる。
+        """
+        if self._loaded.is_set():
+            return
+        # 同時に呼ばれても、読み込みは1回だけ行う
+        with self._load_lock:
+            if self._loaded.is_set():
+                return
+            with self._lock:
+                self._load_from_disk()
+            if not self._entries:
+                self._refresh_quietly()
+            self._loaded.set()
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+        except RuntimeError as e:
+            # 取得できなくても、手元のエントリで応答を続ける
+            self.stats["errors"] += 1
+            print(f"AWS What's New の取得に失敗しました: {e}", file=sys.stderr)
+
+    def refresh(self) -> int:
+        """条件付きGETでフィードを取得し、新しく追加したエントリの数を返す"""
+        headers = {"User-Agent": "agent_book/1.0 (urllib)"}
+        if self._entries:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+
+        self.stats["fetches"] += 1
+        try:
+            with urlopen(Request(self.url, headers=headers), timeout=self.timeout) as response:
+                body = response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except HTTPError as e:
+            # 304 Not Modified は urllib では HTTPError として送出される
+            if e.code == 304:
+                # エントリは変わらないので、ディスクには書き直さない（再起動後も 304 で確認できる）
+                self.stats["not_modified"] += 1
+                self._fetched_at = time.time()
+                return 0
+            raise RuntimeError(f"HTTPエラー: {e.code} {e.reason}（URL: {self.url}）") from e
+        except (URLError, OSError) as e:
+            raise RuntimeError(f"接続に失敗しました: {e}（URL: {self.url}）") from e
+
+        # パースはロックの外で行い、検索を止めない
+        feed = feedparser.parse(body)
+        entries = [
+            {
+                "id": entry.get("id") or entry.get("link") or entry.get("title", ""),
+                "title": entry.get("title", ""),
+                "link": entry.get("link", ""),
+                "published": entry.get("published", "N/A"),
+                "published_at": _published(entry),
+                "summary": entry.get("summary", ""),
+            }
+            for entry in feed.entries
+        ]
+        with self._lock:
+            added = sum(self._add_locked(entry) for entry in entries)
+            self._etag = etag
+            self._last_modified = last_modified
+            self._fetched_at = time.time()
+            self.stats["added"] += added
+            self._save_to_disk()
+        return added
+
+    def _add_locked(self, entry: dict) -> bool:
+        entry_id = entry["id"]
+        if entry_id in self._entries:
+            return False
+        self._entries[entry_id] = entry
+        key = (-entry["published_at"], entry_id)
+        tokens = set(tokenize(entry["title"]))
+        self._token_sets[entry_id] = tokens
+        for token in tokens:
+            insort(self._tokens.setdefault(token, []), key)
+        for name in service_names(entry["title"]):
+            insort(self._services.setdefault(name, []), key)
+        return True
+
+    def _load_from_disk(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            for entry in cached["entries"]:
+                self._add_locked(entry)
+            self._fetched_at = float(cached.get("fetched_at", 0))
+            self._etag = cached.get("etag")
+            self._last_modified = cached.get("last_modified")
+        except (OSError, ValueError, KeyError):
+            # 壊れたキャッシュは無視して取り直す
+            return
+
+    def _save_to_disk(self):
+        if not self.cache_path:
+            return
+        cache_dir = os.path.dirname(self.cache_path) or "."
+        os.makedirs(cache_dir, exist_ok=True)
+        payload = {
+            "fetched_at": self._fetched_at,
+            "etag": self._etag,
+            "last_modified": self._last_modified,
+            "entries": list(self._entries.values()),
+        }
+        # 書き込み途中のファイルを読まれないよう、一時ファイルから置き換える
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
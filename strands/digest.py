@@ -0,0 +1,123 @@
+"""複数の AWS サービスの最新情報をまとめて要約するダイジェスト
+
+main.py のエージェントは1回の実行で1つのサービスを調べ、ツールの呼び出しもモデルが1つずつ
+決めている。ダイジェストでは次のように処理する。
+ - すべてのサービスのアップデートを、AwsFeedStore の索引から1回でまとめて引く
+   （フィードの取得は1回だけで、モデルにツールを選ばせない）
+ - サービスごとの要約は、同時実行数を --concurrency に制限して並行に行う
+ - 要約が終わったサービスから順に出力し、最後に全体の所要時間とサービスごとのレイテンシを表示する
+
+実行例:
+  python strands/digest.py ECS Lambda "Amazon Bedrock" --since 2026-01-01 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+from strands import Agent
+from strands.models.bedrock import BedrockModel
+
+from aws_feed import DEFAULT_CACHE_PATH, AwsFeedStore
+
+load_dotenv()
+
+modelId = "global.anthropic.claude-opus-4-5-20251101-v1:0"
+
+system_prompt = """
+あなたは AWS のアップデート情報を要約する担当者です。
+渡されたアップデートの一覧をもとに、サービスの最新の変更点を日本語で3行以内にまとめてください。
+"""
+
+
+def build_prompt(service_name: str, updates: list[dict]) -> str:
+    lines = [f"サービス: {service_name}", "アップデート:"]
+    for update in updates:
+        lines.append(f"- {update['published']} {update['title']}: {update['summary']}")
+    return "\n".join(lines)
+
+
+async def summarize(
+    model, service_name: str, updates: list[dict], semaphore: asyncio.Semaphore
+) -> dict:
+    start = time.perf_counter()
+    if not updates:
+        # アップデートがなければモデルは呼ばない
+        result = {"status": "ok", "digest": "該当するアップデートはありません。"}
+    else:
+        async with semaphore:
+            # レイテンシは空きを待つ時間を除き、要約にかかった時間だけを測る
+            start = time.perf_counter()
+            # Agent は会話履歴を持つため、サービスごとに作る（モデルのクライアントは共有する）
+            agent = Agent(model=model, system_prompt=system_prompt, callback_handler=None)
+            try:
+                response = await agent.invoke_async(build_prompt(service_name, updates))
+                result = {"status": "ok", "digest": str(response).strip()}
+            except Exception as e:
+                result = {"status": "error", "digest": f"{type(e).__name__}: {e}"}
+    return {
+        "service": service_name,
+        "updates": len(updates),
+        **result,
+        "latency_sec": round(time.perf_counter() - start, 3),
+    }
+
+
+async def run_digest(
+    services: list[str],
+    feed_store: AwsFeedStore,
+    model,
+    since: str | None = None,
+    concurrency: int = 4,
+    limit: int = 3,
+) -> list[dict]:
+    """サービスごとの要約を並行に実行し、終わったものから順に表示する"""
+    start = time.perf_counter()
+    # フィードの読み込みは1回だけ（初回はネットワークから取得するのでスレッドで待つ）
+    updates = await asyncio.to_thread(feed_store.search_many, services, since, limit)
+    lookup_sec = time.perf_counter() - start
+    print(
+        f"サービス {len(services)} 件（アップデートの検索 {lookup_sec * 1000:.1f}ms、並列数 {concurrency}）"
+    )
+
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [
+        asyncio.create_task(summarize(model, name, updates[name], semaphore))
+        for name in services
+    ]
+    results = []
+    for finished in asyncio.as_completed(tasks):
+        record = await finished
+        results.append(record)
+        print(
+            f"\n## {record['service']}（{record['updates']} 件 / {record['latency_sec']:.2f}s）\n"
+            f"{record['digest']}",
+            flush=True,
+        )
+
+    elapsed = time.perf_counter() - start
+    print(f"\n完了: {elapsed:.2f}s")
+    for record in sorted(results, key=lambda r: r["latency_sec"], reverse=True):
+        print(f"  [{record['status']}] {record['service']:<24} {record['latency_sec']:>7.2f}s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("services", nargs="+", help="サービス名（例: ECS Lambda \"Amazon Bedrock\"）")
+    parser.add_argument("--since", help="この日（YYYY-MM-DD）以降のアップデートだけを使う")
+    parser.add_argument("--concurrency", type=int, default=4, help="要約の同時実行数")
+    parser.add_argument("--limit", type=int, default=3, help="サービスごとのアップデートの件数")
+    args = parser.parse_args()
+
+    feed_store = AwsFeedStore(cache_path=os.getenv("AWS_FEED_CACHE_PATH") or DEFAULT_CACHE_PATH)
+    model = BedrockModel(model_id=modelId)
+    asyncio.run(
+        run_digest(args.services, feed_store, model, args.since, args.concurrency, args.limit)
+    )
+
+
+if __name__ == "__main__":
+    main()
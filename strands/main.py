@@ -1,45 +1,54 @@
+import os
+
 from strands import Agent, tool
 from dotenv import load_dotenv
-import feedparser
+
+from aws_feed import DEFAULT_CACHE_PATH, AwsFeedStore
 
 load_dotenv()
 
+# What's New のフィードはバックグラウンドで条件付きGETにより更新し、ツールは索引から引くだけにする
+# （作成時には取得しない。start() か最初の検索で読み込む）
+feed_store = AwsFeedStore(cache_path=os.getenv("AWS_FEED_CACHE_PATH") or DEFAULT_CACHE_PATH)
+
 
 @tool
-def get_aws_updates(service_name: str):
-    ## AWSのwhats newのRSSを取得する
-    url = f"https://aws.amazon.com/about-aws/whats-new/recent/feed/"
-    feed = feedparser.parse(url)
-    result = []
+def get_aws_updates(service_name: str, since: str | None = None):
+    """AWS の What's New から、サービスの最新のアップデートを新しい順に最大3件返す
 
-    for entry in feed.entries:
-        if service_name.lower() in entry.title.lower():
-            result.append(
-                {
-                    "published": entry.get("published", "N/A"),
-                    "summary": entry.get("summary", ""),
-                }
-            )
+    Args:
+        service_name: サービス名（例: "ECS"、"Amazon Bedrock"）
+        since: この日（YYYY-MM-DD）以降に公開されたものだけを返す（省略可）
+    """
+    return feed_store.search(service_name, since=since, limit=3)
 
-            if len(result) >= 3:
-                break
 
-    return result
+modelId = "global.anthropic.claude-opus-4-5-20251101-v1:0"
 
 
-modelId = "global.anthropic.claude-opus-4-5-20251101-v1:0"
-agent = Agent(model=modelId, tools=[get_aws_updates])
+def build_agent(model=modelId) -> Agent:
+    # Bedrock のクライアントはここで作る（import しただけでは作らない）
+    return Agent(model=model, tools=[get_aws_updates])
+
+
+def main():
+    feed_store.start()
+    agent = build_agent()
+
+    messages = [
+        {"role": "user", "content": [{"text": "AWSのECSの最新情報を教えてください"}]},
+    ]
+
+    # strands-agents の Agent は `run()` ではなく呼び出し（__call__）で実行する
+    result = agent(messages)
 
-messages = [
-    {"role": "user", "content": [{"text": "AWSのECSの最新情報を教えてください"}]},
-]
+    # `result.message.content` は text/toolUse 等のブロック配列
+    texts = [c["text"] for c in result.message.get("content", []) if "text" in c]
+    if texts:
+        print("\n".join(texts))
+    else:
+        print(result.to_dict())
 
-# strands-agents の Agent は `run()` ではなく呼び出し（__call__）で実行する
-result = agent(messages)
 
-# `result.message.content` は text/toolUse 等のブロック配列
-texts = [c["text"] for c in result.message.get("content", []) if "text" in c]
-if texts:
-    print("\n".join(texts))
-else:
-    print(result.to_dict())
+if __name__ == "__main__":
+    main()
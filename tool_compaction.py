@@ -0,0 +1,359 @@
+"""ツールの出力を、会話の履歴（コンテキスト）に戻す前に小さくする
+
+Web検索（TavilySearch）や MCP のツールの結果、get_jp_holiday の JSON は、そのまま ToolMessage /
+toolResult として LLM に渡すと、以降のターンで毎回同じトークンを送り直すことになる。
+ToolOutputCompactor は、ツールの出力に次の処理（steps）を順に適用してから履歴に戻す。
+ - drop_noise:   画像・生の HTML（raw_content）・リクエスト ID など、回答に使わない項目と空の値を除く
+ - dedupe_urls:  同じ URL（# 以降・utm_* のパラメータ・末尾の / の違いは無視）の項目を1つにする
+ - strip_html:   HTML のタグ・スクリプトと、HTML の「Cookie の設定」「All rights reserved」などの定型文だけの行を除く
+ - truncate:     文字列の項目ごとに、トークン数の見積もりが max_field_tokens を超える部分を切り詰める
+steps は差し替え・追加できる（値を受け取って小さくした値を返す関数）。
+
+小さくした場合は元の出力を SideStore に保存し、その ID を出力に含める（"full_output_id"）。
+アプリは compactor.store.get(ID) で全文を取り出せる。
+ツールごとに、小さくする前後のトークン数（見積もり）を集計して summary() で表示する。
+
+ - ToolNode(awrap_tool_call=compactor.awrap_tool_call) / wrap_tool_call で LangGraph のツールの結果に
+ - compactor.compact(tool_name, output) でツールの戻り値（functional API の use_tool など）に
+ - ToolRegistry(..., postprocess=compactor.compact) で converse の toolResult に
+TOOL_OUTPUT_COMPACTION=1 の場合に tool_output_compactor() が ToolOutputCompactor を返す。
+"""
+
+import atexit
+import hashlib
+import html
+import json
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_MAX_FIELD_TOKENS = 300
+DEFAULT_STORE_MAX_BYTES = 16 * 1024 * 1024
+
+# 回答に使わない項目（Tavily の images / raw_content / response_time など）
+NOISE_KEYS = frozenset(
+    {
+        "images",
+        "raw_content",
+        "favicon",
+        "response_time",
+        "request_id",
+        "follow_up_questions",
+        "auto_parameters",
+    }
+)
+
+# 定型文（ナビゲーション・Cookie の案内・著作権表示など）の行。行全体が一致した場合だけ除く
+# （「Subscribe an SQS queue to ...」のような本文を除かないように）
+BOILERPLATE = re.compile(
+    r"^\s*("
+    r"skip to (main )?content|(accept|reject) (all )?cookies"
+    r"|cookie ?(の)?(設定|settings|preferences|policy)(を変更できます)?"
+    r"|privacy policy|terms of (use|service)|sign in|sign up|log in|log out|subscribe"
+    r"|share( this( page)?)?|all rights reserved"
+    r"|© ?\d{4}.*|(copyright|\(c\)) ?\d{4}.*all rights reserved"
+    r"|メインコンテンツにスキップ|プライバシーポリシー|利用規約|ログイン|無断転載(を)?禁(じます|止)?"
+    r")\s*[.。!！]?\s*$",
+    re.IGNORECASE,
+)
+_BLOCK_TAG = re.compile(
+    r"</?(p|div|br|li|ul|ol|tr|table|section|article|h[1-6]|title|body|html|head)\b[^>]*>",
+    re.IGNORECASE,
+)
+_TAG = re.compile(r"<[^>]+>")
+# 定型文とみなすのは短い行だけ（本文の段落を誤って除かないように）
+BOILERPLATE_MAX_CHARS = 120
+_SCRIPT = re.compile(r"<(script|style|nav|footer|header)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_LOOKS_LIKE_HTML = re.compile(r"</?[a-zA-Z][^>]*>")
+_URL_KEYS = ("url", "uri", "link", "href")
+
+Step = Callable[[Any], Any]
+
+
+def estimate_tokens(value: Any) -> int:
+    """トークン数の見積もり（ASCII 文字は 4文字で1トークン、日本語などの非 ASCII 文字は1文字1トークン）
+
+    lang-graph/memory_policy.py のメッセージの見積もりもこの関数を使う。
+    """
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+    ascii_chars = sum(1 for ch in text if ch < "\x80")
+    return math.ceil(ascii_chars / 4) + len(text) - ascii_chars
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith("utm_")]
+    return urlunsplit(
+        (
+            parts.scheme.lower(),
+            parts.netloc.lower(),
+            parts.path.rstrip("/"),
+            urlencode(query),
+            "",
+        )
+    )
+
+
+def _map_strings(value: Any, fn: Callable[[str], str]) -> Any:
+    if isinstance(value, str):
+        return fn(value)
+    if isinstance(value, dict):
+        return {k: _map_strings(v, fn) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_map_strings(v, fn) for v in value]
+    return value
+
+
+def drop_noise(value: Any) -> Any:
+    """回答に使わない項目と、None・空文字・空のリストの項目を除く"""
+    if isinstance(value, dict):
+        return {
+            k: drop_noise(v)
+            for k, v in value.items()
+            if k not in NOISE_KEYS and v not in (None, "", [], {})
+        }
+    if isinstance(value, list):
+        return [drop_noise(v) for v in value]
+    return value
+
+
+def dedupe_urls(value: Any) -> Any:
+    """URL が同じ項目（検索結果など）を、最初の1つだけ残す"""
+    if isinstance(value, dict):
+        return {k: dedupe_urls(v) for k, v in value.items()}
+    if not isinstance(value, list):
+        return value
+    seen: set[str] = set()
+    items = []
+    for item in value:
+        url = next(
+            (item[k] for k in _URL_KEYS if isinstance(item, dict) and isinstance(item.get(k), str)),
+            None,
+        )
+        if url is not None:
+            key = normalize_url(url)
+            if key in seen:
+                continue
+            seen.add(key)
+        items.append(dedupe_urls(item))
+    return items
+
+
+def clean_text(text: str) -> str:
+    """HTML のタグと定型文の行を除き、空白をまとめる（定型文の行を除くのは HTML の場合だけ）"""
+    is_html = bool(_LOOKS_LIKE_HTML.search(text))
+    if is_html:
+        text = _BLOCK_TAG.sub("\n", _SCRIPT.sub("\n", text))
+        text = html.unescape(_TAG.sub(" ", text))
+    lines = [re.sub(r"[ \t　]+", " ", line).strip() for line in text.splitlines()]
+    return "\n".join(
+        line
+        for line in lines
+        if line
+        and not (is_html and len(line) <= BOILERPLATE_MAX_CHARS and BOILERPLATE.match(line))
+    )
+
+
+def strip_html(value: Any) -> Any:
+    return _map_strings(value, clean_text)
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """トークン数の見積もりが max_tokens を超える部分を切り詰める"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens
+    for index, ch in enumerate(text):
+        budget -= 0.25 if ch < "\x80" else 1
+        if budget < 0:
+            return text[:index].rstrip() + " …（省略）"
+    return text
+
+
+def truncate(max_tokens: int) -> Step:
+    return lambda value: _map_strings(value, lambda text: truncate_text(text, max_tokens))
+
+
+def default_steps(max_field_tokens: int = DEFAULT_MAX_FIELD_TOKENS) -> list[Step]:
+    return [drop_noise, dedupe_urls, strip_html, truncate(max_field_tokens)]
+
+
+class SideStore:
+    """小さくする前のツールの出力を ID で保存する（合計サイズの上限つき LRU / スレッドセーフ）"""
+
+    def __init__(self, max_bytes: int = DEFAULT_STORE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, tool_name: str, value: Any) -> str:
+        serialized = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+        output_id = f"{tool_name}:{hashlib.sha256(serialized.encode('utf-8')).hexdigest()[:12]}"
+        size = len(serialized.encode("utf-8"))
+        with self._lock:
+            if output_id in self._entries:
+                self._entries.move_to_end(output_id)
+                return output_id
+            self._entries[output_id] = (value, size)
+            self._bytes += size
+            # 古く使われたものから捨てる（最後に保存したものは残す）
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, removed) = self._entries.popitem(last=False)
+                self._bytes -= removed
+        return output_id
+
+    def get(self, output_id: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(output_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(output_id)
+            return entry[0]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ToolOutputCompactor:
+    """ツールの出力を小さくしてから履歴に戻す
+
+    Args:
+        steps: 出力に順に適用する関数（省略時は default_steps(max_field_tokens)）
+        max_field_tokens: 文字列の項目ごとのトークン数の上限（steps を省略した場合）
+        tool_steps: ツール名ごとの steps（指定したツールは steps の代わりにこれを使う）
+        store: 元の出力を保存する SideStore
+        verbose: True なら呼び出しごとに前後のトークン数を表示する
+    """
+
+    def __init__(
+        self,
+        steps: list[Step] | None = None,
+        max_field_tokens: int = DEFAULT_MAX_FIELD_TOKENS,
+        tool_steps: dict[str, list[Step]] | None = None,
+        store: SideStore | None = None,
+        verbose: bool = True,
+    ):
+        self.steps = steps if steps is not None else default_steps(max_field_tokens)
+        self.tool_steps = tool_steps or {}
+        self.store = store or SideStore()
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        # ツール名 -> {"calls", "compacted", "tokens_before", "tokens_after"}
+        self.tool_stats: dict[str, dict[str, int]] = {}
+
+    def compact(self, tool_name: str, output: Any) -> Any:
+        """output を小さくした値を返す（JSON の文字列は読み込んでから小さくし、文字列に戻す）"""
+        value, encoded = output, False
+        if isinstance(output, str) and output.lstrip()[:1] in ("{", "["):
+            try:
+                value, encoded = json.loads(output), True
+            except ValueError:
+                pass
+
+        compacted = value
+        for step in self.tool_steps.get(tool_name, self.steps):
+            compacted = step(compacted)
+
+        before = estimate_tokens(output)
+        if compacted == value:
+            self._record(tool_name, before, before, compacted=False)
+            return output
+
+        output_id = self.store.put(tool_name, value)
+        compacted = _with_output_id(compacted, output_id)
+        if encoded:
+            compacted = json.dumps(compacted, ensure_ascii=False)
+
+        # ID を付けたことでかえって大きくなる（ほとんど削れなかった）場合は元の出力を使う
+        after = estimate_tokens(compacted)
+        if after >= before:
+            self._record(tool_name, before, before, compacted=False)
+            return output
+        self._record(tool_name, before, after, compacted=True)
+        return compacted
+
+    def _record(self, tool_name: str, before: int, after: int, compacted: bool):
+        with self._lock:
+            stats = self.tool_stats.setdefault(
+                tool_name, {"calls": 0, "compacted": 0, "tokens_before": 0, "tokens_after": 0}
+            )
+            stats["calls"] += 1
+            stats["compacted"] += int(compacted)
+            stats["tokens_before"] += before
+            stats["tokens_after"] += after
+        if self.verbose and compacted:
+            print(
+                f"[tool compaction] {tool_name} tokens={before}->{after} "
+                f"({1 - after / before if before else 0.0:.0%} reduced)"
+            )
+
+    def compact_message(self, message):
+        """ToolMessage の content を小さくしたコピーを返す（エラーの結果や Command はそのまま）"""
+        from langchain_core.messages import ToolMessage
+
+        if not isinstance(message, ToolMessage) or message.status == "error":
+            return message
+        content = self.compact(message.name or "tool", message.content)
+        if content is message.content:
+            return message
+        if not isinstance(content, (str, list)):
+            content = json.dumps(content, ensure_ascii=False)
+        return message.model_copy(update={"content": content})
+
+    def wrap_tool_call(self, request, execute):
+        """ToolNode(wrap_tool_call=...) に渡すラッパー"""
+        result = execute(request)
+        return self.compact_message(_named(result, request))
+
+    async def awrap_tool_call(self, request, execute):
+        """ToolNode(awrap_tool_call=...) に渡すラッパー"""
+        result = await execute(request)
+        return self.compact_message(_named(result, request))
+
+    def summary(self) -> str:
+        with self._lock:
+            stats = {name: dict(values) for name, values in self.tool_stats.items()}
+        lines = []
+        for name, values in sorted(stats.items()):
+            before, after = values["tokens_before"], values["tokens_after"]
+            lines.append(
+                f"  {name}: calls={values['calls']} compacted={values['compacted']} "
+                f"tokens={before}->{after} ({1 - after / before if before else 0.0:.0%} reduced)"
+            )
+        return "tool output compaction:\n" + "\n".join(lines)
+
+
+def _with_output_id(value: Any, output_id: str) -> Any:
+    if isinstance(value, dict):
+        return {**value, "full_output_id": output_id}
+    if isinstance(value, str):
+        return f"{value}\n(full_output_id: {output_id})"
+    if isinstance(value, list) and all(isinstance(v, dict) and "type" in v for v in value):
+        # MCP のツールなどが返すコンテンツブロックのリストには、テキストのブロックとして加える
+        return value + [{"type": "text", "text": f"(full_output_id: {output_id})"}]
+    return {"result": value, "full_output_id": output_id}
+
+
+def _named(result, request):
+    # ToolNode の ToolMessage には name が入るが、キャッシュから返したものなどにはないことがある
+    if getattr(result, "name", "") is None:
+        return result.model_copy(update={"name": request.tool_call["name"]})
+    return result
+
+
+def tool_output_compactor() -> ToolOutputCompactor | None:
+    """TOOL_OUTPUT_COMPACTION=1 なら ToolOutputCompactor、そうでなければ None を返す"""
+    if os.getenv("TOOL_OUTPUT_COMPACTION") != "1":
+        return None
+    compactor = ToolOutputCompactor(
+        max_field_tokens=int(os.getenv("TOOL_OUTPUT_MAX_FIELD_TOKENS", DEFAULT_MAX_FIELD_TOKENS))
+    )
+    atexit.register(
+        lambda: compactor.tool_stats and print(f"[tool compaction]\n{compactor.summary()}")
+    )
+    return compactor
@@ -0,0 +1,202 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from tracing import payload_bytes, tracer
+
+DEFAULT_TOOL_TIMEOUT = 30.0  # 秒
+DEFAULT_MAX_ITERATIONS = 5
+
+
+class ToolRegistry:
+    """toolSpec のリストと、ツール名に対応するPython関数を束ねる
+
+    toolSpec に書かれたツールはすべて実装が登録されている必要がある。
+    postprocess を指定すると、ツールの戻り値を postprocess(ツール名, 戻り値) で変換してから
+    toolResult にする（tool_compaction.py の ToolOutputCompactor.compact など）。
+    """
+
+    def __init__(
+        self,
+        tool_specs: list[dict],
+        functions: dict[str, Callable[..., Any]],
+        timeouts: dict[str, float] | None = None,
+        default_timeout: float = DEFAULT_TOOL_TIMEOUT,
+        postprocess: Callable[[str, Any], Any] | None = None,
+    ):
+        names = [spec["toolSpec"]["name"] for spec in tool_specs]
+        missing = [name for name in names if name not in functions]
+        if missing:
+            raise ValueError(f"ツールの実装が登録されていません: {missing}")
+
+        self.tool_specs = tool_specs
+        self.functions = {name: functions[name] for name in names}
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.postprocess = postprocess
+
+    @property
+    def tool_config(self) -> dict:
+        return {"tools": self.tool_specs}
+
+    def timeout_for(self, name: str) -> float:
+        return self.timeouts.get(name, self.default_timeout)
+
+    def call(self, tool_use: dict) -> dict:
+        """toolUse ブロックを実行し、toolResult ブロックを返す（例外は error として返す）"""
+        name = tool_use["name"]
+        with tracer.span(name, "tool") as span:
+            try:
+                if name not in self.functions:
+                    raise KeyError(f"未登録のツールです: {name}")
+                output = self.functions[name](**(tool_use.get("input") or {}))
+                if self.postprocess is not None:
+                    output = self.postprocess(name, output)
+            except Exception as e:
+                span.fail(e)
+                return _tool_result(tool_use, [{"text": f"{type(e).__name__}: {e}"}], "error")
+            result = _tool_result(tool_use, _to_content(output))
+            if tracer.enabled:
+                span.set(
+                    input_bytes=payload_bytes(tool_use.get("input") or {}),
+                    output_bytes=payload_bytes(result["toolResult"]["content"]),
+                )
+            return result
+
+
+def _to_content(output: Any) -> list[dict]:
+    if isinstance(output, str):
+        return [{"text": output}]
+    if isinstance(output, dict):
+        return [{"json": output}]
+    return [{"json": {"result": output}}]
+
+
+def _tool_result(tool_use: dict, content: list[dict], status: str | None = None) -> dict:
+    result = {"toolUseId": tool_use["toolUseId"], "content": content}
+    if status:
+        result["status"] = status
+    return {"toolResult": result}
+
+
+@dataclass
+class ToolLoopResult:
+    response: dict  # 最後の推論のレスポンス
+    messages: list[dict] = field(default_factory=list)  # 会話履歴（最後の応答を含む）
+    iterations: int = 0
+    reached_max_iterations: bool = False
+
+
+def run_tool_loop(
+    converse: Callable[[list[dict]], dict],
+    messages: list[dict],
+    registry: ToolRegistry,
+    max_iterations: int = DEFAULT_MAX_ITERATIONS,
+    max_workers: int | None = None,
+    on_tool_results: Callable[[list[dict]], None] | None = None,
+) -> ToolLoopResult:
+    """toolUse が返らなくなるまで（最大 max_iterations 回）推論とツール実行を繰り返す
+
+    1ターンに含まれる toolUse は run_tools で並行に（同時に max_workers 個まで）実行し、
+    toolResult をまとめて1つの user メッセージとして返す。
+    そのため1ターンの待ち時間は各ツールの合計ではなく、最も遅いツールの時間になる。
+    """
+    messages = list(messages)
+    for iteration in range(1, max_iterations + 1):
+        response = converse(messages)
+        message = response["output"]["message"]
+        messages.append({"role": "assistant", "content": message["content"]})
+
+        tool_uses = [c["toolUse"] for c in message["content"] if "toolUse" in c]
+        if not tool_uses:
+            return ToolLoopResult(response, messages, iteration)
+        if iteration == max_iterations:
+            break
+
+        tool_results = run_tools(registry, tool_uses, max_workers)
+        if on_tool_results:
+            on_tool_results(tool_results)
+        # Tool結果は user ロールで toolResult ブロックとして返す（content は配列）
+        messages.append({"role": "user", "content": tool_results})
+
+    # 推論回数の上限に達した（最後の toolUse は実行しない）
+    return ToolLoopResult(response, messages, max_iterations, reached_max_iterations=True)
+
+
+class _ToolRun:
+    """1つの toolUse を daemon スレッドで実行し、開始時刻と toolResult を記録する"""
+
+    def __init__(self, tool_use: dict, timeout: float):
+        self.tool_use = tool_use
+        self.timeout = timeout
+        self.started_at: float | None = None
+        self.result: dict | None = None
+
+    def start(self, registry: ToolRegistry, changed: threading.Condition) -> None:
+        threading.Thread(
+            target=self._run,
+            args=(registry, changed),
+            name=f"tool-{self.tool_use['name']}",
+            daemon=True,
+        ).start()
+
+    def _run(self, registry: ToolRegistry, changed: threading.Condition) -> None:
+        with changed:
+            self.started_at = time.monotonic()
+            changed.notify()
+        result = registry.call(self.tool_use)
+        with changed:
+            # タイムアウト済みなら結果は捨てる
+            if self.result is None:
+                self.result = result
+            changed.notify()
+
+    def deadline(self) -> float | None:
+        return None if self.started_at is None else self.started_at + self.timeout
+
+
+def run_tools(
+    registry: ToolRegistry, tool_uses: list[dict], max_workers: int | None = None
+) -> list[dict]:
+    """toolUse を並行に実行し、toolUse と同じ順序で toolResult を返す
+
+    同時に実行するのは max_workers 個まで（None なら全部）で、残りは順番に待つ。
+    タイムアウトは待ち時間を含めず、各ツールが実行を始めた時刻から数える。
+    タイムアウトしたツールのスレッドは止められないため待たずに戻る。
+    daemon スレッドなのでプロセスの終了は妨げず、放置されるのは1ターンあたり toolUse の数までになる。
+    """
+    runs = [_ToolRun(tool_use, registry.timeout_for(tool_use["name"])) for tool_use in tool_uses]
+    limit = len(runs) if max_workers is None else max_workers
+    waiting = deque(runs)
+    running: list[_ToolRun] = []
+    changed = threading.Condition()
+
+    with changed:
+        while waiting or running:
+            while waiting and len(running) < limit:
+                run = waiting.popleft()
+                run.start(registry, changed)
+                running.append(run)
+
+            now = time.monotonic()
+            for run in list(running):
+                deadline = run.deadline()
+                if run.result is None and deadline is not None and now >= deadline:
+                    # タイムアウトしたツールの枠を空け、待っているツールを始める
+                    run.result = _tool_result(
+                        run.tool_use,
+                        [{"text": f"ツール {run.tool_use['name']} がタイムアウトしました。"}],
+                        "error",
+                    )
+                if run.result is not None:
+                    running.remove(run)
+            if waiting and len(running) < limit:
+                continue
+
+            deadlines = [d for d in (run.deadline() for run in running) if d is not None]
+            if running:
+                changed.wait(timeout=max(0.0, min(deadlines) - now) if deadlines else None)
+
+    return [run.result for run in runs]
@@ -0,0 +1,263 @@
+"""エージェントの処理を区間（span）ごとに計測する
+
+LLM の呼び出し・ツールの実行・グラフのノード（LangGraph の node / task）をそれぞれ span として記録し、
+経過時間・トークン数（入力 / 出力 / キャッシュの読み込み・書き込み）・入出力のサイズ（バイト数）を持たせる。
+ - TRACE_PATH を指定すると、終わった span を1行1件の JSON としてそのファイルに追記する
+ - TRACE_SUMMARY=1 の場合、終了時に span 名ごとの件数と p50 / p95 / p99 を表示する。
+   あわせて、子の span を除いた時間（self time）を LLM・ツール・フレームワーク（node / task）
+   ごとに合計し、待ち時間がどこで生じているかを表示する
+どちらも指定しなければ tracer は何も記録しない（span() は何もしない span を返す）。
+
+LangGraph のノードと LLM・ツールの span は、lang-graph/trace_callbacks.py のコールバックで記録する。
+"""
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Iterator
+
+# span の種類（フレームワークの処理は node、LLM とツールは外部の待ち時間として分けて集計する）
+KINDS = ("llm", "tool", "node")
+
+_current_span_id: ContextVar[str | None] = ContextVar("current_span_id", default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    kind: str
+    span_id: str
+    parent_id: str | None
+    start_time: float  # UNIX 時刻（秒）
+    duration_ms: float = 0.0
+    status: str = "ok"
+    attributes: dict = field(default_factory=dict)
+    _started: float = field(default=0.0, repr=False)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def set_usage(self, usage: dict):
+        """converse_usage / message_usage の結果（0 のものは記録しない）"""
+        self.attributes.update({k: v for k, v in usage.items() if v})
+
+    def fail(self, error: BaseException):
+        """例外を呼び出し元に返さずに処理した場合も、失敗した span として記録する"""
+        self.status = "error"
+        self.attributes["error"] = type(error).__name__
+
+    def to_dict(self) -> dict:
+        record = asdict(self)
+        record.pop("_started")
+        return record
+
+
+class _NoopSpan:
+    """tracer が無効なときの span（記録しない）"""
+
+    def set(self, **attributes):
+        pass
+
+    def set_usage(self, usage: dict):
+        pass
+
+    def fail(self, error: BaseException):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def converse_usage(usage: dict) -> dict:
+    """Bedrock Converse の usage を span の属性にする"""
+    return {
+        "input_tokens": usage.get("inputTokens", 0) or 0,
+        "output_tokens": usage.get("outputTokens", 0) or 0,
+        "cache_read_tokens": usage.get("cacheReadInputTokens", 0) or 0,
+        "cache_write_tokens": usage.get("cacheWriteInputTokens", 0) or 0,
+    }
+
+
+def message_usage(message) -> dict:
+    """AIMessage の usage_metadata を span の属性にする"""
+    usage = getattr(message, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    return {
+        "input_tokens": usage.get("input_tokens", 0) or 0,
+        "output_tokens": usage.get("output_tokens", 0) or 0,
+        "cache_read_tokens": details.get("cache_read", 0) or 0,
+        "cache_write_tokens": details.get("cache_creation", 0) or 0,
+    }
+
+
+def payload_bytes(value: Any) -> int:
+    """入出力のおおよそのサイズ（JSON にした場合のバイト数）"""
+    if isinstance(value, (str, bytes)):
+        return len(value.encode("utf-8") if isinstance(value, str) else value)
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return len(str(value).encode("utf-8"))
+
+
+class JsonlExporter:
+    """終わった span を1行1件の JSON としてファイルに追記する"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """最近傍順位法でのパーセンタイル（sorted_values は昇順）"""
+    index = max(math.ceil(q / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class SpanAggregator:
+    """span 名ごとの経過時間とトークン数、種類ごとの self time をプロセス内で集計する"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: dict[str, list[float]] = {}
+        self.kinds: dict[str, str] = {}
+        self.tokens: dict[str, list[int]] = {}
+        self.self_ms = {kind: 0.0 for kind in KINDS}
+        # 終わった子の span の時間の合計（親の span が終わるまで保持する）
+        self._children_ms: dict[str, float] = {}
+
+    def export(self, span: Span):
+        with self._lock:
+            self.durations.setdefault(span.name, []).append(span.duration_ms)
+            self.kinds[span.name] = span.kind
+            tokens = self.tokens.setdefault(span.name, [0, 0])
+            tokens[0] += span.attributes.get("input_tokens", 0)
+            tokens[1] += span.attributes.get("output_tokens", 0)
+
+            # 並行に動いた子の合計が親より長くなることがあるため、0 未満にはしない
+            children = self._children_ms.pop(span.span_id, 0.0)
+            self.self_ms[span.kind] = self.self_ms.get(span.kind, 0.0) + max(
+                span.duration_ms - children, 0.0
+            )
+            if span.parent_id is not None:
+                self._children_ms[span.parent_id] = (
+                    self._children_ms.get(span.parent_id, 0.0) + span.duration_ms
+                )
+
+    def summary(self) -> str:
+        with self._lock:
+            lines = [
+                f"{'span':<32} {'kind':<5} {'n':>6} {'p50(ms)':>9} {'p95(ms)':>9} "
+                f"{'p99(ms)':>9} {'max(ms)':>9} {'in_tok':>8} {'out_tok':>8}"
+            ]
+            for name, durations in sorted(
+                self.durations.items(), key=lambda item: -sum(item[1])
+            ):
+                values = sorted(durations)
+                input_tokens, output_tokens = self.tokens[name]
+                lines.append(
+                    f"{name[:32]:<32} {self.kinds[name]:<5} {len(values):>6} "
+                    f"{percentile(values, 50):>9.1f} {percentile(values, 95):>9.1f} "
+                    f"{percentile(values, 99):>9.1f} {values[-1]:>9.1f} "
+                    f"{input_tokens:>8} {output_tokens:>8}"
+                )
+            total = sum(self.self_ms.values())
+            if total > 0:
+                labels = {"llm": "LLM", "tool": "ツール", "node": "フレームワーク"}
+                lines.append(
+                    "self time: "
+                    + " / ".join(
+                        f"{labels.get(kind, kind)} {ms:.0f}ms ({ms / total:.0%})"
+                        for kind, ms in self.self_ms.items()
+                    )
+                )
+            return "\n".join(lines)
+
+
+class Tracer:
+    """span を作り、終わったら exporter に渡す（exporter がなければ何もしない）"""
+
+    def __init__(self, exporters: list | None = None):
+        self.exporters = list(exporters or [])
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        tracer = cls()
+        if path := os.getenv("TRACE_PATH"):
+            exporter = JsonlExporter(path)
+            tracer.exporters.append(exporter)
+            atexit.register(exporter.close)
+        if os.getenv("TRACE_SUMMARY") == "1":
+            aggregator = SpanAggregator()
+            tracer.exporters.append(aggregator)
+            atexit.register(lambda: print(f"[trace]\n{aggregator.summary()}"))
+        return tracer
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.exporters)
+
+    def start_span(
+        self, name: str, kind: str, parent_id: str | None = None, **attributes
+    ) -> Span:
+        """span を始める（コールバックのように開始と終了が別の呼び出しになる場合に使う）"""
+        return Span(
+            name=name,
+            kind=kind,
+            span_id=uuid.uuid4().hex,
+            parent_id=parent_id,
+            start_time=time.time(),
+            attributes=attributes,
+            _started=time.perf_counter(),
+        )
+
+    def end_span(self, span: Span, error: BaseException | None = None):
+        span.duration_ms = (time.perf_counter() - span._started) * 1000
+        if error is not None:
+            span.fail(error)
+        for exporter in self.exporters:
+            exporter.export(span)
+
+    @contextmanager
+    def span(self, name: str, kind: str, **attributes) -> Iterator[Span | _NoopSpan]:
+        """with ブロックを1つの span として記録する（中で作った span はこの span の子になる）"""
+        if not self.exporters:
+            yield _NOOP_SPAN
+            return
+        span = self.start_span(name, kind, parent_id=_current_span_id.get(), **attributes)
+        token = _current_span_id.set(span.span_id)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, error=e)
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            _current_span_id.reset(token)
+
+
+def current_span_id() -> str | None:
+    return _current_span_id.get()
+
+
+# プロセス全体で使う tracer（TRACE_PATH / TRACE_SUMMARY で有効になる）
+tracer = Tracer.from_env()